@@ -1,16 +1,22 @@
 """
 Guard-shin Web Server for Render Deployment
 
-This script provides a simple web server that keeps the bot process alive
-and provides a health check endpoint for Render.
+This script supervises the bot and provides a health check endpoint for
+Render. The bot runs as a cluster of processes, each owning a contiguous
+range of gateway shards, so guilds are spread across CPU cores instead of
+sharing one event loop. Crashed clusters are restarted on their own with
+exponential backoff, and /health aggregates every cluster's shard metrics.
 """
 
 import os
 import sys
+import json
 import logging
+import signal
 import time
 import threading
 import subprocess
+import urllib.request
 from http.server import HTTPServer, BaseHTTPRequestHandler
 
 # Configure logging
@@ -21,62 +27,235 @@ logging.basicConfig(
 )
 logger = logging.getLogger('guard-shin-web')
 
-# Bot process
-bot_process = None
-
-def start_bot():
-    """Start the Discord bot process"""
-    global bot_process
-    
-    if bot_process is not None:
-        logger.info("Bot process is already running")
-        return
-    
-    logger.info("Starting Guard-shin Discord bot...")
+# Seconds between checks of the cluster processes
+MONITOR_INTERVAL = 5
+
+# Restart backoff: doubles per consecutive crash, reset after a stable run
+RESTART_BACKOFF_BASE = 5
+RESTART_BACKOFF_MAX = 300
+STABLE_UPTIME = 300
+
+# Discord allows one IDENTIFY per 5 seconds (per bucket); clusters start this far apart per shard
+IDENTIFY_INTERVAL = 5
+
+# Metrics older than this mean the cluster's bot has stopped reporting
+METRICS_STALE_SECONDS = 90
+
+class Cluster:
+    """One bot process and the shards it runs"""
+
+    def __init__(self, cluster_id, shard_ids, shard_count):
+        self.id = cluster_id
+        self.shard_ids = shard_ids  # None = let the bot pick (single unsharded cluster)
+        self.shard_count = shard_count
+        self.metrics_path = f"shard_metrics_cluster{cluster_id}.json"
+        self.process = None
+        self.started_at = None
+        self.next_start = 0.0  # earliest time the cluster may be (re)started
+        self.failures = 0  # consecutive crashes
+        self.restarts = 0
+        self.last_exit_code = None
+
+    @property
+    def running(self):
+        return self.process is not None and self.process.poll() is None
+
+    def start(self):
+        """Launch the cluster's bot process
+
+        Every cluster uses the same database; the bot's background work (timers,
+        the verification sweeper, lockdown resumes) only touches guilds on the
+        cluster's own shards, so clusters never act on each other's rows.
+        """
+        env = dict(os.environ, CLUSTER_ID=str(self.id), SHARD_METRICS_PATH=self.metrics_path)
+        if self.shard_ids is not None:
+            env['SHARD_COUNT'] = str(self.shard_count)
+            env['SHARD_IDS'] = ",".join(str(shard_id) for shard_id in self.shard_ids)
+
+        # Output goes straight to ours (an unread pipe would eventually block the bot)
+        self.process = subprocess.Popen([sys.executable, "run_bot.py"], env=env)
+        self.started_at = time.time()
+        logger.info(f"Cluster {self.id} started with PID {self.process.pid} ({self.describe_shards()})")
+
+    def check(self, now):
+        """Notice a crash and schedule the restart with backoff"""
+        if self.process is None or self.process.poll() is None:
+            return
+
+        self.last_exit_code = self.process.returncode
+        uptime = now - self.started_at
+        self.process = None
+
+        # A cluster that ran for a while before failing starts its backoff over
+        self.failures = 1 if uptime >= STABLE_UPTIME else self.failures + 1
+        delay = min(RESTART_BACKOFF_BASE * 2 ** (self.failures - 1), RESTART_BACKOFF_MAX)
+        self.next_start = now + delay
+        logger.warning(f"Cluster {self.id} exited with code {self.last_exit_code} after {uptime:.0f}s; "
+                       f"restarting in {delay}s (crash {self.failures} in a row)")
+
+    def stop(self):
+        """Ask the cluster's process to exit"""
+        if self.running:
+            self.process.terminate()
+
+    def describe_shards(self):
+        if self.shard_ids is None:
+            return "all shards"
+        return f"shards {self.shard_ids[0]}-{self.shard_ids[-1]} of {self.shard_count}"
+
+    def metrics(self):
+        """The metrics the cluster's bot last wrote, or None"""
+        try:
+            with open(self.metrics_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def health(self, now):
+        """This cluster's status for /health"""
+        metrics = self.metrics()
+        if metrics is not None and (not self.running or metrics.get('pid') != self.process.pid):
+            metrics = None  # Written by an earlier process
+
+        shards = metrics.get('shards', {}) if metrics else {}
+        fresh = metrics is not None and now - metrics.get('updated_at', 0) <= METRICS_STALE_SECONDS
+        connected = sum(1 for shard in shards.values() if shard.get('connected'))
+        expected = len(self.shard_ids) if self.shard_ids is not None else len(shards)
+
+        if not self.running:
+            status = "down"
+        elif fresh and metrics.get('ready') and expected and connected == expected:
+            status = "healthy"
+        elif fresh or now - self.started_at <= METRICS_STALE_SECONDS:
+            status = "starting" if not metrics or not metrics.get('ready') else "degraded"
+        else:
+            status = "unresponsive"
+
+        return {
+            'id': self.id,
+            'status': status,
+            'pid': self.process.pid if self.running else None,
+            'shards': self.shard_ids,
+            'uptime': round(now - self.started_at) if self.running else None,
+            'restarts': self.restarts,
+            'last_exit_code': self.last_exit_code,
+            'next_restart_in': round(max(self.next_start - now, 0)) if not self.running else None,
+            'guilds': metrics.get('guilds', 0) if metrics else 0,
+            'shards_connected': connected,
+            'events_per_second': round(sum(shard.get('events_per_second', 0) for shard in shards.values()), 2),
+            'shard_metrics': shards
+        }
+
+# Bot clusters
+clusters = []
+clusters_lock = threading.Lock()
+
+def recommended_shard_count():
+    """Ask Discord how many shards the bot should run (None if that fails)"""
+    token = os.getenv('DISCORD_BOT_TOKEN') or os.getenv('GUARD_SHIN_BOT_TOKEN')
+    if not token:
+        return None
     try:
-        # Start the bot process
-        bot_process = subprocess.Popen([sys.executable, "run_bot.py"], 
-                                      stdout=subprocess.PIPE,
-                                      stderr=subprocess.PIPE)
-        logger.info(f"Bot process started with PID: {bot_process.pid}")
-        
-        # Start thread to monitor bot process
-        threading.Thread(target=monitor_bot, daemon=True).start()
+        request = urllib.request.Request("https://discord.com/api/v10/gateway/bot",
+                                         headers={'Authorization': f"Bot {token}", 'User-Agent': "Guard-shin"})
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return int(json.load(response)['shards'])
     except Exception as e:
-        logger.error(f"Failed to start bot: {e}")
+        logger.error(f"Failed to get the recommended shard count: {e}")
+        return None
+
+def plan_clusters():
+    """Split the shards into CLUSTER_COUNT contiguous ranges"""
+    cluster_count = max(int(os.getenv('CLUSTER_COUNT', '1')), 1)
+    shard_count = int(os.getenv('SHARD_COUNT')) if os.getenv('SHARD_COUNT') else None
 
-def monitor_bot():
-    """Monitor the bot process and restart it if it crashes"""
-    global bot_process
-    
+    # One cluster without a shard count: the bot asks Discord itself, as before clustering
+    if cluster_count == 1 and shard_count is None:
+        return [Cluster(0, None, None)]
+
+    if shard_count is None:
+        shard_count = recommended_shard_count() or cluster_count
+
+    # Every cluster needs at least one shard
+    if shard_count < cluster_count:
+        logger.warning(f"{shard_count} shards cannot fill {cluster_count} clusters; running {cluster_count} shards")
+        shard_count = cluster_count
+
+    planned = []
+    start = 0
+    for cluster_id in range(cluster_count):
+        size = shard_count // cluster_count + (1 if cluster_id < shard_count % cluster_count else 0)
+        planned.append(Cluster(cluster_id, list(range(start, start + size)), shard_count))
+        start += size
+    return planned
+
+def start_clusters():
+    """Start every cluster, staggered so their shards do not identify at once"""
+    global clusters
+
+    with clusters_lock:
+        clusters = plan_clusters()
+        logger.info(f"Starting Guard-shin Discord bot as {len(clusters)} cluster(s)...")
+
+        next_start = time.time()
+        for cluster in clusters:
+            cluster.next_start = next_start
+            next_start += IDENTIFY_INTERVAL * len(cluster.shard_ids or [0])
+
+    threading.Thread(target=monitor_clusters, daemon=True).start()
+
+def monitor_clusters():
+    """Start clusters when they are due and restart them when they crash"""
     while True:
-        if bot_process is None:
-            logger.warning("Bot process not found. Starting new instance...")
-            start_bot()
-            time.sleep(5)
-            continue
-            
-        # Check if process is still running
-        if bot_process.poll() is not None:
-            exit_code = bot_process.poll()
-            stdout, stderr = bot_process.communicate()
-            logger.warning(f"Bot process exited with code {exit_code}")
-            logger.info(f"Bot stdout: {stdout.decode() if stdout else 'None'}")
-            logger.error(f"Bot stderr: {stderr.decode() if stderr else 'None'}")
-            
-            # Reset the process reference
-            bot_process = None
-            
-            # Wait before restarting
-            logger.info("Waiting 10 seconds before restarting bot...")
-            time.sleep(10)
-            start_bot()
-        
-        time.sleep(30)  # Check every 30 seconds
+        now = time.time()
+        with clusters_lock:
+            for cluster in clusters:
+                cluster.check(now)
+                if cluster.process is None and now >= cluster.next_start:
+                    try:
+                        if cluster.started_at is not None:
+                            cluster.restarts += 1
+                        cluster.start()
+                    except Exception as e:
+                        logger.error(f"Failed to start cluster {cluster.id}: {e}")
+                        cluster.next_start = now + RESTART_BACKOFF_MAX
+
+        time.sleep(MONITOR_INTERVAL)
+
+def stop_clusters(signum=None, frame=None):
+    """Stop every cluster and exit (Render sends SIGTERM on deploys)"""
+    logger.info("Stopping bot clusters...")
+    with clusters_lock:
+        for cluster in clusters:
+            cluster.stop()
+    sys.exit(0)
+
+def cluster_health():
+    """Aggregate every cluster's health"""
+    now = time.time()
+    with clusters_lock:
+        cluster_status = [cluster.health(now) for cluster in clusters]
+
+    running = sum(1 for cluster in cluster_status if cluster['status'] != "down")
+    if running == 0:
+        status = "unhealthy"
+    elif all(cluster['status'] == "healthy" for cluster in cluster_status):
+        status = "healthy"
+    else:
+        status = "degraded"  # Some clusters are restarting; they are handled here, not by restarting the service
+
+    return {
+        'status': status,
+        'clusters_running': running,
+        'clusters': cluster_status,
+        'guilds': sum(cluster['guilds'] for cluster in cluster_status),
+        'shards_connected': sum(cluster['shards_connected'] for cluster in cluster_status),
+        'events_per_second': round(sum(cluster['events_per_second'] for cluster in cluster_status), 2)
+    }
 
 class GuardShinHandler(BaseHTTPRequestHandler):
     """HTTP request handler for Guard-shin web server"""
-    
+
     def do_GET(self):
         """Handle GET requests"""
         if self.path == '/':
@@ -84,10 +263,16 @@ class GuardShinHandler(BaseHTTPRequestHandler):
             self.send_response(200)
             self.send_header('Content-type', 'text/html')
             self.end_headers()
-            
-            # Check if bot is running
-            bot_status = "running" if bot_process and bot_process.poll() is None else "not running"
-            
+
+            health = cluster_health()
+            bot_status = "running" if health['status'] == "healthy" else health['status']
+            rows = "".join(
+                f"<tr><td>{cluster['id']}</td><td>{cluster['status']}</td>"
+                f"<td>{cluster['shards'] if cluster['shards'] is not None else 'all'}</td>"
+                f"<td>{cluster['guilds']}</td><td>{cluster['restarts']}</td></tr>"
+                for cluster in health['clusters']
+            )
+
             response = f"""
             <!DOCTYPE html>
             <html>
@@ -99,6 +284,7 @@ class GuardShinHandler(BaseHTTPRequestHandler):
                     .status {{ padding: 10px; border-radius: 5px; margin: 20px 0; }}
                     .running {{ background-color: #d4edda; color: #155724; }}
                     .not-running {{ background-color: #f8d7da; color: #721c24; }}
+                    td, th {{ padding: 4px 12px; text-align: left; }}
                 </style>
             </head>
             <body>
@@ -106,27 +292,25 @@ class GuardShinHandler(BaseHTTPRequestHandler):
                 <div class="status {'running' if bot_status == 'running' else 'not-running'}">
                     <strong>Status:</strong> {bot_status}
                 </div>
-                <p>The Guard-shin Discord bot is {bot_status}.</p>
+                <p>{health['clusters_running']}/{len(health['clusters'])} clusters running, {health['shards_connected']} shards connected, serving {health['guilds']} guilds.</p>
+                <table>
+                    <tr><th>Cluster</th><th>Status</th><th>Shards</th><th>Guilds</th><th>Restarts</th></tr>
+                    {rows}
+                </table>
                 <p><small>Last checked: {time.strftime('%Y-%m-%d %H:%M:%S')}</small></p>
             </body>
             </html>
             """
-            
+
             self.wfile.write(response.encode())
         elif self.path == '/health':
-            # Simple health check endpoint for Render
-            bot_status = "running" if bot_process and bot_process.poll() is None else "not running"
-            
-            if bot_status == "running":
-                self.send_response(200)
-                self.send_header('Content-type', 'application/json')
-                self.end_headers()
-                self.wfile.write(b'{"status":"healthy","message":"Bot is running"}')
-            else:
-                self.send_response(503)  # Service Unavailable
-                self.send_header('Content-type', 'application/json')
-                self.end_headers()
-                self.wfile.write(b'{"status":"unhealthy","message":"Bot is not running"}')
+            # Health check endpoint for Render: healthy while any cluster is up
+            health = cluster_health()
+
+            self.send_response(503 if health['status'] == "unhealthy" else 200)
+            self.send_header('Content-type', 'application/json')
+            self.end_headers()
+            self.wfile.write(json.dumps(health).encode())
         else:
             # 404 for any other path
             self.send_response(404)
@@ -138,20 +322,24 @@ def run_server():
     """Run the HTTP server"""
     # Get port from environment variable or use default
     port = int(os.environ.get('PORT', 8080))
-    
+
     server_address = ('', port)
     httpd = HTTPServer(server_address, GuardShinHandler)
-    
+
     logger.info(f"Starting web server on port {port}...")
     try:
         httpd.serve_forever()
     except KeyboardInterrupt:
         logger.info("Stopping web server...")
         httpd.server_close()
+        stop_clusters()
 
 if __name__ == '__main__':
-    # Start the bot in a separate thread
-    threading.Thread(target=start_bot, daemon=True).start()
-    
+    # Stop the bot processes with the server
+    signal.signal(signal.SIGTERM, stop_clusters)
+
+    # Start the bot clusters in a separate thread
+    threading.Thread(target=start_clusters, daemon=True).start()
+
     # Start the web server in the main thread
-    run_server()
\ No newline at end of file
+    run_server()
@@ -0,0 +1,141 @@
+"""
+Guard-shin Discord Bot - Auto-Moderation Pattern Benchmark
+Compares the old per-pattern re.search loops used by the scam, token-grabber
+and IP-grabber checks with the combined pattern sets and domain index.
+
+Run from the repository root:
+    python benchmarks/bench_automod_patterns.py [message_count]
+"""
+
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bot.python.moderation.automod import (  # noqa: E402
+    SCAM_PATTERNS, TOKEN_GRABBER_PATTERNS, IP_GRABBER_DOMAINS,
+    TOKEN_GRABBER_SET, IP_GRABBER_INDEX
+)
+from bot.python.utils.filter_engine import URL_PATTERN  # noqa: E402
+from bot.python.utils.pattern_set import compile_pattern_set  # noqa: E402
+
+# Everyday chat, roughly the mix seen in a busy community server
+CHAT_MESSAGES = [
+    "lol",
+    "gm everyone",
+    "anyone up for a match later tonight?",
+    "that boss fight took me like 40 tries",
+    "can someone help me with my python homework, the loop never ends",
+    "check out my new build https://imgur.com/a/xyz123",
+    "brb dinner",
+    "I just finished reading the patch notes, the nerfs are brutal",
+    "who's streaming today? I'll drop by",
+    "the new season starts friday right?",
+    "ok that was actually hilarious 😂😂",
+    "has anyone tried the new steam deck update? battery seems better",
+    "here's the doc we talked about https://docs.google.com/document/d/abc",
+    "nitro is on sale this week if anyone wanted it",
+    "mods can we get a memes channel",
+    "I can't join the voice channel, it keeps disconnecting",
+    "thanks for the help yesterday, it worked!",
+    "my cat just knocked over my coffee onto the keyboard",
+    "see https://github.com/WitherCo/Guard-shin/issues for the bug tracker",
+    "what time is the event in UTC?",
+]
+
+# Messages that should fire one of the rules
+MALICIOUS_MESSAGES = [
+    "free discord nitro claim here https://dlscord-gift.xyz/claim",
+    "steam gift for you! https://steamcomrnunity.ru/gift",
+    "claim your free robux now",
+    "paste this in console: document.cookie and send me the result",
+    "look at this pic https://grabify.link/ABC123",
+    "run this: localStorage.getItem('token') for free nitro",
+]
+
+
+def build_corpus(count: int, malicious_ratio: float = 0.01, seed: int = 1234):
+    """Generate a shuffled corpus of chat messages"""
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(count):
+        if rng.random() < malicious_ratio:
+            corpus.append(rng.choice(MALICIOUS_MESSAGES))
+        else:
+            corpus.append(rng.choice(CHAT_MESSAGES))
+    return corpus
+
+
+def legacy_scan(corpus):
+    """The per-pattern loops the checks used before"""
+    hits = 0
+    for content in corpus:
+        content_lower = content.lower()
+        if any(re.search(pattern, content) for pattern in TOKEN_GRABBER_PATTERNS):
+            hits += 1
+            continue
+        urls = re.findall(r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+', content)
+        if any(domain in url.lower() for url in urls for domain in IP_GRABBER_DOMAINS):
+            hits += 1
+            continue
+        if any(re.search(pattern, content_lower) for pattern in SCAM_PATTERNS):
+            hits += 1
+    return hits
+
+
+def combined_scan(corpus, scam_set):
+    """The combined pattern sets and the domain index"""
+    hits = 0
+    for content in corpus:
+        content_lower = content.lower()
+        if TOKEN_GRABBER_SET.search(content):
+            hits += 1
+            continue
+        urls = URL_PATTERN.findall(content) if 'http' in content_lower else []
+        if any(IP_GRABBER_INDEX.match(url) for url in urls):
+            hits += 1
+            continue
+        if scam_set.search(content_lower):
+            hits += 1
+    return hits
+
+
+def timed(function, *args, repeat: int = 5):
+    """Best-of-N wall time for a function call"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    corpus = build_corpus(count)
+    scam_set = compile_pattern_set(tuple(SCAM_PATTERNS))
+
+    # Warm the re module cache so the legacy loop is measured at its best
+    legacy_scan(corpus[:100])
+
+    legacy_time, legacy_hits = timed(legacy_scan, corpus)
+    combined_time, combined_hits = timed(combined_scan, corpus, scam_set)
+
+    print(f"Messages:         {count}")
+    print(f"Scam literals:    {scam_set.literals}")
+    print(f"Legacy loop:      {legacy_time * 1000:.1f} ms ({legacy_time / count * 1e6:.2f} µs/message, {legacy_hits} hits)")
+    print(f"Combined set:     {combined_time * 1000:.1f} ms ({combined_time / count * 1e6:.2f} µs/message, {combined_hits} hits)")
+    print(f"Speedup:          {legacy_time / combined_time:.1f}x")
+
+    if legacy_hits != combined_hits:
+        print("WARNING: the two matchers disagree")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
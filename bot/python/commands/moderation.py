@@ -9,6 +9,21 @@ import json
 import os
 from typing import Optional, Union, List
 
+from bot.python.utils.channel_resolver import CHANNEL_ROLES, get_channel_resolver
+from bot.python.utils.infraction_store import PAGE_SIZE, get_infraction_store
+from bot.python.utils.lockdown import (
+    edit_overwrites, lock_role, lockdown_role, resolve_mode, restore_overwrite, role_lock_exceptions,
+    snapshot_overwrite, unlock_role
+)
+from bot.python.utils.log_sink import get_log_sink
+from bot.python.utils.rest_scheduler import CRITICAL, HIGH, NORMAL, get_rest_scheduler
+from bot.python.utils.settings_store import get_settings_store
+from bot.python.utils.timer_scheduler import get_timer_scheduler
+from bot.python.utils.user_resolver import get_user_resolver
+
+# Settings store namespace for role-level lockdowns started with !lockdown start
+LOCKDOWN_NAMESPACE = 'moderation_lockdown'
+
 logger = logging.getLogger('guard-shin')
 
 class DurationConverter(commands.Converter):
@@ -44,74 +59,55 @@ class Moderation(commands.Cog):
 
     def __init__(self, bot):
         self.bot = bot
-        self.infractions = {}  # guild_id -> user_id -> [infractions]
-        self.load_infractions()
-    
-    def load_infractions(self):
-        """Load infractions from storage"""
-        # In a real implementation, this would load from a database
-        # For now, we'll initialize empty data for each guild
-        for guild in self.bot.guilds:
-            if guild.id not in self.infractions:
-                self.infractions[guild.id] = {}
-    
-    def get_next_infraction_id(self, guild_id):
-        """Get the next infraction ID for a guild"""
-        # Find the highest existing ID and add 1
-        highest_id = 0
-        for user_id, infractions in self.infractions.get(guild_id, {}).items():
-            for infraction in infractions:
-                if infraction.get('id', 0) > highest_id:
-                    highest_id = infraction['id']
-        return highest_id + 1
+        self.rest = get_rest_scheduler(bot)  # shared REST scheduler
+        self.store = get_settings_store(bot)  # saved role lockdowns
+        self.infraction_store = get_infraction_store(bot)  # infractions, on disk
+        self.users = get_user_resolver(bot)  # cached user lookups for infraction listings
+        self.channels = get_channel_resolver(bot)  # cached log channel lookups
+        self.log_sink = get_log_sink(bot)  # batched log embeds
+        
+        # Tempban and tempmute expiry run on durable timers, so they survive restarts
+        self.timers = get_timer_scheduler(bot)
+        self.timers.register('tempban', self.expire_tempban)
+        self.timers.register('tempmute', self.expire_tempmute)
+        self.timers.start()
     
     async def add_infraction(self, guild_id, user_id, mod_id, infraction_type, reason=None, duration=None, active=True):
         """Add an infraction to a user's record"""
-        # Initialize guild and user if they don't exist
-        if guild_id not in self.infractions:
-            self.infractions[guild_id] = {}
-        
-        if user_id not in self.infractions[guild_id]:
-            self.infractions[guild_id][user_id] = []
-        
-        # Create the infraction
-        infraction = {
-            'id': self.get_next_infraction_id(guild_id),
-            'user_id': str(user_id),
-            'mod_id': str(mod_id),
-            'type': infraction_type,
-            'reason': reason or "No reason provided",
-            'timestamp': datetime.datetime.now().isoformat(),
-            'active': active
-        }
-        
-        # Add expiry time if duration provided
-        if duration:
-            expiry = datetime.datetime.now() + duration
-            infraction['expires_at'] = expiry.isoformat()
+        return await self.infraction_store.add(guild_id, user_id, mod_id, infraction_type, reason, duration, active)
+    
+    async def expire_tempban(self, timer):
+        """Unban a user when their tempban timer fires"""
+        guild_id = timer.payload['guild_id']
+        user_id = timer.payload['user_id']
+        await self.infraction_store.expire(guild_id, timer.payload['infraction_id'])
         
-        # Add to infractions
-        self.infractions[guild_id][user_id].append(infraction)
+        guild = self.bot.get_guild(guild_id)
+        if guild is None:
+            return  # The bot left the guild (timers only fire in the process running its shard)
         
-        # Save changes
-        self.save_infractions()
+        try:
+            await self.rest.run(HIGH, f"guild:{guild.id}", guild.unban, discord.Object(id=user_id),
+                                reason="Temporary ban expired")
+        except discord.NotFound:
+            return  # Already unbanned
+        except discord.HTTPException as e:
+            logger.warning(f"Failed to lift tempban on {user_id} in {guild.name}: {e}")
+            return
         
-        return infraction
+        # Log the action
+        user = self.bot.get_user(user_id)
+        if user is not None:
+            await self.log_moderation_action(guild, user, guild.me, "unban", "Temporary ban expired")
     
-    def save_infractions(self):
-        """Save infractions to storage"""
-        # In a real implementation, this would save to a database
-        # For now, we'll just log that infractions were saved
-        logger.info("Infractions saved")
+    async def expire_tempmute(self, timer):
+        """Close out a tempmute infraction when its timer fires (Discord lifts the timeout itself)"""
+        await self.infraction_store.expire(timer.payload['guild_id'], timer.payload['infraction_id'])
     
     async def log_moderation_action(self, guild, user, mod, action, reason=None, duration=None):
         """Log a moderation action to a specified log channel"""
-        # Find a log channel
-        log_channel = None
-        for channel in guild.text_channels:
-            if 'log' in channel.name.lower() or 'mod' in channel.name.lower():
-                log_channel = channel
-                break
+        # Find a log channel (configured, or the cached name match)
+        log_channel = await self.channels.resolve(guild, 'log')
         
         if not log_channel:
             return  # No log channel found
@@ -136,10 +132,8 @@ class Moderation(commands.Cog):
         # Add user avatar
         embed.set_thumbnail(url=user.display_avatar.url)
         
-        try:
-            await log_channel.send(embed=embed)
-        except discord.Forbidden:
-            logger.warning(f"Missing permissions to send logs to {log_channel.name} in {guild.name}")
+        # Buffered with other log events and sent in batches
+        self.log_sink.log(log_channel, embed)
     
     @commands.command()
     @commands.has_permissions(kick_members=True)
@@ -181,7 +175,7 @@ class Moderation(commands.Cog):
             embed.add_field(name="Moderator", value=ctx.author.name)
             embed.set_footer(text=f"Infraction ID: {infraction['id']}")
             
-            await member.send(embed=embed)
+            await self.rest.run(NORMAL, f"dm:{member.id}", member.send, embed=embed)
         except discord.Forbidden:
             await ctx.send("Note: Unable to DM user")
         
@@ -230,13 +224,14 @@ class Moderation(commands.Cog):
             embed.add_field(name="Reason", value=reason or "No reason provided")
             embed.add_field(name="Moderator", value=ctx.author.name)
             
-            await member.send(embed=embed)
+            await self.rest.run(HIGH, f"dm:{member.id}", member.send, embed=embed)
         except discord.Forbidden:
             pass  # Unable to DM user
         
         # Kick the member
         try:
-            await member.kick(reason=f"{ctx.author}: {reason}" if reason else f"Kicked by {ctx.author}")
+            await self.rest.run(CRITICAL, f"guild:{ctx.guild.id}", member.kick,
+                                reason=f"{ctx.author}: {reason}" if reason else f"Kicked by {ctx.author}")
             await ctx.send(f"👢 **{member}** has been kicked. | Infraction ID: {infraction['id']}")
         except discord.Forbidden:
             await ctx.send("I don't have permission to kick that member.")
@@ -265,7 +260,7 @@ class Moderation(commands.Cog):
             # Try to convert to a user ID
             try:
                 user_id = int(member)
-                user = await self.bot.fetch_user(user_id)
+                user = await self.rest.run(NORMAL, "users", self.bot.fetch_user, user_id)
             except (ValueError, discord.NotFound, discord.HTTPException):
                 await ctx.send("Invalid user or user ID.")
                 return
@@ -302,7 +297,7 @@ class Moderation(commands.Cog):
                 embed.add_field(name="Reason", value=reason or "No reason provided")
                 embed.add_field(name="Moderator", value=ctx.author.name)
                 
-                await user.send(embed=embed)
+                await self.rest.run(HIGH, f"dm:{user.id}", user.send, embed=embed)
             except discord.Forbidden:
                 pass  # Unable to DM user
         
@@ -317,7 +312,8 @@ class Moderation(commands.Cog):
         
         # Ban the user
         try:
-            await ctx.guild.ban(user, reason=f"{ctx.author}: {reason}" if reason else f"Banned by {ctx.author}")
+            await self.rest.run(CRITICAL, f"guild:{ctx.guild.id}", ctx.guild.ban, user,
+                                reason=f"{ctx.author}: {reason}" if reason else f"Banned by {ctx.author}")
             await ctx.send(f"🔨 **{user}** has been banned. | Infraction ID: {infraction['id']}")
         except discord.Forbidden:
             await ctx.send("I don't have permission to ban that user.")
@@ -346,7 +342,7 @@ class Moderation(commands.Cog):
             # Try to convert to a user ID
             try:
                 user_id = int(member)
-                user = await self.bot.fetch_user(user_id)
+                user = await self.rest.run(NORMAL, "users", self.bot.fetch_user, user_id)
             except (ValueError, discord.NotFound, discord.HTTPException):
                 await ctx.send("Invalid user or user ID.")
                 return
@@ -385,7 +381,7 @@ class Moderation(commands.Cog):
                 embed.add_field(name="Reason", value=reason or "No reason provided", inline=False)
                 embed.add_field(name="Moderator", value=ctx.author.name)
                 
-                await user.send(embed=embed)
+                await self.rest.run(HIGH, f"dm:{user.id}", user.send, embed=embed)
             except discord.Forbidden:
                 pass  # Unable to DM user
         
@@ -401,7 +397,8 @@ class Moderation(commands.Cog):
         
         # Ban the user
         try:
-            await ctx.guild.ban(user, reason=f"{ctx.author}: {reason} (Temp: {duration})" if reason else f"Temp banned by {ctx.author} for {duration}")
+            await self.rest.run(CRITICAL, f"guild:{ctx.guild.id}", ctx.guild.ban, user,
+                                reason=f"{ctx.author}: {reason} (Temp: {duration})" if reason else f"Temp banned by {ctx.author} for {duration}")
             await ctx.send(f"⏱️🔨 **{user}** has been temporarily banned for {duration}. | Infraction ID: {infraction['id']}")
         except discord.Forbidden:
             await ctx.send("I don't have permission to ban that user.")
@@ -410,6 +407,15 @@ class Moderation(commands.Cog):
             await ctx.send(f"Failed to ban user: {e}")
             return
         
+        # Schedule the unban (replaces any earlier tempban on the same user)
+        await self.timers.schedule(
+            'tempban',
+            (discord.utils.utcnow() + duration).timestamp(),
+            {'guild_id': ctx.guild.id, 'user_id': user.id, 'infraction_id': infraction['id']},
+            key=f"{ctx.guild.id}:{user.id}",
+            guild_id=ctx.guild.id
+        )
+        
         # Log the action
         await self.log_moderation_action(ctx.guild, user, ctx.author, "tempban", reason, duration)
     
@@ -439,22 +445,14 @@ class Moderation(commands.Cog):
             return
         
         # Update infractions
-        guild_infractions = self.infractions.get(ctx.guild.id, {})
-        user_infractions = guild_infractions.get(str(user_id), [])
-        
-        for infraction in user_infractions:
-            if infraction['type'] in ['ban', 'tempban'] and infraction['active']:
-                infraction['active'] = False
-                infraction['removed_by'] = str(ctx.author.id)
-                infraction['removed_at'] = datetime.datetime.now().isoformat()
-                infraction['removal_reason'] = reason
-        
-        self.save_infractions()
+        await self.infraction_store.deactivate(ctx.guild.id, user_id, ['ban', 'tempban'], ctx.author.id, reason)
         
         # Unban the user
         try:
-            await ctx.guild.unban(user, reason=f"{ctx.author}: {reason}" if reason else f"Unbanned by {ctx.author}")
+            await self.rest.run(HIGH, f"guild:{ctx.guild.id}", ctx.guild.unban, user,
+                                reason=f"{ctx.author}: {reason}" if reason else f"Unbanned by {ctx.author}")
             await ctx.send(f"🔓 **{user}** has been unbanned.")
+            await self.timers.cancel('tempban', f"{ctx.guild.id}:{user.id}")
         except discord.Forbidden:
             await ctx.send("I don't have permission to unban users.")
             return
@@ -511,13 +509,14 @@ class Moderation(commands.Cog):
             embed.add_field(name="Reason", value=reason or "No reason provided")
             embed.add_field(name="Moderator", value=ctx.author.name)
             
-            await member.send(embed=embed)
+            await self.rest.run(HIGH, f"dm:{member.id}", member.send, embed=embed)
         except discord.Forbidden:
             pass  # Unable to DM user
         
         # Apply timeout
         try:
-            await member.timeout(duration, reason=f"{ctx.author}: {reason}" if reason else f"Muted by {ctx.author}")
+            await self.rest.run(CRITICAL, f"guild:{ctx.guild.id}", member.timeout, duration,
+                                reason=f"{ctx.author}: {reason}" if reason else f"Muted by {ctx.author}")
             await ctx.send(f"🔇 **{member}** has been muted. | Infraction ID: {infraction['id']}")
         except discord.Forbidden:
             await ctx.send("I don't have permission to mute that member.")
@@ -580,13 +579,14 @@ class Moderation(commands.Cog):
             embed.add_field(name="Reason", value=reason or "No reason provided", inline=False)
             embed.add_field(name="Moderator", value=ctx.author.name)
             
-            await member.send(embed=embed)
+            await self.rest.run(HIGH, f"dm:{member.id}", member.send, embed=embed)
         except discord.Forbidden:
             pass  # Unable to DM user
         
         # Apply timeout
         try:
-            await member.timeout(duration, reason=f"{ctx.author}: {reason} (Temp: {duration})" if reason else f"Temp muted by {ctx.author} for {duration}")
+            await self.rest.run(CRITICAL, f"guild:{ctx.guild.id}", member.timeout, duration,
+                                reason=f"{ctx.author}: {reason} (Temp: {duration})" if reason else f"Temp muted by {ctx.author} for {duration}")
             await ctx.send(f"⏱️🔇 **{member}** has been temporarily muted for {duration}. | Infraction ID: {infraction['id']}")
         except discord.Forbidden:
             await ctx.send("I don't have permission to mute that member.")
@@ -595,6 +595,15 @@ class Moderation(commands.Cog):
             await ctx.send(f"Failed to mute member: {e}")
             return
         
+        # Schedule the end of the infraction
+        await self.timers.schedule(
+            'tempmute',
+            (discord.utils.utcnow() + duration).timestamp(),
+            {'guild_id': ctx.guild.id, 'user_id': member.id, 'infraction_id': infraction['id']},
+            key=f"{ctx.guild.id}:{member.id}",
+            guild_id=ctx.guild.id
+        )
+        
         # Log the action
         await self.log_moderation_action(ctx.guild, member, ctx.author, "tempmute", reason, duration)
     
@@ -613,22 +622,14 @@ class Moderation(commands.Cog):
             return await ctx.send("This member is not muted.")
         
         # Update infractions
-        guild_infractions = self.infractions.get(ctx.guild.id, {})
-        user_infractions = guild_infractions.get(str(member.id), [])
-        
-        for infraction in user_infractions:
-            if infraction['type'] in ['mute', 'tempmute'] and infraction['active']:
-                infraction['active'] = False
-                infraction['removed_by'] = str(ctx.author.id)
-                infraction['removed_at'] = datetime.datetime.now().isoformat()
-                infraction['removal_reason'] = reason
-        
-        self.save_infractions()
+        await self.infraction_store.deactivate(ctx.guild.id, member.id, ['mute', 'tempmute'], ctx.author.id, reason)
         
         # Remove timeout
         try:
-            await member.timeout(None, reason=f"{ctx.author}: {reason}" if reason else f"Unmuted by {ctx.author}")
+            await self.rest.run(HIGH, f"guild:{ctx.guild.id}", member.timeout, None,
+                                reason=f"{ctx.author}: {reason}" if reason else f"Unmuted by {ctx.author}")
             await ctx.send(f"🔊 **{member}** has been unmuted.")
+            await self.timers.cancel('tempmute', f"{ctx.guild.id}:{member.id}")
         except discord.Forbidden:
             await ctx.send("I don't have permission to unmute that member.")
             return
@@ -641,132 +642,89 @@ class Moderation(commands.Cog):
     
     @commands.command()
     @commands.has_permissions(manage_messages=True)
-    async def infractions(self, ctx, member: discord.Member = None, page: int = 1):
+    async def infractions(self, ctx, member: Optional[discord.Member] = None, before: int = None):
         """View a member's infractions
         
+        Pages go from newest to oldest; pass the ID shown in the footer to see older ones.
+        
         Examples:
         !infractions @user
-        !infractions @user 2
+        !infractions @user 42
         !infractions
         """
         guild_id = ctx.guild.id
+        user_id = member.id if member else None
         
-        # Check if viewing all infractions or a specific member's
-        if member is None:
-            # Get all infractions for the guild
-            all_infractions = []
-            for user_id, infractions in self.infractions.get(guild_id, {}).items():
-                all_infractions.extend(infractions)
-            
-            # Sort by timestamp (newest first)
-            all_infractions.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
-            
-            if not all_infractions:
+        # Fetch one extra row to know whether there is an older page
+        page = await self.infraction_store.page(guild_id, user_id, before, PAGE_SIZE + 1)
+        has_more = len(page) > PAGE_SIZE
+        page = page[:PAGE_SIZE]
+        
+        if not page:
+            if before is not None:
+                return await ctx.send(f"No infractions older than #{before}.")
+            if member is None:
                 return await ctx.send("No infractions found for this server.")
-            
-            # Paginate results
-            per_page = 5
-            pages = (len(all_infractions) + per_page - 1) // per_page
-            
-            if page < 1 or page > pages:
-                return await ctx.send(f"Invalid page. Please specify a page between 1 and {pages}.")
-            
-            start_idx = (page - 1) * per_page
-            end_idx = min(start_idx + per_page, len(all_infractions))
-            
-            # Create embed
+            return await ctx.send(f"No infractions found for {member}.")
+        
+        total = await self.infraction_store.count(guild_id, user_id)
+        description = f"Showing #{page[0]['id']}-#{page[-1]['id']} of {total} infractions"
+        
+        # Create embed
+        if member is None:
             embed = discord.Embed(
-                title=f"All Infractions | Page {page}/{pages}",
+                title="All Infractions",
                 color=discord.Color.blue(),
-                description=f"Showing {start_idx + 1}-{end_idx} of {len(all_infractions)} infractions"
+                description=description
             )
-            
-            # Add infractions to embed
-            for i, infraction in enumerate(all_infractions[start_idx:end_idx], start=1):
-                # Try to get user and mod info
-                user_id = infraction.get('user_id')
-                mod_id = infraction.get('mod_id')
-                user = await self.bot.fetch_user(int(user_id)) if user_id else None
-                mod = await self.bot.fetch_user(int(mod_id)) if mod_id else None
-                
-                user_str = f"{user} ({user_id})" if user else user_id
-                mod_str = f"{mod} ({mod_id})" if mod else mod_id
-                
-                field_title = f"{i}. #{infraction.get('id')} | {infraction.get('type').title()}"
-                if not infraction.get('active', True):
-                    field_title += " (Inactive)"
-                
-                field_value = f"**User:** {user_str}\n"
-                field_value += f"**Moderator:** {mod_str}\n"
-                field_value += f"**Reason:** {infraction.get('reason', 'No reason')}\n"
-                field_value += f"**Date:** <t:{int(datetime.datetime.fromisoformat(infraction.get('timestamp', '')).timestamp())}:R>\n"
-                
-                if 'expires_at' in infraction:
-                    expiry = datetime.datetime.fromisoformat(infraction['expires_at'])
-                    field_value += f"**Expires:** <t:{int(expiry.timestamp())}:R>\n"
-                
-                embed.add_field(name=field_title, value=field_value, inline=False)
-            
-            # Add pagination info
-            embed.set_footer(text=f"Use {ctx.prefix}infractions {page+1} to see the next page")
-            
-            await ctx.send(embed=embed)
-            
         else:
-            # Get infractions for specific member
-            user_infractions = self.infractions.get(guild_id, {}).get(str(member.id), [])
-            
-            if not user_infractions:
-                return await ctx.send(f"No infractions found for {member}.")
-            
-            # Sort by timestamp (newest first)
-            user_infractions.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
-            
-            # Paginate results
-            per_page = 5
-            pages = (len(user_infractions) + per_page - 1) // per_page
-            
-            if page < 1 or page > pages:
-                return await ctx.send(f"Invalid page. Please specify a page between 1 and {pages}.")
-            
-            start_idx = (page - 1) * per_page
-            end_idx = min(start_idx + per_page, len(user_infractions))
-            
-            # Create embed
             embed = discord.Embed(
-                title=f"Infractions for {member} | Page {page}/{pages}",
+                title=f"Infractions for {member}",
                 color=member.color,
-                description=f"Showing {start_idx + 1}-{end_idx} of {len(user_infractions)} infractions"
+                description=description
             )
             
             # Add member info
             embed.set_thumbnail(url=member.display_avatar.url)
+        
+        # Resolve every user and moderator on the page at once (cached users cost no requests)
+        users = await self.users.resolve_many(
+            [infraction.get('mod_id') for infraction in page] +
+            ([infraction.get('user_id') for infraction in page] if member is None else [])
+        )
+        
+        # Add infractions to embed
+        for i, infraction in enumerate(page, start=1):
+            user_id = infraction.get('user_id')
+            mod_id = infraction.get('mod_id')
+            mod = users.get(int(mod_id)) if mod_id else None
+            mod_str = f"{mod} ({mod_id})" if mod else mod_id
             
-            # Add infractions to embed
-            for i, infraction in enumerate(user_infractions[start_idx:end_idx], start=1):
-                # Try to get mod info
-                mod_id = infraction.get('mod_id')
-                mod = await self.bot.fetch_user(int(mod_id)) if mod_id else None
-                mod_str = f"{mod} ({mod_id})" if mod else mod_id
-                
-                field_title = f"{i}. #{infraction.get('id')} | {infraction.get('type').title()}"
-                if not infraction.get('active', True):
-                    field_title += " (Inactive)"
-                
-                field_value = f"**Moderator:** {mod_str}\n"
-                field_value += f"**Reason:** {infraction.get('reason', 'No reason')}\n"
-                field_value += f"**Date:** <t:{int(datetime.datetime.fromisoformat(infraction.get('timestamp', '')).timestamp())}:R>\n"
-                
-                if 'expires_at' in infraction:
-                    expiry = datetime.datetime.fromisoformat(infraction['expires_at'])
-                    field_value += f"**Expires:** <t:{int(expiry.timestamp())}:R>\n"
-                
-                embed.add_field(name=field_title, value=field_value, inline=False)
+            field_title = f"{i}. #{infraction.get('id')} | {infraction.get('type').title()}"
+            if not infraction.get('active', True):
+                field_title += " (Inactive)"
+            
+            field_value = ""
+            if member is None:
+                user = users.get(int(user_id)) if user_id else None
+                user_str = f"{user} ({user_id})" if user else user_id
+                field_value += f"**User:** {user_str}\n"
+            field_value += f"**Moderator:** {mod_str}\n"
+            field_value += f"**Reason:** {infraction.get('reason', 'No reason')}\n"
+            field_value += f"**Date:** <t:{int(datetime.datetime.fromisoformat(infraction.get('timestamp', '')).timestamp())}:R>\n"
             
-            # Add pagination info
-            embed.set_footer(text=f"Use {ctx.prefix}infractions {member} {page+1} to see the next page")
+            if 'expires_at' in infraction:
+                expiry = datetime.datetime.fromisoformat(infraction['expires_at'])
+                field_value += f"**Expires:** <t:{int(expiry.timestamp())}:R>\n"
             
-            await ctx.send(embed=embed)
+            embed.add_field(name=field_title, value=field_value, inline=False)
+        
+        # Add pagination info (the cursor is the last ID shown)
+        if has_more:
+            target = f"{member} " if member else ""
+            embed.set_footer(text=f"Use {ctx.prefix}infractions {target}{page[-1]['id']} to see older infractions")
+        
+        await ctx.send(embed=embed)
     
     @commands.command()
     @commands.has_permissions(manage_messages=True)
@@ -941,7 +899,8 @@ class Moderation(commands.Cog):
         overwrite.send_messages = False
         
         try:
-            await channel.set_permissions(default_role, overwrite=overwrite, reason=f"{ctx.author}: {reason}" if reason else f"Locked by {ctx.author}")
+            await self.rest.run(CRITICAL, f"channel:{channel.id}", channel.set_permissions, default_role,
+                                overwrite=overwrite, reason=f"{ctx.author}: {reason}" if reason else f"Locked by {ctx.author}")
             
             # Send confirmation
             await channel.send(f"🔒 This channel has been locked by {ctx.author.mention}." + (f"\n**Reason:** {reason}" if reason else ""))
@@ -986,9 +945,11 @@ class Moderation(commands.Cog):
         
         # Remove empty overwrite
         if overwrite.is_empty():
-            await channel.set_permissions(default_role, overwrite=None, reason=f"{ctx.author}: {reason}" if reason else f"Unlocked by {ctx.author}")
+            await self.rest.run(HIGH, f"channel:{channel.id}", channel.set_permissions, default_role,
+                                overwrite=None, reason=f"{ctx.author}: {reason}" if reason else f"Unlocked by {ctx.author}")
         else:
-            await channel.set_permissions(default_role, overwrite=overwrite, reason=f"{ctx.author}: {reason}" if reason else f"Unlocked by {ctx.author}")
+            await self.rest.run(HIGH, f"channel:{channel.id}", channel.set_permissions, default_role,
+                                overwrite=overwrite, reason=f"{ctx.author}: {reason}" if reason else f"Unlocked by {ctx.author}")
         
         # Send confirmation
         await channel.send(f"🔓 This channel has been unlocked by {ctx.author.mention}." + (f"\n**Reason:** {reason}" if reason else ""))
@@ -1000,6 +961,93 @@ class Moderation(commands.Cog):
         reason_text = f"Unlocked #{channel.name}" + (f" - {reason}" if reason else "")
         await self.log_moderation_action(ctx.guild, ctx.guild.me, ctx.author, "unlock", reason_text)
         
+    async def get_lockdown_strategy(self, guild):
+        """Get the lockdown mode and role for a guild (configured with !raidmode lockmode/lockrole)"""
+        raid_protection = self.bot.get_cog("RaidProtection")
+        if raid_protection is None:
+            return resolve_mode(guild, 'auto'), guild.default_role
+        
+        settings = await raid_protection.get_settings(guild.id)
+        return resolve_mode(guild, settings.get('lockdown_mode', 'auto')), lockdown_role(guild, settings.get('lockdown_role'))
+    
+    async def role_lockdown_start(self, ctx, role, reason):
+        """Lock the server by taking Send Messages away from one role"""
+        status_msg = await ctx.send("🔒 Locking down the server...")
+        role_name = "@everyone" if role.is_default() else role.name
+        
+        # Channels whose overwrite explicitly lets the role speak are not covered by the role edit
+        snapshot = {}
+        edits = []
+        for channel in role_lock_exceptions(ctx.guild, role):
+            overwrite = channel.overwrites_for(role)
+            snapshot[str(channel.id)] = snapshot_overwrite(overwrite)
+            overwrite.send_messages = False
+            edits.append((channel, overwrite))
+        
+        try:
+            original = await lock_role(self.rest, role, CRITICAL, f"Lockdown: {reason}")
+        except discord.Forbidden:
+            await status_msg.edit(content=f"I don't have permission to edit the {role_name} role.")
+            return
+        
+        # Save what the lockdown changed so !lockdown end can restore it. If another start
+        # saved a lockdown in the meantime, its restore data wins: by now the role and channels
+        # are already locked, so this run's snapshot holds locked values, not the originals
+        saved = await self.store.load(LOCKDOWN_NAMESPACE, ctx.guild.id)
+        if saved:
+            if saved.get('role_permissions') is None:
+                saved['role_permissions'] = original
+            saved['overwrites'] = {**snapshot, **saved.get('overwrites', {})}
+        else:
+            saved = {'role_id': role.id, 'role_permissions': original, 'overwrites': snapshot}
+        self.store.save(LOCKDOWN_NAMESPACE, ctx.guild.id, saved)
+        await self.store.flush()
+        
+        progress = {'done': 0, 'failed': 0}
+        await edit_overwrites(self.rest, ctx.guild, role, edits, CRITICAL, f"Lockdown: {reason}", progress)
+        
+        # One notice here instead of a message in every channel
+        await status_msg.edit(
+            content=f"🔒 **SERVER LOCKDOWN**: {role_name} can no longer send messages (locked by {ctx.author.mention}). "
+                    f"{progress['done']} channel override(s) were also locked.\n**Reason:** {reason}"
+        )
+        
+        # Log the action
+        await self.log_moderation_action(ctx.guild, ctx.guild.me, ctx.author, "lockdown", reason)
+    
+    async def role_lockdown_end(self, ctx, saved, reason):
+        """Undo a lockdown started by role_lockdown_start"""
+        status_msg = await ctx.send("🔓 Unlocking the server...")
+        role = ctx.guild.get_role(saved.get('role_id') or ctx.guild.id) or ctx.guild.default_role
+        
+        try:
+            if saved.get('role_permissions') is not None:
+                await unlock_role(self.rest, role, saved['role_permissions'], HIGH, f"Lockdown end: {reason}")
+        except discord.Forbidden:
+            await status_msg.edit(content="I don't have permission to edit that role.")
+            return
+        
+        # Restore the channel overrides the lockdown changed
+        edits = []
+        for channel_id, overwrite in saved.get('overwrites', {}).items():
+            channel = ctx.guild.get_channel(int(channel_id))
+            if channel is not None:
+                edits.append((channel, restore_overwrite(overwrite)))
+        
+        progress = {'done': 0, 'failed': 0}
+        await edit_overwrites(self.rest, ctx.guild, role, edits, HIGH, f"Lockdown end: {reason}", progress)
+        
+        self.store.delete(LOCKDOWN_NAMESPACE, ctx.guild.id)
+        await self.store.flush()
+        
+        await status_msg.edit(
+            content=f"🔓 **LOCKDOWN ENDED**: Server unlocked by {ctx.author.mention}. "
+                    f"{progress['done']} channel override(s) restored.\n**Reason:** {reason}"
+        )
+        
+        # Log the action
+        await self.log_moderation_action(ctx.guild, ctx.guild.me, ctx.author, "lockdown end", reason)
+    
     @commands.group(invoke_without_command=True)
     @commands.has_permissions(administrator=True)
     async def lockdown(self, ctx):
@@ -1011,7 +1059,7 @@ class Moderation(commands.Cog):
         """
         await ctx.send(
             "**Lockdown Commands**\n"
-            f"`{ctx.prefix}lockdown start [reason]` - Lock all channels\n"
+            f"`{ctx.prefix}lockdown start [reason]` - Lock all channels (or the lockdown role in large servers)\n"
             f"`{ctx.prefix}lockdown end [reason]` - Unlock all channels"
         )
         
@@ -1041,6 +1089,17 @@ class Moderation(commands.Cog):
             await ctx.send("Lockdown cancelled.")
             return
         
+        # Locking again would snapshot already-locked permissions over the saved originals
+        if await self.store.load(LOCKDOWN_NAMESPACE, ctx.guild.id):
+            await ctx.send(f"🔒 The server is already locked down. Use `{ctx.prefix}lockdown end` to lift it first.")
+            return
+        
+        # Large guilds (or guilds that chose it) lock one role instead of every channel
+        mode, role = await self.get_lockdown_strategy(ctx.guild)
+        if mode == 'role':
+            await self.role_lockdown_start(ctx, role, reason)
+            return
+        
         # Get default role (@everyone)
         default_role = ctx.guild.default_role
         
@@ -1069,10 +1128,12 @@ class Moderation(commands.Cog):
                 
                 # Update permission
                 overwrite.send_messages = False
-                await channel.set_permissions(default_role, overwrite=overwrite, reason=f"Lockdown: {reason}")
+                await self.rest.run(CRITICAL, f"channel:{channel.id}", channel.set_permissions, default_role,
+                                    overwrite=overwrite, reason=f"Lockdown: {reason}")
                 
-                # Send notification in each channel
-                await channel.send(f"🔒 **SERVER LOCKDOWN**: This channel has been locked by {ctx.author.mention}.\n**Reason:** {reason}")
+                # Send notification in each channel (queued behind the locks)
+                self.rest.spawn(NORMAL, f"channel:{channel.id}", channel.send,
+                                f"🔒 **SERVER LOCKDOWN**: This channel has been locked by {ctx.author.mention}.\n**Reason:** {reason}")
                 
                 locked_channels += 1
                 
@@ -1120,6 +1181,12 @@ class Moderation(commands.Cog):
             await ctx.send("Unlock cancelled.")
             return
         
+        # Undo a role-level lockdown if that is how the server was locked
+        saved = await self.store.load(LOCKDOWN_NAMESPACE, ctx.guild.id)
+        if saved:
+            await self.role_lockdown_end(ctx, saved, reason)
+            return
+        
         # Get default role (@everyone)
         default_role = ctx.guild.default_role
         
@@ -1145,12 +1212,15 @@ class Moderation(commands.Cog):
                 
                 # Remove empty overwrite
                 if overwrite.is_empty():
-                    await channel.set_permissions(default_role, overwrite=None, reason=f"Lockdown end: {reason}")
+                    await self.rest.run(HIGH, f"channel:{channel.id}", channel.set_permissions, default_role,
+                                        overwrite=None, reason=f"Lockdown end: {reason}")
                 else:
-                    await channel.set_permissions(default_role, overwrite=overwrite, reason=f"Lockdown end: {reason}")
+                    await self.rest.run(HIGH, f"channel:{channel.id}", channel.set_permissions, default_role,
+                                        overwrite=overwrite, reason=f"Lockdown end: {reason}")
                 
                 # Send notification in each channel
-                await channel.send(f"🔓 **LOCKDOWN ENDED**: This channel has been unlocked by {ctx.author.mention}.\n**Reason:** {reason}")
+                self.rest.spawn(NORMAL, f"channel:{channel.id}", channel.send,
+                                f"🔓 **LOCKDOWN ENDED**: This channel has been unlocked by {ctx.author.mention}.\n**Reason:** {reason}")
                 
                 unlocked_channels += 1
                 
@@ -1212,6 +1282,38 @@ class Moderation(commands.Cog):
             await ctx.send("I don't have permission to change that member's nickname.")
         except discord.HTTPException as e:
             await ctx.send(f"Error changing nickname: {e}")
+    
+    @commands.command(name="channelrole")
+    @commands.has_permissions(manage_guild=True)
+    async def channel_role(self, ctx, role: str = None, channel: discord.TextChannel = None):
+        """Set which channel the bot uses for logs, welcomes, verification or alerts
+        
+        Examples:
+        !channelrole
+        !channelrole log #mod-log
+        !channelrole alerts
+        """
+        # Show where every role currently resolves to
+        if role is None:
+            configured = await self.channels.configured(ctx.guild.id)
+            embed = discord.Embed(title="Channel Roles", color=discord.Color.blue())
+            for name in CHANNEL_ROLES:
+                resolved = await self.channels.resolve(ctx.guild, name)
+                source = "configured" if name in configured else "matched by name"
+                embed.add_field(name=name.title(), value=f"{resolved.mention} ({source})" if resolved else "None")
+            embed.set_footer(text=f"Use {ctx.prefix}channelrole <role> #channel to set one, or omit the channel to reset it")
+            return await ctx.send(embed=embed)
+        
+        role = role.lower()
+        if role not in CHANNEL_ROLES:
+            return await ctx.send(f"Unknown channel role. Choose from: {', '.join(CHANNEL_ROLES)}")
+        
+        # Set or reset the role's channel
+        await self.channels.configure(ctx.guild.id, role, channel.id if channel else None)
+        if channel:
+            await ctx.send(f"✅ The {role} channel is now {channel.mention}.")
+        else:
+            await ctx.send(f"✅ The {role} channel will be picked by name again.")
 
 async def setup(bot):
     await bot.add_cog(Moderation(bot))
\ No newline at end of file
@@ -6,6 +6,8 @@ import logging
 import json
 import sys
 
+from bot.python.utils.rest_scheduler import LOW, get_rest_scheduler
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -95,9 +97,12 @@ class GuardShin(commands.Bot):
             discord.Activity(type=discord.ActivityType.competing, name="security contests")
         ]
         
+        # Status changes are the lowest priority work the bot does
+        rest = get_rest_scheduler(self)
+        
         while not self.is_closed():
             for status in statuses:
-                await self.change_presence(activity=status)
+                rest.spawn(LOW, "presence", self.change_presence, activity=status)
                 await asyncio.sleep(60)  # Change every minute
                 
     async def on_ready(self):
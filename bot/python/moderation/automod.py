@@ -1,12 +1,23 @@
 import discord
-from discord.ext import commands
-import re
+from discord.ext import commands, tasks
 import logging
 import json
 import os
 import asyncio
-from collections import defaultdict, deque
-import datetime
+
+from bot.python.utils.action_queue import ActionQueue
+from bot.python.utils.blocklist_store import BlocklistStore
+from bot.python.utils.domain_index import DomainIndex
+from bot.python.utils.filter_engine import CompiledRuleset, MessageFeatures
+from bot.python.utils.invite_cache import InviteCache, ResolvedInvite
+from bot.python.utils.layered_settings import SettingsView, freeze_defaults, freeze_overrides
+from bot.python.utils.log_sink import get_log_sink
+from bot.python.utils.pattern_set import PatternSet
+from bot.python.utils.rate_limiter import SlidingWindowLimiter
+from bot.python.utils.rest_scheduler import CRITICAL, HIGH, NORMAL, get_rest_scheduler
+from bot.python.utils.settings_store import get_settings_store
+from bot.python.utils.warn_tracker import WarnTracker
+from bot.python.utils.word_matcher import WordMatcher
 
 logger = logging.getLogger('guard-shin')
 
@@ -31,6 +42,52 @@ SCAM_PATTERNS = [
     r'claim\s+your', r'click\s+here\s+to\s+get', r'limited\s+time\s+offer'
 ]
 
+# Phishing domains and domain fragments checked against the host of posted URLs
+PHISHING_PATTERNS = [
+    "discord-nitro", "free-nitro", "steam-gift", "nitrogift",
+    "steamgiveaway", "discordgift", "gift.com", "discord.gift", 
+    "discocrd", "dlscord", "discorb"
+]
+
+# Token grabber patterns (JavaScript code snippets that might steal tokens)
+TOKEN_GRABBER_PATTERNS = [
+    r'localStorage\.getItem\([\'"]token[\'"]\)',
+    r'localStorage\[[\'"]token[\'"]\]',
+    r'document\.cookie',
+    r'\.send\(.*token',
+    r'\.post\(.*token',
+    r'\.get\(.*token'
+]
+
+# Known IP grabber domains
+IP_GRABBER_DOMAINS = [
+    "grabify", "iplogger", "ipgrabber", "iplist", "2no", "yip", "ps3cfw",
+    "linkspy", "iptrack", "ip-tracker", "logger", "ipsniff", "ip-sniff",
+    "webresolver", "whatismyip", "blasze", "grabify.link", "iplogger.org"
+]
+
+# Combined matchers for the fixed lists, compiled once at import
+SCAM_SET = PatternSet(SCAM_PATTERNS)
+TOKEN_GRABBER_SET = PatternSet(TOKEN_GRABBER_PATTERNS)
+PHISHING_INDEX = DomainIndex(PHISHING_PATTERNS)
+IP_GRABBER_INDEX = DomainIndex(IP_GRABBER_DOMAINS)
+
+# Optional large phishing feed (one domain per line), reloaded when the file changes
+DOMAIN_BLOCKLIST_FILE = os.environ.get('DOMAIN_BLOCKLIST_FILE', 'domain_blocklist.txt')
+DOMAIN_BLOCKLIST_REFRESH_MINUTES = 5
+
+# Settings store namespace for this cog
+SETTINGS_NAMESPACE = 'automod'
+
+# Spam tracking limits (idle users are swept, the least active are evicted past the cap)
+SPAM_TRACKED_USERS_PER_GUILD = 5000
+SPAM_SWEEP_SECONDS = 60
+
+# Warning tracking limits (one warning expires per decay period, oldest members evicted past the budget)
+WARN_DECAY_SECONDS = 3600
+WARN_TRACKED_MEMBERS = 100000
+WARN_SWEEP_MINUTES = 10
+
 # Potentially dangerous domains (example list)
 DANGEROUS_DOMAINS = [
     "discordgift", "discorcl", "dlscord", "discorb", "discrod", "steamcomminity", 
@@ -39,29 +96,54 @@ DANGEROUS_DOMAINS = [
     "steamcommumity", "disocrd", "discorde", "steampowered.pro", "stearmcommunity"
 ]
 
+DANGEROUS_INDEX = DomainIndex(DANGEROUS_DOMAINS)
+
 class AutoMod(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         
-        # Configuration and settings
-        self.settings = {}  # guild_id -> settings
+        # Configuration and settings (loaded per guild on first use)
+        self.store = get_settings_store(bot)
+        self.defaults = freeze_defaults(self.default_settings())  # immutable, shared by every guild
+        self.settings = {}  # guild_id -> SettingsView over the guild's overrides
+        self.rulesets = {}  # guild_id -> CompiledRuleset built from settings
+        self.word_matchers = {}  # guild_id -> WordMatcher for the profanity filter
+        
+        # Known phishing/malware domains shared by every guild (loaded by the refresh task)
+        self.domain_blocklist = BlocklistStore(DOMAIN_BLOCKLIST_FILE)
+        
+        # Resolved invite codes shared by every guild (invalid codes are cached too)
+        self.invite_cache = InviteCache(self.fetch_invite_info, not_found=(discord.NotFound,))
         
         # Tracking data for anti-spam
-        self.user_message_times = defaultdict(lambda: defaultdict(deque))  # guild_id -> user_id -> deque of message timestamps
-        self.user_warns = defaultdict(lambda: defaultdict(int))  # guild_id -> user_id -> warn count
+        self.spam_limiters = {}  # guild_id -> SlidingWindowLimiter keyed by user_id
+        self.warnings = WarnTracker(max_entries=WARN_TRACKED_MEMBERS, default_decay=WARN_DECAY_SECONDS)  # (guild_id, user_id) -> warn count
+        
+        # REST calls go through the shared scheduler, with moderation ahead of cosmetic work
+        self.rest = get_rest_scheduler(bot)
         
-        # Initialize settings for each guild
-        self.load_settings()
+        # Deletes, timeouts and notices are sent in batches off the message handler
+        self.actions = ActionQueue(self.rest)
+        
+        # Log embeds are buffered and sent up to ten per message
+        self.log_sink = get_log_sink(bot)
+        
+        # Load the domain blocklist and pick up feed updates
+        self.refresh_domain_blocklist.start()
+        
+        # Forget users who stopped posting, and warnings that have decayed
+        self.sweep_spam_limiters.start()
+        self.sweep_warnings.start()
     
-    def load_settings(self):
-        """Load auto-moderation settings from storage"""
-        # This would normally load from a database
-        # For now, we'll use default settings for all guilds
-        default_settings = {
+    def default_settings(self):
+        """Build the default auto-moderation settings for a guild"""
+        return {
             'enabled': True,
             'profanity_filter': {
                 'enabled': True,
                 'words': DEFAULT_FILTER_WORDS,
+                'whole_words': False,  # Only match whole words instead of substrings
+                'normalize_leetspeak': False,  # Match common substitutions like "$" for "s"
                 'action': 'warn',  # warn, delete, mute, kick, ban
                 'warn_threshold': 3  # Number of warnings before taking stronger action
             },
@@ -73,8 +155,8 @@ class AutoMod(commands.Cog):
             },
             'scam_detection': {
                 'enabled': True,
-                'patterns': SCAM_PATTERNS,
-                'dangerous_domains': DANGEROUS_DOMAINS,
+                'patterns': [],  # Extra patterns for this guild (SCAM_PATTERNS always apply)
+                'dangerous_domains': [],  # Extra domains for this guild (DANGEROUS_DOMAINS always apply)
                 'action': 'delete',
                 'notify_admins': True
             },
@@ -150,10 +232,22 @@ class AutoMod(commands.Cog):
                 'log_level': 'all'  # all, warnings, violations, none
             }
         }
-        
-        # Apply default settings to all guilds
-        for guild in self.bot.guilds:
-            self.settings[guild.id] = default_settings.copy()
+    
+    async def get_settings(self, guild_id):
+        """Get a guild's settings, loading them from the settings store on first use"""
+        settings = self.settings.get(guild_id)
+        if settings is None:
+            stored = await self.store.load(SETTINGS_NAMESPACE, guild_id)
+            settings = self.settings.get(guild_id)
+            if settings is None:
+                settings = self.settings[guild_id] = SettingsView(self.defaults, freeze_overrides(stored))
+        return settings
+    
+    def save_settings(self, guild_id):
+        """Queue a guild's settings for a batched write to the settings store"""
+        settings = self.settings.get(guild_id)
+        if settings is not None:
+            self.store.save(SETTINGS_NAMESPACE, guild_id, settings.overrides)
     
     @commands.Cog.listener()
     async def on_message(self, message):
@@ -166,277 +260,208 @@ class AutoMod(commands.Cog):
         if message.author.guild_permissions.manage_messages:
             return
         
-        # Get settings for this guild
-        guild_settings = self.settings.get(message.guild.id, {})
+        # Get the compiled ruleset for this guild (loading its settings on first use)
+        if message.guild.id not in self.settings:
+            await self.get_settings(message.guild.id)
+        ruleset = self.get_ruleset(message.guild.id)
         
         # Skip if auto-mod is disabled for this guild
-        if not guild_settings.get('enabled', False):
-            return
-        
-        # Check various filters in order of severity
-        # 1. Anti-phishing/scam detection (highest priority)
-        if await self.check_phishing(message, guild_settings):
-            return
-            
-        # 2. Anti-token grabber
-        if await self.check_token_grabber(message, guild_settings):
-            return
-            
-        # 3. Anti-IP grabber
-        if await self.check_ip_grabber(message, guild_settings):
+        if ruleset is None or not ruleset.enabled or not ruleset.checks:
             return
         
-        # 4. Scam detection
-        if await self.check_scam(message, guild_settings):
-            return
-        
-        # 5. Profanity filter
-        if await self.check_profanity(message, guild_settings):
-            return
+        # Scan the message once and share the features with every rule
+        features = MessageFeatures.from_message(message)
         
-        # 6. Link filter
-        if await self.check_links(message, guild_settings):
-            return
-            
-        # 7. Invite filter
-        if await self.check_invites(message, guild_settings):
-            return
-        
-        # 8. Spam protection
-        if await self.check_spam(message, guild_settings):
-            return
-        
-        # 9. Repeated text
-        if await self.check_repeated_text(message, guild_settings):
-            return
-        
-        # 10. Caps filter
-        if await self.check_caps(message, guild_settings):
-            return
-        
-        # 11. Mention spam
-        if await self.check_mention_spam(message, guild_settings):
-            return
-            
-        # 12. Zalgo text
-        if await self.check_zalgo(message, guild_settings):
-            return
-            
-        # 13. Emoji spam
-        if await self.check_emoji_spam(message, guild_settings):
-            return
-            
-        # 14. New account checks
-        if await self.check_new_account(message, guild_settings):
-            return
+        # Run the enabled checks in order of severity
+        for check in ruleset.checks:
+            if await getattr(self, check)(message, ruleset, features):
+                return
+    
+    def get_ruleset(self, guild_id):
+        """Get the compiled ruleset for a guild, compiling it if needed"""
+        ruleset = self.rulesets.get(guild_id)
+        if ruleset is None:
+            guild_settings = self.settings.get(guild_id)
+            if guild_settings is None:
+                return None
+            ruleset = CompiledRuleset(guild_settings, self.get_word_matcher(guild_id))
+            self.rulesets[guild_id] = ruleset
+        return ruleset
+    
+    def get_word_matcher(self, guild_id):
+        """Get the profanity word matcher for a guild, building it if needed"""
+        matcher = self.word_matchers.get(guild_id)
+        if matcher is None:
+            profanity = self.settings.get(guild_id, {}).get('profanity_filter', {})
+            matcher = WordMatcher(
+                profanity.get('words', []),
+                whole_words=profanity.get('whole_words', False),
+                normalize_leetspeak=profanity.get('normalize_leetspeak', False)
+            )
+            self.word_matchers[guild_id] = matcher
+        return matcher
+    
+    def invalidate_ruleset(self, guild_id=None):
+        """Drop compiled rulesets so they are rebuilt from the current settings"""
+        if guild_id is None:
+            self.rulesets.clear()
+        else:
+            self.rulesets.pop(guild_id, None)
+    
+    async def cog_before_invoke(self, ctx):
+        """Make sure the guild's settings are loaded before a settings command runs"""
+        if ctx.guild:
+            await self.get_settings(ctx.guild.id)
+    
+    async def cog_after_invoke(self, ctx):
+        """Persist the guild's settings and recompile its ruleset after a settings command runs"""
+        if ctx.guild:
+            self.save_settings(ctx.guild.id)
+            self.invalidate_ruleset(ctx.guild.id)
     
-    async def check_profanity(self, message, settings):
+    async def check_profanity(self, message, ruleset, features):
         """Check message for profanity/filtered words"""
-        if not settings.get('profanity_filter', {}).get('enabled', False):
-            return False
-        
-        # Get filtered words
-        filtered_words = settings.get('profanity_filter', {}).get('words', [])
-        
-        # Check for matches
-        content = message.content.lower()
-        
-        # Simple word matching (a more complex implementation would use regex patterns and word boundaries)
-        found_words = []
-        for word in filtered_words:
-            if word.lower() in content:
-                found_words.append(word)
+        # Match the whole word list in one pass over the message
+        found_words = ruleset.word_matcher.find_all(features.lower)
         
         if found_words:
             # Take action based on settings
-            action = settings.get('profanity_filter', {}).get('action', 'warn')
-            await self.take_action(message, action, 
+            await self.take_action(message, ruleset.action('profanity_filter', 'warn'), 
                                   reason=f"Filtered words detected: {', '.join(found_words)}",
                                   filter_type="profanity",
-                                  settings=settings.get('profanity_filter', {}))
+                                  settings=ruleset.rules['profanity_filter'])
             return True
         
         return False
     
-    async def check_links(self, message, settings):
+    async def check_links(self, message, ruleset, features):
         """Check message for unauthorized links"""
-        if not settings.get('link_filter', {}).get('enabled', False):
-            return False
-        
-        # Find URLs in the message
-        # This is a simple URL regex pattern - a more comprehensive one would be used in production
-        url_pattern = r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+'
-        urls = re.findall(url_pattern, message.content)
-        
-        if not urls:
+        # URLs were already extracted when the message was scanned
+        if not features.urls:
             return False
         
-        # Get allowed domains
-        allowed_domains = settings.get('link_filter', {}).get('allowed_domains', [])
-        
-        # Check if any URLs are not from allowed domains
+        # Check if any URLs are not from allowed domains (or their subdomains)
         unauthorized_urls = []
-        for url in urls:
-            is_allowed = False
-            for domain in allowed_domains:
-                if domain.lower() in url.lower():
-                    is_allowed = True
-                    break
-            
-            if not is_allowed:
+        for url, host in features.hosts:
+            if not ruleset.allowed_domains.match_host(host):
                 unauthorized_urls.append(url)
         
         if unauthorized_urls:
             # Take action based on settings
-            action = settings.get('link_filter', {}).get('action', 'warn')
-            await self.take_action(message, action, 
+            await self.take_action(message, ruleset.action('link_filter', 'warn'), 
                                   reason=f"Unauthorized links posted: {', '.join(unauthorized_urls)}",
                                   filter_type="link",
-                                  settings=settings.get('link_filter', {}))
+                                  settings=ruleset.rules['link_filter'])
             return True
         
         return False
     
-    async def check_spam(self, message, settings):
+    async def check_spam(self, message, ruleset, features):
         """Check for message spam (rate limiting)"""
-        if not settings.get('spam_protection', {}).get('enabled', False):
-            return False
-        
         # Get settings
-        message_threshold = settings.get('spam_protection', {}).get('message_threshold', 5)
-        time_threshold = settings.get('spam_protection', {}).get('time_threshold', 5)
+        message_threshold = ruleset.option('spam_protection', 'message_threshold', 5)
+        time_threshold = ruleset.option('spam_protection', 'time_threshold', 5)
         
-        # Get or create user's message history
+        # Get or create the guild's rate limiter
         guild_id = message.guild.id
         user_id = message.author.id
         
-        # Add current message timestamp
-        now = datetime.datetime.now()
-        self.user_message_times[guild_id][user_id].append(now)
-        
-        # Keep only messages within the time window
-        cutoff_time = now - datetime.timedelta(seconds=time_threshold)
-        self.user_message_times[guild_id][user_id] = deque(
-            [t for t in self.user_message_times[guild_id][user_id] if t > cutoff_time],
-            maxlen=100
-        )
-        
-        # Check if number of messages exceeds threshold
-        recent_messages = len(self.user_message_times[guild_id][user_id])
+        limiter = self.spam_limiters.get(guild_id)
+        if limiter is None:
+            limiter = self.spam_limiters[guild_id] = SlidingWindowLimiter(
+                message_threshold, time_threshold, max_keys=SPAM_TRACKED_USERS_PER_GUILD
+            )
+        else:
+            limiter.configure(message_threshold, time_threshold)
         
-        if recent_messages >= message_threshold:
+        # Record the message and check if the threshold was reached within the window
+        if limiter.hit(user_id):
             # Take action based on settings
-            action = settings.get('spam_protection', {}).get('action', 'mute')
-            await self.take_action(message, action, 
-                                  reason=f"Message spam detected: {recent_messages} messages in {time_threshold} seconds",
+            await self.take_action(message, ruleset.action('spam_protection', 'mute'), 
+                                  reason=f"Message spam detected: {message_threshold} messages in {time_threshold} seconds",
                                   filter_type="spam",
-                                  settings=settings.get('spam_protection', {}))
+                                  settings=ruleset.rules['spam_protection'])
             
             # Clear the user's message history to avoid multiple triggers
-            self.user_message_times[guild_id][user_id].clear()
+            limiter.reset(user_id)
             return True
         
         return False
     
-    async def check_caps(self, message, settings):
+    async def check_caps(self, message, ruleset, features):
         """Check for excessive caps usage"""
-        if not settings.get('caps_filter', {}).get('enabled', False):
-            return False
-        
         # Get settings
-        threshold = settings.get('caps_filter', {}).get('threshold', 70)
-        min_length = settings.get('caps_filter', {}).get('min_length', 8)
+        threshold = ruleset.option('caps_filter', 'threshold', 70)
+        min_length = ruleset.option('caps_filter', 'min_length', 8)
         
         # Skip short messages
-        if len(message.content) < min_length:
+        if features.length < min_length:
             return False
         
-        # Count uppercase letters
-        uppercase_count = sum(1 for c in message.content if c.isupper())
-        letter_count = sum(1 for c in message.content if c.isalpha())
-        
-        # Skip messages with few letters
+        # Skip messages with few letters (letters were counted during the scan)
+        letter_count = features.letter_count
         if letter_count < min_length:
             return False
         
         # Calculate percentage
-        caps_percentage = (uppercase_count / letter_count) * 100
+        caps_percentage = (features.uppercase_count / letter_count) * 100
         
         if caps_percentage >= threshold:
             # Take action based on settings
-            action = settings.get('caps_filter', {}).get('action', 'warn')
-            await self.take_action(message, action, 
+            await self.take_action(message, ruleset.action('caps_filter', 'warn'), 
                                   reason=f"Excessive caps usage: {caps_percentage:.1f}% of letters are uppercase",
                                   filter_type="caps",
-                                  settings=settings.get('caps_filter', {}))
+                                  settings=ruleset.rules['caps_filter'])
             return True
         
         return False
     
-    async def check_mention_spam(self, message, settings):
+    async def check_mention_spam(self, message, ruleset, features):
         """Check for mention spam"""
-        if not settings.get('mention_spam', {}).get('enabled', False):
-            return False
-        
-        # Get settings
-        threshold = settings.get('mention_spam', {}).get('threshold', 5)
-        
-        # Count user mentions
-        mention_count = len(message.mentions)
-        
-        # Count role mentions
-        mention_count += len(message.role_mentions)
+        # User and role mentions were counted during the scan
+        mention_count = features.mention_count
         
-        if mention_count >= threshold:
+        if mention_count >= ruleset.option('mention_spam', 'threshold', 5):
             # Take action based on settings
-            action = settings.get('mention_spam', {}).get('action', 'mute')
-            await self.take_action(message, action, 
+            await self.take_action(message, ruleset.action('mention_spam', 'mute'), 
                                   reason=f"Mention spam detected: {mention_count} mentions in a single message",
                                   filter_type="mention_spam",
-                                  settings=settings.get('mention_spam', {}))
+                                  settings=ruleset.rules['mention_spam'])
             return True
         
         return False
     
     async def take_action(self, message, action, reason, filter_type, settings):
-        """Take moderation action based on violation type and settings"""
+        """Take moderation action based on violation type and settings
+        
+        The REST calls are queued and sent in batches by the action queue, so
+        the message handler never waits on Discord.
+        """
         # Log the violation
         logger.info(f"Auto-mod triggered: {filter_type} in {message.guild.name} ({message.guild.id}) by {message.author} ({message.author.id}): {reason}")
         
         # Delete message if needed (for most actions)
         if action != "none":
-            try:
-                await message.delete()
-            except discord.errors.NotFound:
-                pass  # Message may have been deleted already
-            except discord.errors.Forbidden:
-                logger.warning(f"Missing permissions to delete message in {message.guild.name}")
+            self.actions.delete(message)
         
         # Track warnings
         guild_id = message.guild.id
         user_id = message.author.id
         
         if action == "warn":
-            # Increment warning count
-            self.user_warns[guild_id][user_id] += 1
-            warn_count = self.user_warns[guild_id][user_id]
+            # Increment warning count (older warnings decay over time)
+            warn_count = self.warnings.add(guild_id, user_id, decay=settings.get('warn_decay', WARN_DECAY_SECONDS))
             
             # Get warning threshold for escalation
             warn_threshold = settings.get('warn_threshold', 3)
             
-            # Send warning message
-            try:
-                await message.channel.send(
-                    f"{message.author.mention} Warning ({warn_count}/{warn_threshold}): {reason}",
-                    delete_after=10
-                )
-            except discord.errors.Forbidden:
-                pass
+            # Send warning message (merged with the channel's other warnings)
+            self.actions.notice(message.channel, f"{message.author.mention} Warning ({warn_count}/{warn_threshold}): {reason}")
             
             # Check if we should escalate after multiple warnings
             if warn_count >= warn_threshold:
                 # Reset warnings
-                self.user_warns[guild_id][user_id] = 0
+                self.warnings.reset(guild_id, user_id)
                 
                 # Escalate to mute
                 await self.take_action(message, "mute", 
@@ -448,472 +473,341 @@ class AutoMod(commands.Cog):
             # Get mute duration
             duration = settings.get('mute_duration', 300)  # Default 5 minutes
             
-            try:
-                # Apply timeout (Discord's version of mute)
-                until = discord.utils.utcnow() + datetime.timedelta(seconds=duration)
-                await message.author.timeout(until=until, reason=reason)
-                
-                # Notify channel
-                await message.channel.send(
-                    f"{message.author.mention} has been muted for {duration // 60} minutes: {reason}",
-                    delete_after=10
-                )
-            except discord.errors.Forbidden:
-                logger.warning(f"Missing permissions to timeout user in {message.guild.name}")
+            # Apply timeout (Discord's version of mute) and notify the channel once it is applied
+            self.actions.timeout(message.author, duration, reason, channel=message.channel,
+                                 notice=f"{message.author.mention} has been muted for {duration // 60} minutes: {reason}")
         
         elif action == "kick":
-            try:
-                # Try to DM the user first
-                try:
-                    await message.author.send(f"You have been kicked from {message.guild.name}: {reason}")
-                except:
-                    pass  # Can't DM
-                
-                # Kick the user
-                await message.guild.kick(message.author, reason=reason)
-                
-                # Notify channel
-                await message.channel.send(
-                    f"{message.author} has been kicked: {reason}",
-                    delete_after=10
-                )
-            except discord.errors.Forbidden:
-                logger.warning(f"Missing permissions to kick user in {message.guild.name}")
+            # Kick the user (they are DMed first) and notify the channel
+            self.actions.remove("kick", message.author, reason, channel=message.channel,
+                                notice=f"{message.author} has been kicked: {reason}")
         
         elif action == "ban":
-            try:
-                # Try to DM the user first
-                try:
-                    await message.author.send(f"You have been banned from {message.guild.name}: {reason}")
-                except:
-                    pass  # Can't DM
-                
-                # Ban the user
-                await message.guild.ban(message.author, reason=reason, delete_message_days=1)
-                
-                # Notify channel
-                await message.channel.send(
-                    f"{message.author} has been banned: {reason}",
-                    delete_after=10
-                )
-            except discord.errors.Forbidden:
-                logger.warning(f"Missing permissions to ban user in {message.guild.name}")
+            # Ban the user (they are DMed first) and notify the channel
+            self.actions.remove("ban", message.author, reason, channel=message.channel,
+                                notice=f"{message.author} has been banned: {reason}")
     
-    async def check_phishing(self, message, settings):
+    async def check_phishing(self, message, ruleset, features):
         """Check message for phishing links"""
-        if not settings.get('anti_phishing', {}).get('enabled', False):
+        # URLs were already extracted when the message was scanned
+        if not features.urls:
             return False
-            
-        # Find URLs in the message
-        url_pattern = r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+'
-        urls = re.findall(url_pattern, message.content)
         
-        if not urls:
-            return False
+        # Check the host against known phishing domains and the loaded blocklist
+        for url, host in features.hosts:
+            if PHISHING_INDEX.match_host(host) or self.domain_blocklist.match_host(host):
+                action = ruleset.action('anti_phishing', 'delete')
+                
+                # Notify moderators if enabled
+                if ruleset.option('anti_phishing', 'notify_mods', True):
+                    try:
+                        # Try to find a log channel
+                        log_channel_id = ruleset.log_channel_id
+                        if log_channel_id:
+                            log_channel = message.guild.get_channel(log_channel_id)
+                            if log_channel:
+                                embed = discord.Embed(
+                                    title="⚠️ Phishing Link Detected",
+                                    description=f"User {message.author.mention} posted a potential phishing link",
+                                    color=discord.Color.red(),
+                                    timestamp=discord.utils.utcnow()
+                                )
+                                embed.add_field(name="Channel", value=message.channel.mention)
+                                embed.add_field(name="Content", value=message.content[:1000] if len(message.content) <= 1000 else f"{message.content[:997]}...")
+                                embed.add_field(name="Detected URL", value=url)
+                                embed.set_footer(text=f"User ID: {message.author.id}")
+                                
+                                self.log_sink.log(log_channel, embed)
+                    except Exception as e:
+                        logger.error(f"Failed to send phishing notification: {e}")
+                
+                await self.take_action(message, action,
+                                     reason=f"Potential phishing link detected: {url}",
+                                     filter_type="phishing",
+                                     settings=ruleset.rules['anti_phishing'])
+                return True
         
-        # Check against known phishing domains
-        for url in urls:
-            url_lower = url.lower()
+        return False
+    
+    async def check_token_grabber(self, message, ruleset, features):
+        """Check message for potential Discord token grabbers"""
+        # One combined search; the literal prefilter skips most clean messages
+        if TOKEN_GRABBER_SET.search(features.content):
+            action = ruleset.action('anti_token_grabber', 'delete')
             
-            # Common phishing patterns
-            phishing_patterns = [
-                "discord-nitro", "free-nitro", "steam-gift", "nitrogift",
-                "steamgiveaway", "discordgift", "gift.com", "discord.gift", 
-                "discocrd", "dlscord", "discorb"
-            ]
+            # Notify moderators if enabled
+            if ruleset.option('anti_token_grabber', 'notify_mods', True):
+                try:
+                    # Similar notification code as in check_phishing
+                    log_channel_id = ruleset.log_channel_id
+                    if log_channel_id:
+                        log_channel = message.guild.get_channel(log_channel_id)
+                        if log_channel:
+                            embed = discord.Embed(
+                                title="⚠️ Potential Token Grabber Detected",
+                                description=f"User {message.author.mention} posted a potential token grabber",
+                                color=discord.Color.red(),
+                                timestamp=discord.utils.utcnow()
+                            )
+                            embed.add_field(name="Channel", value=message.channel.mention)
+                            embed.add_field(name="Content", value=message.content[:1000] if len(message.content) <= 1000 else f"{message.content[:997]}...")
+                            embed.set_footer(text=f"User ID: {message.author.id}")
+                            
+                            self.log_sink.log(log_channel, embed)
+                except Exception as e:
+                    logger.error(f"Failed to send token grabber notification: {e}")
             
-            for pattern in phishing_patterns:
-                if pattern in url_lower:
-                    action = settings.get('anti_phishing', {}).get('action', 'delete')
-                    
-                    # Notify moderators if enabled
-                    if settings.get('anti_phishing', {}).get('notify_mods', True):
-                        try:
-                            # Try to find a log channel
-                            log_channel_id = settings.get('logging', {}).get('log_channel')
-                            if log_channel_id:
-                                log_channel = message.guild.get_channel(log_channel_id)
-                                if log_channel:
-                                    embed = discord.Embed(
-                                        title="⚠️ Phishing Link Detected",
-                                        description=f"User {message.author.mention} posted a potential phishing link",
-                                        color=discord.Color.red(),
-                                        timestamp=discord.utils.utcnow()
-                                    )
-                                    embed.add_field(name="Channel", value=message.channel.mention)
-                                    embed.add_field(name="Content", value=message.content[:1000] if len(message.content) <= 1000 else f"{message.content[:997]}...")
-                                    embed.add_field(name="Detected URL", value=url)
-                                    embed.set_footer(text=f"User ID: {message.author.id}")
-                                    
-                                    await log_channel.send(embed=embed)
-                        except Exception as e:
-                            logger.error(f"Failed to send phishing notification: {e}")
-                    
-                    await self.take_action(message, action, 
-                                         reason=f"Potential phishing link detected: {url}",
-                                         filter_type="phishing",
-                                         settings=settings.get('anti_phishing', {}))
-                    return True
+            await self.take_action(message, action,
+                                 reason="Potential token grabber detected",
+                                 filter_type="token_grabber",
+                                 settings=ruleset.rules['anti_token_grabber'])
+            return True
         
         return False
     
-    async def check_token_grabber(self, message, settings):
-        """Check message for potential Discord token grabbers"""
-        if not settings.get('anti_token_grabber', {}).get('enabled', False):
+    async def check_ip_grabber(self, message, ruleset, features):
+        """Check message for potential IP grabbers/loggers"""
+        # URLs were already extracted when the message was scanned
+        if not features.urls:
             return False
-            
-        # Token grabber patterns (JavaScript code snippets that might steal tokens)
-        patterns = [
-            r'localStorage\.getItem\([\'"]token[\'"]\)',
-            r'localStorage\[[\'"]token[\'"]\]',
-            r'document\.cookie',
-            r'\.send\(.*token',
-            r'\.post\(.*token',
-            r'\.get\(.*token'
-        ]
-        
-        for pattern in patterns:
-            if re.search(pattern, message.content):
-                action = settings.get('anti_token_grabber', {}).get('action', 'delete')
+        
+        for url, host in features.hosts:
+            # Only the host is checked, so a path mentioning a domain does not match
+            if IP_GRABBER_INDEX.match_host(host):
+                action = ruleset.action('anti_ip_grabber', 'delete')
                 
                 # Notify moderators if enabled
-                if settings.get('anti_token_grabber', {}).get('notify_mods', True):
+                if ruleset.option('anti_ip_grabber', 'notify_mods', True):
                     try:
                         # Similar notification code as in check_phishing
-                        log_channel_id = settings.get('logging', {}).get('log_channel')
+                        log_channel_id = ruleset.log_channel_id
                         if log_channel_id:
                             log_channel = message.guild.get_channel(log_channel_id)
                             if log_channel:
                                 embed = discord.Embed(
-                                    title="⚠️ Potential Token Grabber Detected",
-                                    description=f"User {message.author.mention} posted a potential token grabber",
+                                    title="⚠️ Potential IP Grabber Detected",
+                                    description=f"User {message.author.mention} posted a potential IP grabber link",
                                     color=discord.Color.red(),
                                     timestamp=discord.utils.utcnow()
                                 )
                                 embed.add_field(name="Channel", value=message.channel.mention)
                                 embed.add_field(name="Content", value=message.content[:1000] if len(message.content) <= 1000 else f"{message.content[:997]}...")
+                                embed.add_field(name="Detected URL", value=url)
                                 embed.set_footer(text=f"User ID: {message.author.id}")
                                 
-                                await log_channel.send(embed=embed)
+                                self.log_sink.log(log_channel, embed)
                     except Exception as e:
-                        logger.error(f"Failed to send token grabber notification: {e}")
+                        logger.error(f"Failed to send IP grabber notification: {e}")
                 
-                await self.take_action(message, action, 
-                                     reason=f"Potential token grabber detected",
-                                     filter_type="token_grabber",
-                                     settings=settings.get('anti_token_grabber', {}))
+                await self.take_action(message, action,
+                                     reason=f"Potential IP grabber detected: {url}",
+                                     filter_type="ip_grabber",
+                                     settings=ruleset.rules['anti_ip_grabber'])
                 return True
         
         return False
     
-    async def check_ip_grabber(self, message, settings):
-        """Check message for potential IP grabbers/loggers"""
-        if not settings.get('anti_ip_grabber', {}).get('enabled', False):
-            return False
-            
-        # Find URLs in the message
-        url_pattern = r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+'
-        urls = re.findall(url_pattern, message.content)
-        
-        if not urls:
-            return False
-        
-        # Known IP grabber domains
-        suspicious_domains = [
-            "grabify", "iplogger", "ipgrabber", "iplist", "2no", "yip", "ps3cfw",
-            "linkspy", "iptrack", "ip-tracker", "logger", "ipsniff", "ip-sniff",
-            "webresolver", "whatismyip", "blasze", "grabify.link", "iplogger.org"
-        ]
+    async def check_scam(self, message, ruleset, features):
+        """Check message for scam content"""
+        # Check for scam patterns in message content
+        content_lower = features.lower
         
-        for url in urls:
-            url_lower = url.lower()
+        # One combined search; the named group tells us which pattern fired
+        pattern = SCAM_SET.search(content_lower) or ruleset.scam_patterns.search(content_lower)
+        if pattern:
+            action = ruleset.action('scam_detection', 'delete')
             
-            for domain in suspicious_domains:
-                if domain in url_lower:
-                    action = settings.get('anti_ip_grabber', {}).get('action', 'delete')
-                    
-                    # Notify moderators if enabled
-                    if settings.get('anti_ip_grabber', {}).get('notify_mods', True):
-                        try:
-                            # Similar notification code as in check_phishing
-                            log_channel_id = settings.get('logging', {}).get('log_channel')
-                            if log_channel_id:
-                                log_channel = message.guild.get_channel(log_channel_id)
-                                if log_channel:
-                                    embed = discord.Embed(
-                                        title="⚠️ Potential IP Grabber Detected",
-                                        description=f"User {message.author.mention} posted a potential IP grabber link",
-                                        color=discord.Color.red(),
-                                        timestamp=discord.utils.utcnow()
-                                    )
-                                    embed.add_field(name="Channel", value=message.channel.mention)
-                                    embed.add_field(name="Content", value=message.content[:1000] if len(message.content) <= 1000 else f"{message.content[:997]}...")
-                                    embed.add_field(name="Detected URL", value=url)
-                                    embed.set_footer(text=f"User ID: {message.author.id}")
-                                    
-                                    await log_channel.send(embed=embed)
-                        except Exception as e:
-                            logger.error(f"Failed to send IP grabber notification: {e}")
-                    
-                    await self.take_action(message, action, 
-                                         reason=f"Potential IP grabber detected: {url}",
-                                         filter_type="ip_grabber",
-                                         settings=settings.get('anti_ip_grabber', {}))
-                    return True
-        
-        return False
-    
-    async def check_scam(self, message, settings):
-        """Check message for scam content"""
-        if not settings.get('scam_detection', {}).get('enabled', False):
-            return False
+            # Notify admins if enabled
+            if ruleset.option('scam_detection', 'notify_admins', True):
+                try:
+                    log_channel_id = ruleset.log_channel_id
+                    if log_channel_id:
+                        log_channel = message.guild.get_channel(log_channel_id)
+                        if log_channel:
+                            embed = discord.Embed(
+                                title="⚠️ Potential Scam Detected",
+                                description=f"User {message.author.mention} posted a message matching scam patterns",
+                                color=discord.Color.red(),
+                                timestamp=discord.utils.utcnow()
+                            )
+                            embed.add_field(name="Channel", value=message.channel.mention)
+                            embed.add_field(name="Content", value=message.content[:1000] if len(message.content) <= 1000 else f"{message.content[:997]}...")
+                            embed.add_field(name="Matched Pattern", value=pattern)
+                            embed.set_footer(text=f"User ID: {message.author.id}")
+                            
+                            self.log_sink.log(log_channel, embed)
+                except Exception as e:
+                    logger.error(f"Failed to send scam notification: {e}")
             
-        # Check for scam patterns in message content
-        content_lower = message.content.lower()
-        patterns = settings.get('scam_detection', {}).get('patterns', SCAM_PATTERNS)
+            await self.take_action(message, action,
+                                 reason="Potential scam detected",
+                                 filter_type="scam",
+                                 settings=ruleset.rules['scam_detection'])
+            return True
         
-        for pattern in patterns:
-            if re.search(pattern, content_lower):
-                action = settings.get('scam_detection', {}).get('action', 'delete')
+        # Check URL hosts for dangerous domains (built-in, guild and shared blocklist)
+        for url, host in features.hosts:
+            domain = (DANGEROUS_INDEX.match_host(host) or ruleset.dangerous_domains.match_host(host)
+                      or self.domain_blocklist.match_host(host))
+            if domain:
+                action = ruleset.action('scam_detection', 'delete')
                 
                 # Notify admins if enabled
-                if settings.get('scam_detection', {}).get('notify_admins', True):
+                if ruleset.option('scam_detection', 'notify_admins', True):
                     try:
-                        log_channel_id = settings.get('logging', {}).get('log_channel')
+                        log_channel_id = ruleset.log_channel_id
                         if log_channel_id:
                             log_channel = message.guild.get_channel(log_channel_id)
                             if log_channel:
                                 embed = discord.Embed(
-                                    title="⚠️ Potential Scam Detected",
-                                    description=f"User {message.author.mention} posted a message matching scam patterns",
+                                    title="⚠️ Dangerous Domain Detected",
+                                    description=f"User {message.author.mention} posted a link to a dangerous domain",
                                     color=discord.Color.red(),
                                     timestamp=discord.utils.utcnow()
                                 )
                                 embed.add_field(name="Channel", value=message.channel.mention)
                                 embed.add_field(name="Content", value=message.content[:1000] if len(message.content) <= 1000 else f"{message.content[:997]}...")
-                                embed.add_field(name="Matched Pattern", value=pattern)
+                                embed.add_field(name="Dangerous Domain", value=domain)
+                                embed.add_field(name="Full URL", value=url)
                                 embed.set_footer(text=f"User ID: {message.author.id}")
                                 
-                                await log_channel.send(embed=embed)
+                                self.log_sink.log(log_channel, embed)
                     except Exception as e:
-                        logger.error(f"Failed to send scam notification: {e}")
+                        logger.error(f"Failed to send dangerous domain notification: {e}")
                 
-                await self.take_action(message, action, 
-                                     reason=f"Potential scam detected",
-                                     filter_type="scam",
-                                     settings=settings.get('scam_detection', {}))
+                await self.take_action(message, action,
+                                     reason=f"Dangerous domain detected: {url}",
+                                     filter_type="dangerous_domain",
+                                     settings=ruleset.rules['scam_detection'])
                 return True
         
-        # Check URLs for dangerous domains
-        url_pattern = r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+'
-        urls = re.findall(url_pattern, message.content)
-        
-        if urls:
-            dangerous_domains = settings.get('scam_detection', {}).get('dangerous_domains', DANGEROUS_DOMAINS)
-            
-            for url in urls:
-                url_lower = url.lower()
-                
-                for domain in dangerous_domains:
-                    if domain in url_lower:
-                        action = settings.get('scam_detection', {}).get('action', 'delete')
-                        
-                        # Notify admins if enabled
-                        if settings.get('scam_detection', {}).get('notify_admins', True):
-                            try:
-                                log_channel_id = settings.get('logging', {}).get('log_channel')
-                                if log_channel_id:
-                                    log_channel = message.guild.get_channel(log_channel_id)
-                                    if log_channel:
-                                        embed = discord.Embed(
-                                            title="⚠️ Dangerous Domain Detected",
-                                            description=f"User {message.author.mention} posted a link to a dangerous domain",
-                                            color=discord.Color.red(),
-                                            timestamp=discord.utils.utcnow()
-                                        )
-                                        embed.add_field(name="Channel", value=message.channel.mention)
-                                        embed.add_field(name="Content", value=message.content[:1000] if len(message.content) <= 1000 else f"{message.content[:997]}...")
-                                        embed.add_field(name="Dangerous Domain", value=domain)
-                                        embed.add_field(name="Full URL", value=url)
-                                        embed.set_footer(text=f"User ID: {message.author.id}")
-                                        
-                                        await log_channel.send(embed=embed)
-                            except Exception as e:
-                                logger.error(f"Failed to send dangerous domain notification: {e}")
-                        
-                        await self.take_action(message, action, 
-                                             reason=f"Dangerous domain detected: {url}",
-                                             filter_type="dangerous_domain",
-                                             settings=settings.get('scam_detection', {}))
-                        return True
-        
         return False
     
-    async def check_invites(self, message, settings):
+    async def check_invites(self, message, ruleset, features):
         """Check message for Discord invite links"""
-        if not settings.get('invite_filter', {}).get('enabled', False):
-            return False
-            
-        # Find Discord invite links
-        invite_pattern = r'(?:https?://)?(?:www\.)?(?:discord\.(?:gg|io|me|li|com)/|discordapp\.com/invite/)([a-zA-Z0-9-]+)'
-        invites = re.findall(invite_pattern, message.content)
-        
-        if not invites:
+        # Invite codes were already extracted when the message was scanned
+        if not features.invites:
             return False
         
         # Get whitelist
-        whitelist = settings.get('invite_filter', {}).get('whitelist', [])
-        allow_partnered = settings.get('invite_filter', {}).get('allow_partnered', True)
+        whitelist = ruleset.invite_whitelist
+        allow_partnered = ruleset.option('invite_filter', 'allow_partnered', True)
         
-        # Check each invite
-        for invite_code in invites:
+        # Check each distinct invite
+        for invite_code in dict.fromkeys(features.invites):
             try:
-                # Fetch the invite to get the guild
-                invite = await self.bot.fetch_invite(invite_code)
+                # Resolve the invite to get the guild (cached, and shared with concurrent lookups)
+                invite = await self.invite_cache.resolve(invite_code)
+                
+                # Invalid invite (or a group DM invite), could still take action here
+                if invite is None or invite.guild_id is None:
+                    continue
                 
                 # Skip if this server's invite
-                if invite.guild.id == message.guild.id:
+                if invite.guild_id == message.guild.id:
                     continue
                 
                 # Skip if whitelisted
-                if str(invite.guild.id) in whitelist:
+                if str(invite.guild_id) in whitelist:
                     continue
                 
                 # Skip if partnered/verified and allowed
-                if allow_partnered and (invite.guild.features and 
-                                       ("PARTNERED" in invite.guild.features or 
-                                        "VERIFIED" in invite.guild.features)):
+                if allow_partnered and ("PARTNERED" in invite.features or "VERIFIED" in invite.features):
                     continue
                 
                 # Otherwise, take action
-                action = settings.get('invite_filter', {}).get('action', 'delete')
-                await self.take_action(message, action, 
-                                     reason=f"Unauthorized Discord invite: {invite.guild.name}",
+                await self.take_action(message, ruleset.action('invite_filter', 'delete'),
+                                     reason=f"Unauthorized Discord invite: {invite.guild_name}",
                                      filter_type="invite",
-                                     settings=settings.get('invite_filter', {}))
+                                     settings=ruleset.rules['invite_filter'])
                 return True
-                
-            except discord.NotFound:
-                # Invalid invite, could still take action here
-                pass
+            
             except Exception as e:
                 logger.error(f"Error checking invite: {e}")
         
         return False
     
-    async def check_repeated_text(self, message, settings):
-        """Check for repeated text/characters"""
-        if not settings.get('repeated_text', {}).get('enabled', False):
-            return False
-            
-        content = message.content
+    async def fetch_invite_info(self, invite_code):
+        """Fetch an invite from Discord and keep only what the invite filter needs"""
+        invite = await self.rest.run(NORMAL, "invites", self.bot.fetch_invite, invite_code, with_counts=False)
         
-        # Check for repeated characters (like "aaaaaaaa")
-        threshold = settings.get('repeated_text', {}).get('threshold', 4)
+        if invite.guild is None:
+            return ResolvedInvite(None, None, frozenset())
         
-        # Find sequences of 4+ repeated characters
-        repeated_chars = re.findall(r'(.)\1{' + str(threshold-1) + ',}', content)
+        features = getattr(invite.guild, 'features', None) or ()
+        return ResolvedInvite(invite.guild.id, invite.guild.name, frozenset(features))
+    
+    async def check_repeated_text(self, message, ruleset, features):
+        """Check for repeated text/characters"""
+        # Check for repeated characters (like "aaaaaaaa")
+        threshold = ruleset.option('repeated_text', 'threshold', 4)
         
-        if repeated_chars:
-            action = settings.get('repeated_text', {}).get('action', 'warn')
-            await self.take_action(message, action, 
+        # The longest run of one character was measured during the scan
+        if features.longest_run >= threshold:
+            await self.take_action(message, ruleset.action('repeated_text', 'warn'),
                                  reason=f"Message contains excessive repetition",
                                  filter_type="repeated_text",
-                                 settings=settings.get('repeated_text', {}))
+                                 settings=ruleset.rules['repeated_text'])
             return True
         
-        # Check for repeated words
-        words = re.findall(r'\b(\w+)\b', content.lower())
-        if len(words) >= threshold:
-            # Count word occurrences
-            word_counts = {}
-            for word in words:
-                if len(word) >= 3:  # Only check words with 3+ chars
-                    word_counts[word] = word_counts.get(word, 0) + 1
-            
-            # Check if any word appears too many times
-            for word, count in word_counts.items():
-                if count >= threshold:
-                    action = settings.get('repeated_text', {}).get('action', 'warn')
-                    await self.take_action(message, action, 
-                                         reason=f"Message contains repeated text ('{word}' used {count} times)",
-                                         filter_type="repeated_text",
-                                         settings=settings.get('repeated_text', {}))
-                    return True
+        # Check for repeated words (only words with 3+ chars are counted)
+        for word, count in features.word_counts.items():
+            if count >= threshold:
+                await self.take_action(message, ruleset.action('repeated_text', 'warn'),
+                                     reason=f"Message contains repeated text ('{word}' used {count} times)",
+                                     filter_type="repeated_text",
+                                     settings=ruleset.rules['repeated_text'])
+                return True
         
         return False
     
-    async def check_zalgo(self, message, settings):
+    async def check_zalgo(self, message, ruleset, features):
         """Check for zalgo text (text with excessive combining characters)"""
-        if not settings.get('zalgo_text', {}).get('enabled', False):
-            return False
-            
-        # Zalgo detection: check for combining characters
-        zalgo_pattern = r'[\u0300-\u036F\u0489]{3,}'
-        
-        if re.search(zalgo_pattern, message.content):
-            action = settings.get('zalgo_text', {}).get('action', 'delete')
-            await self.take_action(message, action, 
+        # Zalgo detection: 3+ combining characters in a row
+        if features.longest_combining_run >= 3:
+            await self.take_action(message, ruleset.action('zalgo_text', 'delete'),
                                  reason="Zalgo text detected",
                                  filter_type="zalgo",
-                                 settings=settings.get('zalgo_text', {}))
+                                 settings=ruleset.rules['zalgo_text'])
             return True
-            
+        
         return False
     
-    async def check_emoji_spam(self, message, settings):
+    async def check_emoji_spam(self, message, ruleset, features):
         """Check for excessive use of emojis"""
-        if not settings.get('emoji_spam', {}).get('enabled', False):
-            return False
-            
-        # Emoji patterns
-        standard_emoji = r'[\U0001F000-\U0001F9FF]|\u200d|\u2600-\u27FF'
-        custom_emoji = r'<a?:[a-zA-Z0-9_]+:[0-9]+>'
-        
-        # Find all emojis in the message
-        standard_matches = re.findall(standard_emoji, message.content)
-        custom_matches = re.findall(custom_emoji, message.content)
-        
-        emoji_count = len(standard_matches) + len(custom_matches)
+        # Emojis were counted during the scan
+        emoji_count = features.emoji_count
         
         # Get settings
-        threshold = settings.get('emoji_spam', {}).get('threshold', 6)
-        percentage_threshold = settings.get('emoji_spam', {}).get('percentage_threshold', 50)
+        threshold = ruleset.option('emoji_spam', 'threshold', 6)
+        percentage_threshold = ruleset.option('emoji_spam', 'percentage_threshold', 50)
         
         # Check against threshold
         if emoji_count >= threshold:
-            action = settings.get('emoji_spam', {}).get('action', 'warn')
-            await self.take_action(message, action, 
+            await self.take_action(message, ruleset.action('emoji_spam', 'warn'),
                                  reason=f"Emoji spam detected ({emoji_count} emojis)",
                                  filter_type="emoji_spam",
-                                 settings=settings.get('emoji_spam', {}))
+                                 settings=ruleset.rules['emoji_spam'])
             return True
         
         # Check emoji density (percentage of message)
-        if message.content and len(message.content) > 0:
-            # Calculate characters used by emojis
-            emoji_chars = sum(len(match) for match in standard_matches) + sum(len(match) for match in custom_matches)
-            
-            # Calculate percentage
-            emoji_percentage = (emoji_chars / len(message.content)) * 100
+        if emoji_count and features.length > 0:
+            # Calculate percentage of characters used by emojis
+            emoji_percentage = (features.emoji_chars / features.length) * 100
             
             if emoji_percentage >= percentage_threshold:
-                action = settings.get('emoji_spam', {}).get('action', 'warn')
-                await self.take_action(message, action, 
+                await self.take_action(message, ruleset.action('emoji_spam', 'warn'),
                                      reason=f"High emoji density ({emoji_percentage:.1f}% of message)",
                                      filter_type="emoji_spam",
-                                     settings=settings.get('emoji_spam', {}))
+                                     settings=ruleset.rules['emoji_spam'])
                 return True
-                
+        
         return False
     
-    async def check_new_account(self, message, settings):
+    async def check_new_account(self, message, ruleset, features):
         """Check for new Discord accounts"""
-        if not settings.get('new_account_filter', {}).get('enabled', False):
-            return False
-            
-        min_age_days = settings.get('new_account_filter', {}).get('min_age_days', 7)
-        action = settings.get('new_account_filter', {}).get('action', 'monitor')
+        min_age_days = ruleset.option('new_account_filter', 'min_age_days', 7)
+        action = ruleset.action('new_account_filter', 'monitor')
         
         # Calculate account age
         now = discord.utils.utcnow()
@@ -923,7 +817,7 @@ class AutoMod(commands.Cog):
             # Just monitor
             if action == "monitor":
                 try:
-                    log_channel_id = settings.get('logging', {}).get('log_channel')
+                    log_channel_id = ruleset.log_channel_id
                     if log_channel_id:
                         log_channel = message.guild.get_channel(log_channel_id)
                         if log_channel:
@@ -938,35 +832,34 @@ class AutoMod(commands.Cog):
                             embed.add_field(name="Message", value=message.content[:1000] if len(message.content) <= 1000 else f"{message.content[:997]}...")
                             embed.set_footer(text=f"User ID: {message.author.id}")
                             
-                            await log_channel.send(embed=embed)
+                            self.log_sink.log(log_channel, embed)
                 except Exception as e:
                     logger.error(f"Failed to send new account notification: {e}")
-                    
+                
                 return False  # Continue processing message
             
             # Restrict to specific channels
             elif action == "restrict":
-                restricted_channels = settings.get('new_account_filter', {}).get('restricted_channels', [])
+                restricted_channels = ruleset.option('new_account_filter', 'restricted_channels', [])
                 
                 if restricted_channels and message.channel.id not in restricted_channels:
+                    self.actions.delete(message)
                     try:
-                        await message.delete()
-                        try:
-                            await message.author.send(
-                                f"Your message in {message.guild.name} was removed because your account is less than {min_age_days} days old. "
-                                f"You can only post in designated channels until your account is older."
-                            )
-                        except:
-                            pass  # Can't DM
+                        await self.rest.run(
+                            NORMAL, f"dm:{message.author.id}", message.author.send,
+                            f"Your message in {message.guild.name} was removed because your account is less than {min_age_days} days old. "
+                            f"You can only post in designated channels until your account is older."
+                        )
                     except:
-                        pass  # Can't delete
+                        pass  # Can't DM
                     
                     return True
             
             # Kick new accounts
             elif action == "kick":
                 try:
-                    await message.author.send(
+                    await self.rest.run(
+                        HIGH, f"dm:{message.author.id}", message.author.send,
                         f"You have been removed from {message.guild.name} because your account is less than {min_age_days} days old. "
                         f"Please try joining again when your account is older."
                     )
@@ -974,7 +867,8 @@ class AutoMod(commands.Cog):
                     pass  # Can't DM
                 
                 try:
-                    await message.guild.kick(
+                    await self.rest.run(
+                        CRITICAL, f"guild:{message.guild.id}", message.guild.kick,
                         message.author,
                         reason=f"Account less than {min_age_days} days old (Auto-mod)"
                     )
@@ -983,17 +877,12 @@ class AutoMod(commands.Cog):
                     logger.error(f"Failed to kick new account: {message.author.id}")
         
         return False
-        
     @commands.command(name="automod")
     @commands.has_permissions(administrator=True)
     async def automod(self, ctx, setting=None, option=None, *, value=None):
         """Configure auto-moderation settings"""
         guild = ctx.guild
         
-        # Initialize settings if they don't exist
-        if guild.id not in self.settings:
-            self.load_settings()
-        
         # Show status if no setting specified
         if not setting or setting.lower() in ["status", "check"]:
             settings = self.settings[guild.id]
@@ -1057,7 +946,7 @@ class AutoMod(commands.Cog):
         # Configure specific filters
         if setting.lower() in ["profanity", "words", "filter"]:
             if not option:
-                await ctx.send("⚠️ Please specify an option: `on`, `off`, `action`, `list`, `add`, or `remove`.")
+                await ctx.send("⚠️ Please specify an option: `on`, `off`, `action`, `list`, `add`, `remove`, `wholewords`, or `leetspeak`.")
                 return
             
             # Toggle profanity filter on/off
@@ -1106,9 +995,12 @@ class AutoMod(commands.Cog):
                 words_to_add = [w.strip() for w in value.split(",")]
                 added = []
                 
+                profanity = self.settings[guild.id]['profanity_filter']
                 for word in words_to_add:
-                    if word and word not in self.settings[guild.id]['profanity_filter']['words']:
-                        self.settings[guild.id]['profanity_filter']['words'].append(word)
+                    if word and word not in profanity['words']:
+                        # Defaults are immutable, so write a new tuple into the guild's overrides
+                        profanity['words'] = profanity['words'] + (word,)
+                        self.get_word_matcher(guild.id).add(word)
                         added.append(word)
                 
                 if added:
@@ -1125,9 +1017,11 @@ class AutoMod(commands.Cog):
                 words_to_remove = [w.strip() for w in value.split(",")]
                 removed = []
                 
+                profanity = self.settings[guild.id]['profanity_filter']
                 for word in words_to_remove:
-                    if word and word in self.settings[guild.id]['profanity_filter']['words']:
-                        self.settings[guild.id]['profanity_filter']['words'].remove(word)
+                    if word and word in profanity['words']:
+                        profanity['words'] = tuple(w for w in profanity['words'] if w != word)
+                        self.get_word_matcher(guild.id).remove(word)
                         removed.append(word)
                 
                 if removed:
@@ -1135,8 +1029,36 @@ class AutoMod(commands.Cog):
                 else:
                     await ctx.send("⚠️ None of the specified words were found in the filter.")
             
+            # Toggle whole-word matching
+            elif option.lower() in ["wholewords", "whole_words", "boundaries"]:
+                if not value or value.lower() not in ["on", "off", "enable", "disable", "true", "false", "yes", "no"]:
+                    await ctx.send("⚠️ Please specify `on` or `off`.")
+                    return
+                
+                whole_words = value.lower() in ["on", "enable", "true", "yes"]
+                self.settings[guild.id]['profanity_filter']['whole_words'] = whole_words
+                
+                if whole_words:
+                    await ctx.send("✅ Profanity filter will only match **whole words**.")
+                else:
+                    await ctx.send("✅ Profanity filter will match words **anywhere** in a message.")
+            
+            # Toggle leetspeak normalization
+            elif option.lower() in ["leetspeak", "leet", "normalize"]:
+                if not value or value.lower() not in ["on", "off", "enable", "disable", "true", "false", "yes", "no"]:
+                    await ctx.send("⚠️ Please specify `on` or `off`.")
+                    return
+                
+                normalize = value.lower() in ["on", "enable", "true", "yes"]
+                self.settings[guild.id]['profanity_filter']['normalize_leetspeak'] = normalize
+                
+                if normalize:
+                    await ctx.send("✅ Leetspeak normalization has been **enabled** (e.g. `$h1t` matches `shit`).")
+                else:
+                    await ctx.send("❌ Leetspeak normalization has been **disabled**.")
+            
             else:
-                await ctx.send("⚠️ Invalid option. Please use `on`, `off`, `action`, `list`, `add`, or `remove`.")
+                await ctx.send("⚠️ Invalid option. Please use `on`, `off`, `action`, `list`, `add`, `remove`, `wholewords`, or `leetspeak`.")
         
         # Configure link filter
         elif setting.lower() in ["links", "link", "urls"]:
@@ -1186,9 +1108,11 @@ class AutoMod(commands.Cog):
                 domains_to_add = [d.strip() for d in value.split(",")]
                 added = []
                 
+                link_filter = self.settings[guild.id]['link_filter']
                 for domain in domains_to_add:
-                    if domain and domain not in self.settings[guild.id]['link_filter']['allowed_domains']:
-                        self.settings[guild.id]['link_filter']['allowed_domains'].append(domain)
+                    if domain and domain not in link_filter['allowed_domains']:
+                        # Defaults are immutable, so write a new tuple into the guild's overrides
+                        link_filter['allowed_domains'] = link_filter['allowed_domains'] + (domain,)
                         added.append(domain)
                 
                 if added:
@@ -1205,9 +1129,10 @@ class AutoMod(commands.Cog):
                 domains_to_remove = [d.strip() for d in value.split(",")]
                 removed = []
                 
+                link_filter = self.settings[guild.id]['link_filter']
                 for domain in domains_to_remove:
-                    if domain and domain in self.settings[guild.id]['link_filter']['allowed_domains']:
-                        self.settings[guild.id]['link_filter']['allowed_domains'].remove(domain)
+                    if domain and domain in link_filter['allowed_domains']:
+                        link_filter['allowed_domains'] = tuple(d for d in link_filter['allowed_domains'] if d != domain)
                         removed.append(domain)
                 
                 if removed:
@@ -1281,14 +1206,123 @@ class AutoMod(commands.Cog):
             else:
                 await ctx.send("⚠️ Invalid option. Please use `on`, `off`, `action`, `threshold`, or `window`.")
         
+        # Shared cache statistics
+        elif setting.lower() in ["stats", "cache"]:
+            invite_stats = self.invite_cache.stats()
+            
+            embed = discord.Embed(
+                title="Auto-Moderation Cache Stats",
+                color=discord.Color.blue()
+            )
+            
+            embed.add_field(
+                name="Invite Cache",
+                value=(f"Entries: {invite_stats['size']}/{invite_stats['max_size']}\n"
+                       f"Hits: {invite_stats['hits']} (+{invite_stats['negative_hits']} invalid)\n"
+                       f"Misses: {invite_stats['misses']}\n"
+                       f"Coalesced: {invite_stats['coalesced']}\n"
+                       f"Evictions: {invite_stats['evictions']}\n"
+                       f"Errors: {invite_stats['errors']}\n"
+                       f"Hit rate: {invite_stats['hit_rate'] * 100:.1f}%")
+            )
+            embed.add_field(name="Domain Blocklist", value=f"{len(self.domain_blocklist)} domains")
+            
+            # Resident tracking state
+            warn_stats = self.warnings.stats()
+            embed.add_field(
+                name="Tracked Members",
+                value=(f"Warnings: {warn_stats['entries']}/{warn_stats['max_entries']} "
+                       f"({warn_stats['evictions']} evicted, {warn_stats['expirations']} expired)\n"
+                       f"Spam windows: {sum(len(limiter) for limiter in self.spam_limiters.values())}")
+            )
+            
+            # Batched moderation actions
+            action_stats = self.actions.stats()
+            embed.add_field(
+                name="Action Queue",
+                value=(f"Pending: {action_stats['pending']} in {action_stats['active_guilds']} guild(s)\n"
+                       f"Batches: {action_stats['batches']}\n"
+                       f"Deletes: {action_stats['deletes_queued']} queued, {action_stats['bulk_deletes']} bulk + {action_stats['single_deletes']} single calls\n"
+                       f"Timeouts: {action_stats['timeouts_applied']} applied, {action_stats['timeouts_skipped']} deduplicated\n"
+                       f"Notices: {action_stats['notices_queued']} queued, {action_stats['notices_sent']} sent\n"
+                       f"Errors: {action_stats['errors']}")
+            )
+            
+            # Buffered log embeds
+            log_stats = self.log_sink.stats()
+            embed.add_field(
+                name="Log Sink",
+                value=(f"Buffered: {log_stats['buffered']} in {log_stats['channels']} channel(s)\n"
+                       f"Logged: {log_stats['logged']} in {log_stats['messages_sent']} messages\n"
+                       f"Suppressed: {log_stats['suppressed']} | Errors: {log_stats['errors']}")
+            )
+            
+            # Shared REST scheduler
+            rest_stats = self.rest.stats()
+            embed.add_field(
+                name="REST Scheduler",
+                value="\n".join(
+                    f"{name.title()}: {c['pending']} queued, avg wait {c['avg_wait'] * 1000:.0f}ms "
+                    f"(max {c['max_wait'] * 1000:.0f}ms), {c['dropped']} dropped"
+                    for name, c in rest_stats['classes'].items()
+                ) + f"\nIn flight: {rest_stats['in_flight']} | Rate limited: {rest_stats['rate_limited']}"
+            )
+            
+            await ctx.send(embed=embed)
+        
         # Unknown setting
         else:
-            await ctx.send("⚠️ Unknown setting. Available settings: `profanity`, `links`, `spam`.")
+            await ctx.send("⚠️ Unknown setting. Available settings: `profanity`, `links`, `spam`, `stats`.")
     
-    def cog_unload(self):
+    @tasks.loop(minutes=DOMAIN_BLOCKLIST_REFRESH_MINUTES)
+    async def refresh_domain_blocklist(self):
+        """Load the domain blocklist, or swap in a new copy if the feed changed"""
+        try:
+            await self.domain_blocklist.reload()
+        except Exception as e:
+            logger.error(f"Error refreshing domain blocklist: {e}")
+    
+    @tasks.loop(seconds=SPAM_SWEEP_SECONDS)
+    async def sweep_spam_limiters(self):
+        """Drop spam tracking for users with no messages inside their guild's window"""
+        for guild_id, limiter in list(self.spam_limiters.items()):
+            limiter.sweep()
+            if not limiter:
+                del self.spam_limiters[guild_id]
+    
+    @tasks.loop(minutes=WARN_SWEEP_MINUTES)
+    async def sweep_warnings(self):
+        """Drop warning records that have fully decayed, and expired timeouts"""
+        expired = self.warnings.sweep()
+        if expired:
+            logger.debug(f"Expired {expired} warning records ({len(self.warnings)} resident)")
+        
+        # Forget timeouts that have run out
+        self.actions.sweep()
+    
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        """Drop cached settings and tracking state for a guild the bot left"""
+        self.settings.pop(guild.id, None)
+        self.word_matchers.pop(guild.id, None)
+        self.invalidate_ruleset(guild.id)
+        self.store.evict(SETTINGS_NAMESPACE, guild.id)
+        self.spam_limiters.pop(guild.id, None)
+        self.warnings.clear_guild(guild.id)
+        self.actions.clear_guild(guild.id)
+    
+    async def cog_unload(self):
         """Save settings when the cog is unloaded"""
-        # In a real implementation, we would save settings to a database here
-        pass
+        # Stop the background tasks
+        self.refresh_domain_blocklist.cancel()
+        self.sweep_spam_limiters.cancel()
+        self.sweep_warnings.cancel()
+        
+        # Send queued moderation actions
+        await self.actions.close()
+        
+        # Write any settings changes that are still batched
+        await self.store.flush()
 
 async def setup(bot):
     await bot.add_cog(AutoMod(bot))
\ No newline at end of file
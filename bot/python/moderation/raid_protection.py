@@ -1,39 +1,100 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 import asyncio
-import datetime
 import logging
-from collections import deque
 import json
 import os
+import time
+
+from bot.python.utils.channel_resolver import get_channel_resolver
+from bot.python.utils.join_detector import BURST_WINDOW, JoinDetector
+from bot.python.utils.layered_settings import SettingsView, freeze_defaults, freeze_overrides
+from bot.python.utils.lockdown import (
+    LOCKDOWN_MODES, edit_overwrites, lock_role, lockdown_role, resolve_mode, restore_overwrite,
+    role_lock_exceptions, snapshot_overwrite, unlock_role
+)
+from bot.python.utils.raid_cleanup import CLEANUP_ACTIONS, RaidCleanup
+from bot.python.utils.rest_scheduler import CRITICAL, HIGH, LOW, NORMAL, get_rest_scheduler
+from bot.python.utils.settings_store import get_settings_store
+from bot.python.utils.shard_metrics import owns_guild
+from bot.python.utils.timer_scheduler import get_timer_scheduler
 
 logger = logging.getLogger('guard-shin')
 
+# Settings store namespace for this cog
+SETTINGS_NAMESPACE = 'raid_protection'
+
+# Settings store namespace for active lockdowns (original permissions and expiry)
+LOCKDOWN_NAMESPACE = 'raid_lockdown'
+
+# Seconds between edits of a raid cleanup's progress message
+CLEANUP_PROGRESS_INTERVAL = 5
+
 class RaidProtection(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.recent_joins = {}  # guild_id -> deque of join timestamps
-        self.lockdowns = {}  # guild_id -> lockdown status
-        self.settings = {}  # guild_id -> settings
-        self.load_settings()
+        self.detectors = {}  # guild_id -> JoinDetector (streaming join counts and features)
+        self.last_raid = {}  # guild_id -> when the last raid response started
+        self.cleanups = {}  # guild_id -> latest RaidCleanup
+        self.cleanup_reports = {}  # guild_id -> task keeping the cleanup's progress message updated
+        self.lockdowns = {}  # guild_id -> active lockdown (saved permissions, expiry, progress)
+        self.lockdown_locks = {}  # guild_id -> asyncio.Lock serializing lock/unlock
+        self.rest = get_rest_scheduler(bot)  # shared REST scheduler
+        self.channels = get_channel_resolver(bot)  # cached alert channel lookups
+        
+        # Lockdowns are lifted by a durable timer keyed by guild, so expiry survives restarts
+        self.timers = get_timer_scheduler(bot)
+        self.timers.register('lockdown_expiry', self.expire_lockdown)
+        self.timers.start()
+        
+        # Settings are loaded per guild on first use
+        self.store = get_settings_store(bot)
+        self.defaults = freeze_defaults(self.default_settings())  # immutable, shared by every guild
+        self.settings = {}  # guild_id -> SettingsView over the guild's overrides
+        
+        # Finish lockdowns that were still being applied when the bot stopped
+        self.resume_lockdowns.start()
     
-    def load_settings(self):
-        """Load raid protection settings from storage"""
-        # This would normally load from a database
-        # For now, we'll use default settings for all guilds
-        default_settings = {
+    def default_settings(self):
+        """Build the default raid protection settings for a guild"""
+        return {
             'enabled': True,
             'join_threshold': 10,  # Number of joins to trigger
             'time_threshold': 60,  # Time window in seconds
             'action': 'lockdown',  # lockdown, kick, ban
+            'cleanup_scope': 'suspicious',  # suspicious, all (joins in the window that kick/ban remove)
             'notification_channel': None,
             'auto_lockdown': True,
-            'lockdown_duration': 300  # 5 minutes
+            'lockdown_duration': 300,  # 5 minutes
+            'lockdown_mode': 'auto',  # auto, channels, role (auto uses role for large guilds)
+            'lockdown_role': None  # role locked in role mode (None = @everyone)
         }
-        
-        for guild in self.bot.guilds:
-            self.settings[guild.id] = default_settings.copy()
-            self.recent_joins[guild.id] = deque(maxlen=100)  # Store up to 100 recent joins
+    
+    async def get_settings(self, guild_id):
+        """Get a guild's settings, loading them from the settings store on first use"""
+        settings = self.settings.get(guild_id)
+        if settings is None:
+            stored = await self.store.load(SETTINGS_NAMESPACE, guild_id)
+            settings = self.settings.get(guild_id)
+            if settings is None:
+                settings = self.settings[guild_id] = SettingsView(self.defaults, freeze_overrides(stored))
+        return settings
+    
+    def save_settings(self, guild_id):
+        """Queue a guild's settings for a batched write to the settings store"""
+        settings = self.settings.get(guild_id)
+        if settings is not None:
+            self.store.save(SETTINGS_NAMESPACE, guild_id, settings.overrides)
+    
+    async def cog_before_invoke(self, ctx):
+        """Make sure the guild's settings are loaded before a command runs"""
+        if ctx.guild:
+            await self.get_settings(ctx.guild.id)
+    
+    async def cog_after_invoke(self, ctx):
+        """Persist any settings the command changed"""
+        if ctx.guild:
+            self.save_settings(ctx.guild.id)
     
     @commands.Cog.listener()
     async def on_member_join(self, member):
@@ -42,75 +103,224 @@ class RaidProtection(commands.Cog):
         now = discord.utils.utcnow()
         
         # Skip if raid protection is disabled for this guild
-        if not self.settings.get(guild.id, {}).get('enabled', False):
+        settings = await self.get_settings(guild.id)
+        if not settings.get('enabled', False):
             return
         
-        # Add join to recent joins
-        self.recent_joins.setdefault(guild.id, deque(maxlen=100)).append((member.id, now))
+        # Score the join (a few counter updates, whatever the join rate)
+        result = self.detector(guild.id, settings).add(member, now.timestamp())
+        
+        # Late raid joins are added to the cleanup that is already running
+        cleanup = self.cleanups.get(guild.id)
+        if cleanup is not None and not cleanup.done and not cleanup.cancelled:
+            if result.suspicious or settings.get('cleanup_scope', 'suspicious') == 'all':
+                cleanup.add([member.id])
         
         # Check for raid conditions
-        await self.check_raid_conditions(guild)
+        await self.check_raid_conditions(guild, result)
     
-    async def check_raid_conditions(self, guild):
-        """Check if current join patterns indicate a raid"""
-        settings = self.settings.get(guild.id, {})
-        if not settings.get('enabled', False):
-            return False
-        
-        # Get join threshold and time threshold from settings
+    def detector(self, guild_id, settings):
+        """Get a guild's join detector, rebuilding it when its thresholds change"""
         join_threshold = settings.get('join_threshold', 10)
-        time_threshold = settings.get('time_threshold', 60)
-        
-        # Get recent joins within the time threshold
-        now = discord.utils.utcnow()
-        recent_joins = self.recent_joins.get(guild.id, deque())
+        window = settings.get('time_threshold', 60)
+        detector = self.detectors.get(guild_id)
+        if detector is None or not detector.matches(join_threshold, window):
+            detector = self.detectors[guild_id] = JoinDetector(join_threshold, window)
+        return detector
+    
+    def flagged_cohort(self, guild_id, seconds):
+        """Members who joined in the last few seconds, limited to suspicious ones unless the scope is 'all'"""
+        settings = self.settings.get(guild_id, {})
+        detector = self.detectors.get(guild_id)
+        if detector is None:
+            return []
+        suspicious_only = settings.get('cleanup_scope', 'suspicious') != 'all'
+        return detector.cohort(time.time() - seconds, suspicious_only=suspicious_only)
+    
+    async def check_raid_conditions(self, guild, result):
+        """Respond to a raid when a join's score reaches the threshold
         
-        # Filter joins within the time window
-        joins_in_window = [(user_id, timestamp) for user_id, timestamp in recent_joins
-                          if (now - timestamp).total_seconds() <= time_threshold]
+        Args:
+            guild: The guild
+            result: The JoinScore of the latest join
         
-        # Check if we've exceeded the threshold
-        if len(joins_in_window) >= join_threshold:
-            logger.warning(f"Potential raid detected in {guild.name} ({guild.id}): {len(joins_in_window)} joins in {time_threshold}s")
-            
-            # Take action based on settings
-            if settings.get('auto_lockdown', True):
-                await self.lockdown_guild(guild, 
-                                          duration=settings.get('lockdown_duration', 300),
-                                          reason="Potential raid detected")
-            
-            # Notify the server staff
-            await self.notify_staff(guild, joins_in_window)
-            return True
+        Returns:
+            Whether a raid response was started
+        """
+        settings = self.settings.get(guild.id, {})
+        if not settings.get('enabled', False) or result.score < 1.0:
+            return False
         
-        return False
+        # One response per raid window: joins during it go to the running cleanup instead.
+        # A lockdown does not suppress the next window, so a raid outlasting it is still cleaned up
+        time_threshold = settings.get('time_threshold', 60)
+        now = time.time()
+        if now - self.last_raid.get(guild.id, 0) < time_threshold:
+            return False
+        self.last_raid[guild.id] = now
+        
+        logger.warning(f"Potential raid detected in {guild.name} ({guild.id}): score {result.score:.2f}, "
+                       f"{result.counts[time_threshold]} joins in {time_threshold}s, "
+                       f"{result.counts[BURST_WINDOW]} in {BURST_WINDOW}s")
+        
+        # Remove the flagged cohort if the guild's action asks for it
+        action = settings.get('action', 'lockdown')
+        cohort = self.flagged_cohort(guild.id, time_threshold)
+        if action in CLEANUP_ACTIONS and cohort and not self.cleanup_running(guild.id):
+            self.start_cleanup(guild, action, cohort, reason="Raid cleanup: potential raid detected",
+                               accept_for=time_threshold)
+        
+        # Take action based on settings
+        if settings.get('auto_lockdown', True):
+            await self.lockdown_guild(guild, 
+                                      duration=settings.get('lockdown_duration', 300),
+                                      reason="Potential raid detected")
+        
+        # Notify the server staff
+        await self.notify_staff(guild, self.detectors[guild.id].cohort(now - time_threshold), result)
+        return True
     
-    async def lockdown_guild(self, guild, duration=300, reason="Raid protection"):
-        """Place the guild in lockdown mode"""
-        logger.info(f"Placing {guild.name} ({guild.id}) in lockdown for {duration} seconds")
-        
-        # Don't lockdown if already in lockdown
-        if self.lockdowns.get(guild.id, False):
+    def cleanup_running(self, guild_id):
+        """Whether a guild has a raid cleanup in progress"""
+        cleanup = self.cleanups.get(guild_id)
+        return cleanup is not None and not cleanup.done
+    
+    def start_cleanup(self, guild, action, user_ids, reason, accept_for=0):
+        """Start kicking or banning a raid cohort and report its progress to the alerts channel
+        
+        accept_for keeps the job taking late raid joins for that many seconds.
+        """
+        cleanup = self.cleanups[guild.id] = RaidCleanup(self.rest, guild, action, reason, accept_for=accept_for)
+        cleanup.add(user_ids)
+        cleanup.start()
+        
+        logger.info(f"Starting raid cleanup in {guild.name} ({guild.id}): {action} {cleanup.total} members")
+        
+        report = self.cleanup_reports.get(guild.id)
+        if report is not None:
+            report.cancel()
+        self.cleanup_reports[guild.id] = asyncio.ensure_future(self.report_cleanup(guild, cleanup))
+        return cleanup
+    
+    def cleanup_embed(self, cleanup):
+        """Build the progress embed for a raid cleanup"""
+        progress = cleanup.progress()
+        verb = "Banned" if progress['action'] == 'ban' else "Kicked"
+        if progress['cancelled']:
+            status, color = "Cancelled", discord.Color.dark_grey()
+        elif progress['finished']:
+            status, color = "Finished", discord.Color.green()
+        else:
+            status, color = "Running", discord.Color.orange()
+        
+        embed = discord.Embed(
+            title=f"🧹 Raid Cleanup ({status})",
+            description=f"{verb} **{progress['removed']}/{progress['total']}** flagged members.",
+            color=color
+        )
+        embed.add_field(name="Failed", value=str(progress['failed']))
+        embed.add_field(name="Skipped", value=str(progress['skipped']))
+        embed.add_field(name="Elapsed", value=f"{progress['elapsed']:.1f}s")
+        if progress['undone']:
+            embed.add_field(name="Unbanned", value=str(progress['undone']))
+        embed.timestamp = discord.utils.utcnow()
+        return embed
+    
+    async def report_cleanup(self, guild, cleanup):
+        """Post a cleanup's progress to the alerts channel and edit it until the job ends"""
+        notification_channel_id = self.settings.get(guild.id, {}).get('notification_channel')
+        channel = await self.channels.resolve(guild, 'alerts', notification_channel_id)
+        if channel is None:
+            await cleanup.wait()
             return
         
-        self.lockdowns[guild.id] = True
-        
-        # Update permissions for all channels to prevent new members from speaking
+        message = None
         try:
-            # Get the @everyone role
-            everyone_role = guild.default_role
+            while True:
+                finished = cleanup.done
+                embed = self.cleanup_embed(cleanup)
+                if message is None:
+                    message = await self.rest.run(NORMAL, f"channel:{channel.id}", channel.send, embed=embed)
+                else:
+                    await self.rest.run(LOW, f"channel:{channel.id}", message.edit, embed=embed)
+                if finished:
+                    return
+                await cleanup.wait(timeout=CLEANUP_PROGRESS_INTERVAL)
+        except discord.HTTPException as e:
+            logger.warning(f"Failed to report raid cleanup progress in {guild.name}: {e}")
+    
+    async def lockdown_guild(self, guild, duration=300, reason="Raid protection"):
+        """Place the guild in lockdown mode
+        
+        Depending on the guild's lockdown mode this either locks every text
+        channel's @everyone overwrite, or takes Send Messages away from one role
+        (plus the few channels that explicitly allow that role to speak). The
+        original permissions are saved before anything is touched, edits are
+        sent in parallel, and the unlock is scheduled from the saved expiry
+        time so it still happens if the bot restarts.
+        
+        Returns:
+            The lockdown record, or None if the guild was already in lockdown
+        """
+        settings = await self.get_settings(guild.id)
+        
+        async with self.lockdown_lock(guild.id):
+            # Don't lockdown if already in lockdown
+            if self.lockdowns.get(guild.id):
+                return None
+            
+            mode = resolve_mode(guild, settings.get('lockdown_mode', 'auto'))
+            logger.info(f"Placing {guild.name} ({guild.id}) in {mode} lockdown for {duration} seconds")
+            started = time.monotonic()
             
-            # Store original permissions for later restore
-            original_perms = {}
+            # The role to lock: @everyone for channel lockdowns, the configured role otherwise
+            role = guild.default_role if mode == 'channels' else lockdown_role(guild, settings.get('lockdown_role'))
+            channels = guild.text_channels if mode == 'channels' else role_lock_exceptions(guild, role)
             
-            # Modify permissions for all text channels
-            for channel in guild.text_channels:
-                original_perms[channel.id] = channel.overwrites_for(everyone_role)
-                overwrites = channel.overwrites_for(everyone_role)
+            # Snapshot the original permissions of every channel we are about to lock
+            snapshot = {}
+            edits = []
+            for channel in channels:
+                overwrites = channel.overwrites_for(role)
+                if overwrites.send_messages is False:
+                    continue  # Already locked, leave it alone on unlock too
+                snapshot[str(channel.id)] = snapshot_overwrite(overwrites)
                 overwrites.send_messages = False
-                await channel.set_permissions(everyone_role, overwrite=overwrites, reason=reason)
+                edits.append((channel, overwrites))
+            
+            now = time.time()
+            lockdown = {
+                'mode': mode,
+                'reason': reason,
+                'started_at': now,
+                'expires_at': now + duration,
+                'role_id': role.id,
+                'role_permissions': role.permissions.value if mode == 'role' else None,
+                'overwrites': snapshot,
+                'total': len(edits) + (1 if mode == 'role' else 0),
+                'done': 0,
+                'failed': 0
+            }
+            self.lockdowns[guild.id] = lockdown
             
-            # Notify that the server is in lockdown
+            # Persist the snapshot before changing anything, then schedule the unlock
+            self.store.save(LOCKDOWN_NAMESPACE, guild.id, lockdown)
+            await self.store.flush()
+            await self.schedule_unlock(guild.id, lockdown['expires_at'])
+            
+            # Role lockdown: one edit covers every channel that does not override it
+            if mode == 'role':
+                await self.lock_role(guild, role, lockdown, reason)
+            
+            # Lock the channels at once (bounded), at the scheduler's highest priority
+            await edit_overwrites(self.rest, guild, role, edits, CRITICAL, reason, lockdown)
+            self.store.save(LOCKDOWN_NAMESPACE, guild.id, lockdown)
+            
+            logger.info(f"Locked {lockdown['done']}/{lockdown['total']} targets in {guild.name} "
+                        f"in {time.monotonic() - started:.1f}s ({lockdown['failed']} failed)")
+        
+        # Notify that the server is in lockdown
+        try:
             notification_channel_id = self.settings.get(guild.id, {}).get('notification_channel')
             if notification_channel_id:
                 channel = guild.get_channel(int(notification_channel_id))
@@ -122,46 +332,68 @@ class RaidProtection(commands.Cog):
                     )
                     embed.add_field(name="Reason", value=reason)
                     embed.add_field(name="Duration", value=f"{duration} seconds")
-                    embed.add_field(name="Automatic Unlock", value=f"<t:{int((discord.utils.utcnow() + datetime.timedelta(seconds=duration)).timestamp())}:R>")
-                    await channel.send(embed=embed)
-            
-            # Schedule unlock after the specified duration
-            await asyncio.sleep(duration)
-            
-            # Remove lockdown
-            await self.unlock_guild(guild, original_perms, reason="Lockdown duration expired")
-        
+                    embed.add_field(name="Automatic Unlock", value=f"<t:{int(lockdown['expires_at'])}:R>")
+                    if mode == 'role':
+                        embed.add_field(name="Locked Role", value=role.mention if not role.is_default() else "@everyone")
+                    embed.add_field(name="Channels Locked", value=f"{len(snapshot)}" if mode == 'role' else f"{lockdown['done']}/{lockdown['total']}")
+                    await self.rest.run(NORMAL, f"channel:{channel.id}", channel.send, embed=embed)
         except Exception as e:
-            logger.error(f"Error during lockdown: {e}")
-            self.lockdowns[guild.id] = False
-    
-    async def unlock_guild(self, guild, original_perms=None, reason="Lockdown ended"):
-        """Remove the guild from lockdown mode"""
-        logger.info(f"Removing lockdown from {guild.name} ({guild.id})")
+            logger.error(f"Error sending lockdown notification: {e}")
         
-        # Skip if not in lockdown
-        if not self.lockdowns.get(guild.id, False):
-            return
+        return lockdown
+    
+    async def lock_role(self, guild, role, lockdown, reason):
+        """Apply the role-level part of a lockdown, counting it in the lockdown's progress"""
+        try:
+            if await lock_role(self.rest, role, CRITICAL, reason) is None:
+                # Already unable to speak; nothing to restore either
+                lockdown['role_permissions'] = None
+            lockdown['done'] += 1
+        except discord.HTTPException as e:
+            lockdown['failed'] += 1
+            logger.warning(f"Failed to lock role {role.name} in {guild.name}: {e}")
+    
+    async def unlock_guild(self, guild, reason="Lockdown ended"):
+        """Remove the guild from lockdown mode, restoring the saved permissions"""
+        async with self.lockdown_lock(guild.id):
+            # Skip if not in lockdown
+            lockdown = self.lockdowns.get(guild.id)
+            if not lockdown:
+                return
+            
+            logger.info(f"Removing lockdown from {guild.name} ({guild.id})")
+            
+            # A manual unlock replaces the scheduled one
+            await self.timers.cancel('lockdown_expiry', str(guild.id))
+            
+            role = guild.get_role(lockdown.get('role_id') or guild.id) or guild.default_role
+            progress = {'done': 0, 'failed': 0}
+            
+            # Give the role back its permissions
+            if lockdown.get('mode') == 'role' and lockdown.get('role_permissions') is not None:
+                try:
+                    await unlock_role(self.rest, role, lockdown['role_permissions'], HIGH, reason)
+                    progress['done'] += 1
+                except discord.HTTPException as e:
+                    progress['failed'] += 1
+                    logger.warning(f"Failed to unlock role {role.name} in {guild.name}: {e}")
+            
+            # Restore original permissions (channels deleted since are skipped)
+            edits = []
+            for channel_id, saved in lockdown.get('overwrites', {}).items():
+                channel = guild.get_channel(int(channel_id))
+                if channel is not None:
+                    edits.append((channel, restore_overwrite(saved)))
+            
+            await edit_overwrites(self.rest, guild, role, edits, HIGH, reason, progress)
+            
+            # Update lockdown status
+            self.lockdowns.pop(guild.id, None)
+            self.store.delete(LOCKDOWN_NAMESPACE, guild.id)
+            await self.store.flush()
         
+        # Notify that the lockdown is over
         try:
-            # Get the @everyone role
-            everyone_role = guild.default_role
-            
-            # Restore original permissions
-            if original_perms:
-                for channel_id, overwrites in original_perms.items():
-                    channel = guild.get_channel(channel_id)
-                    if channel:
-                        await channel.set_permissions(everyone_role, overwrite=overwrites, reason=reason)
-            
-            # Or just enable messages for all channels
-            else:
-                for channel in guild.text_channels:
-                    overwrites = channel.overwrites_for(everyone_role)
-                    overwrites.send_messages = None  # Reset to default
-                    await channel.set_permissions(everyone_role, overwrite=overwrites, reason=reason)
-            
-            # Notify that the lockdown is over
             notification_channel_id = self.settings.get(guild.id, {}).get('notification_channel')
             if notification_channel_id:
                 channel = guild.get_channel(int(notification_channel_id))
@@ -172,52 +404,139 @@ class RaidProtection(commands.Cog):
                         color=discord.Color.green()
                     )
                     embed.add_field(name="Reason", value=reason)
-                    await channel.send(embed=embed)
-            
-            # Update lockdown status
-            self.lockdowns[guild.id] = False
+                    embed.add_field(name="Permissions Restored", value=f"{progress['done']}/{progress['done'] + progress['failed']}")
+                    await self.rest.run(NORMAL, f"channel:{channel.id}", channel.send, embed=embed)
+        except Exception as e:
+            logger.error(f"Error sending unlock notification: {e}")
+    
+    def lockdown_lock(self, guild_id):
+        """Lock that serializes lockdown and unlock for a guild"""
+        lock = self.lockdown_locks.get(guild_id)
+        if lock is None:
+            lock = self.lockdown_locks[guild_id] = asyncio.Lock()
+        return lock
+    
+    async def schedule_unlock(self, guild_id, expires_at):
+        """Schedule the automatic end of a guild's lockdown (replaces any earlier expiry)"""
+        await self.timers.schedule('lockdown_expiry', expires_at, {'guild_id': guild_id}, key=str(guild_id),
+                                   guild_id=guild_id)
+    
+    async def expire_lockdown(self, timer):
+        """Lift a lockdown when its expiry timer fires"""
+        guild_id = timer.payload['guild_id']
+        if guild_id not in self.lockdowns:
+            # Overdue timers fire at startup, possibly before resume_lockdowns has run
+            saved = await self.store.load(LOCKDOWN_NAMESPACE, guild_id)
+            if not saved:
+                return
+            self.lockdowns.setdefault(guild_id, saved)
+        
+        guild = self.bot.get_guild(guild_id)
+        if guild is None:
+            # The bot is no longer in the guild; nothing left to restore. (Timers only fire in the
+            # process running the guild's shard, so another process's guild never ends up here)
+            self.lockdowns.pop(guild_id, None)
+            self.store.delete(LOCKDOWN_NAMESPACE, guild_id)
+            return
         
+        try:
+            await self.unlock_guild(guild, reason="Lockdown duration expired")
         except Exception as e:
             logger.error(f"Error during unlock: {e}")
     
-    async def notify_staff(self, guild, suspicious_joins):
-        """Notify server staff about suspicious join activity"""
-        # Get notification channel from settings
-        notification_channel_id = self.settings.get(guild.id, {}).get('notification_channel')
-        if not notification_channel_id:
-            # Try to find a logging or mod channel if none specified
-            potential_channels = ["mod-log", "logs", "audit-log", "security", "raid-alerts", "staff-alerts"]
-            for ch_name in potential_channels:
-                channel = discord.utils.get(guild.text_channels, name=ch_name)
-                if channel:
-                    notification_channel_id = channel.id
-                    break
-        
-        if notification_channel_id:
-            channel = guild.get_channel(int(notification_channel_id))
-            if channel:
-                # Create an embed with the raid information
-                embed = discord.Embed(
-                    title="🚨 Potential Raid Detected",
-                    description=f"{len(suspicious_joins)} members joined in a short time period.",
-                    color=discord.Color.red()
-                )
-                
-                # List recent members (up to 15)
-                recent_members = []
-                for user_id, timestamp in list(suspicious_joins)[-15:]:
-                    member = guild.get_member(user_id)
-                    if member:
-                        account_age = (discord.utils.utcnow() - member.created_at).days
-                        recent_members.append(f"{member.mention} (Age: {account_age} days)")
-                
-                if recent_members:
-                    embed.add_field(name="Recent Joins", value="\n".join(recent_members), inline=False)
-                
-                # Add timestamp
-                embed.timestamp = discord.utils.utcnow()
+    @tasks.loop(count=1)
+    async def resume_lockdowns(self):
+        """Pick up lockdowns that were active when the bot stopped"""
+        try:
+            saved = await self.store.load_namespace(LOCKDOWN_NAMESPACE)
+        except Exception as e:
+            logger.error(f"Failed to load saved lockdowns: {e}")
+            return
+        
+        now = time.time()
+        for guild_id, lockdown in saved.items():
+            # With shards split across processes, each lockdown is resumed by the process that owns its guild
+            if not owns_guild(self.bot, guild_id):
+                continue
+            
+            expires_at = lockdown.get('expires_at', now)
+            if guild_id in self.lockdowns or expires_at <= now:
+                continue  # Expired lockdowns are lifted by their overdue timer
+            self.lockdowns[guild_id] = lockdown
+            
+            logger.info(f"Resuming lockdown for guild {guild_id} ({expires_at - now:.0f}s remaining)")
+            
+            # Finish locking whatever the bot did not get to before it stopped
+            guild = self.bot.get_guild(guild_id)
+            if guild is not None:
+                reason = lockdown.get('reason', "Raid protection")
+                role = guild.get_role(lockdown.get('role_id') or guild.id) or guild.default_role
+                if (lockdown.get('mode') == 'role' and lockdown.get('role_permissions') is not None
+                        and role.permissions.send_messages):
+                    await self.lock_role(guild, role, lockdown, reason)
                 
-                await channel.send(embed=embed)
+                edits = []
+                for channel_id in lockdown.get('overwrites', {}):
+                    channel = guild.get_channel(int(channel_id))
+                    if channel is None:
+                        continue
+                    overwrites = channel.overwrites_for(role)
+                    if overwrites.send_messages is not False:
+                        overwrites.send_messages = False
+                        edits.append((channel, overwrites))
+                if edits:
+                    await edit_overwrites(self.rest, guild, role, edits, CRITICAL, reason, lockdown)
+            
+            # Make sure the expiry timer exists (it is keyed by guild, so this never duplicates it)
+            await self.schedule_unlock(guild_id, expires_at)
+    
+    @resume_lockdowns.before_loop
+    async def before_resume_lockdowns(self):
+        """Wait until the guild cache is ready"""
+        await self.bot.wait_until_ready()
+    
+    async def notify_staff(self, guild, member_ids, result):
+        """Notify server staff about suspicious join activity
+        
+        Args:
+            guild: The guild
+            member_ids: Members who joined in the detection window, oldest first
+            result: The JoinScore that triggered the alert
+        """
+        # Get notification channel from settings, else the cached alerts channel
+        notification_channel_id = self.settings.get(guild.id, {}).get('notification_channel')
+        channel = await self.channels.resolve(guild, 'alerts', notification_channel_id)
+        
+        if channel:
+            # Create an embed with the raid information
+            embed = discord.Embed(
+                title="🚨 Potential Raid Detected",
+                description=f"{len(member_ids)} members joined in a short time period (raid score {result.score:.1f}).",
+                color=discord.Color.red()
+            )
+            
+            # Join rates over the tracked windows
+            embed.add_field(
+                name="Join Rate",
+                value=" · ".join(f"{count} in {window}s" for window, count in sorted(result.counts.items())),
+                inline=False
+            )
+            
+            # List recent members (up to 15)
+            recent_members = []
+            for user_id in member_ids[-15:]:
+                member = guild.get_member(user_id)
+                if member:
+                    account_age = (discord.utils.utcnow() - member.created_at).days
+                    recent_members.append(f"{member.mention} (Age: {account_age} days)")
+            
+            if recent_members:
+                embed.add_field(name="Recent Joins", value="\n".join(recent_members), inline=False)
+            
+            # Add timestamp
+            embed.timestamp = discord.utils.utcnow()
+            
+            await self.rest.run(NORMAL, f"channel:{channel.id}", channel.send, embed=embed)
     
     @commands.command(name="raidmode")
     @commands.has_permissions(administrator=True)
@@ -225,18 +544,6 @@ class RaidProtection(commands.Cog):
         """Toggle or check raid protection mode"""
         guild = ctx.guild
         
-        # Initialize settings if they don't exist
-        if guild.id not in self.settings:
-            self.settings[guild.id] = {
-                'enabled': True,
-                'join_threshold': 10,
-                'time_threshold': 60,
-                'action': 'lockdown',
-                'notification_channel': None,
-                'auto_lockdown': True,
-                'lockdown_duration': 300
-            }
-        
         # Check status
         if setting.lower() in ["status", "check"]:
             settings = self.settings[guild.id]
@@ -252,6 +559,14 @@ class RaidProtection(commands.Cog):
             embed.add_field(name="Auto-Lockdown", value="✅ Yes" if settings.get('auto_lockdown', False) else "❌ No")
             embed.add_field(name="Lockdown Duration", value=f"{settings.get('lockdown_duration', 300)} seconds")
             
+            lockdown_mode = settings.get('lockdown_mode', 'auto')
+            role = lockdown_role(guild, settings.get('lockdown_role'))
+            embed.add_field(
+                name="Lockdown Mode",
+                value=(f"{lockdown_mode} (currently {resolve_mode(guild, lockdown_mode)})\n"
+                       f"Role: {'@everyone' if role.is_default() else role.mention}")
+            )
+            
             notification_channel_id = settings.get('notification_channel')
             notification_channel = "None"
             if notification_channel_id:
@@ -259,6 +574,27 @@ class RaidProtection(commands.Cog):
                 notification_channel = f"#{channel.name}" if channel else "Invalid Channel"
             
             embed.add_field(name="Notification Channel", value=notification_channel)
+            embed.add_field(name="Raid Action", value=f"{settings.get('action', 'lockdown')} (scope: {settings.get('cleanup_scope', 'suspicious')})")
+            
+            # Current join rates
+            detector = self.detectors.get(guild.id)
+            if detector is not None:
+                stats = detector.stats()
+                embed.add_field(
+                    name="Join Rate",
+                    value="\n".join(f"{window}s: {count} joins ({stats['suspicious'][window]} suspicious)"
+                                    for window, count in sorted(stats['joins'].items())),
+                    inline=False
+                )
+            
+            # Active lockdown and its progress
+            lockdown = self.lockdowns.get(guild.id)
+            if lockdown:
+                embed.add_field(
+                    name="Lockdown",
+                    value=(f"🔒 Active ({lockdown.get('mode', 'channels')}), {lockdown.get('done', 0)}/{lockdown.get('total', 0)} edits applied "
+                           f"({lockdown.get('failed', 0)} failed)\nEnds <t:{int(lockdown['expires_at'])}:R>")
+                )
             
             await ctx.send(embed=embed)
             return
@@ -314,8 +650,54 @@ class RaidProtection(commands.Cog):
             except ValueError:
                 await ctx.send("⚠️ Invalid window. Please specify a number of seconds.")
         
+        # Set lockdown strategy
+        elif setting.lower().startswith("lockmode:"):
+            mode = setting.split(":", 1)[1].lower()
+            if mode not in LOCKDOWN_MODES:
+                await ctx.send("⚠️ Lockdown mode must be `auto`, `channels`, or `role`.")
+                return
+            
+            self.settings[guild.id]['lockdown_mode'] = mode
+            await ctx.send(f"✅ Lockdown mode set to **{mode}**.")
+        
+        # Set the role locked in role mode
+        elif setting.lower().startswith("lockrole:"):
+            value = setting.split(":", 1)[1].strip("<@&>")
+            if value.lower() in ["everyone", "none", "default"]:
+                self.settings[guild.id]['lockdown_role'] = None
+                await ctx.send("✅ Role lockdowns will lock **@everyone**.")
+                return
+            
+            role = guild.get_role(int(value)) if value.isdigit() else None
+            if role is None:
+                await ctx.send("⚠️ Invalid role. Mention a role, give its ID, or use `everyone`.")
+                return
+            
+            self.settings[guild.id]['lockdown_role'] = role.id
+            await ctx.send(f"✅ Role lockdowns will lock **{role.name}**.")
+        
+        # Set the raid response
+        elif setting.lower().startswith("action:"):
+            action = setting.split(":", 1)[1].lower()
+            if action not in ('lockdown',) + CLEANUP_ACTIONS:
+                await ctx.send("⚠️ Raid action must be `lockdown`, `kick`, or `ban`.")
+                return
+            
+            self.settings[guild.id]['action'] = action
+            await ctx.send(f"✅ Raid action set to **{action}**.")
+        
+        # Set which joins a kick/ban cleanup removes
+        elif setting.lower().startswith("scope:"):
+            scope = setting.split(":", 1)[1].lower()
+            if scope not in ['suspicious', 'all']:
+                await ctx.send("⚠️ Cleanup scope must be `suspicious` or `all`.")
+                return
+            
+            self.settings[guild.id]['cleanup_scope'] = scope
+            await ctx.send(f"✅ Raid cleanups will remove **{scope}** joins in the window.")
+        
         else:
-            await ctx.send("⚠️ Invalid setting. Use `on`, `off`, `status`, `duration:X`, `joins:X`, or `window:X`.")
+            await ctx.send("⚠️ Invalid setting. Use `on`, `off`, `status`, `duration:X`, `joins:X`, `window:X`, `lockmode:X`, `lockrole:X`, `action:X`, or `scope:X`.")
     
     @commands.command(name="lockdown")
     @commands.has_permissions(administrator=True)
@@ -329,6 +711,10 @@ class RaidProtection(commands.Cog):
             await ctx.send("⚠️ Lockdown duration cannot exceed 1 hour (3600 seconds).")
             return
         
+        if self.lockdowns.get(ctx.guild.id):
+            await ctx.send("⚠️ The server is already in lockdown.")
+            return
+        
         await ctx.send(f"🔒 Placing server in lockdown for {duration} seconds...")
         
         # Set notification channel for this lockdown
@@ -336,7 +722,9 @@ class RaidProtection(commands.Cog):
             self.settings[ctx.guild.id]['notification_channel'] = str(ctx.channel.id)
         
         # Execute lockdown
-        await self.lockdown_guild(ctx.guild, duration=duration, reason=reason)
+        lockdown = await self.lockdown_guild(ctx.guild, duration=duration, reason=reason)
+        if lockdown:
+            await ctx.send(f"🔒 Lockdown applied ({lockdown['mode']} mode): {lockdown['done']}/{lockdown['total']} edits ({lockdown['failed']} failed).")
     
     @commands.command(name="unlock")
     @commands.has_permissions(administrator=True)
@@ -355,10 +743,75 @@ class RaidProtection(commands.Cog):
         # Execute unlock
         await self.unlock_guild(ctx.guild, reason=reason)
     
-    def cog_unload(self):
+    @commands.command(name="raidcleanup")
+    @commands.has_permissions(administrator=True)
+    async def raidcleanup(self, ctx, action="status", seconds: int = None):
+        """Show, cancel or undo the raid cleanup, or kick/ban the members who joined recently
+        
+        Usage: !raidcleanup [status|cancel|undo] or !raidcleanup <kick|ban> [seconds]
+        """
+        guild = ctx.guild
+        action = action.lower()
+        cleanup = self.cleanups.get(guild.id)
+        
+        if action in CLEANUP_ACTIONS:
+            if self.cleanup_running(guild.id):
+                await ctx.send("⚠️ A raid cleanup is already running. Use `!raidcleanup cancel` first.")
+                return
+            
+            seconds = seconds or self.settings[guild.id].get('time_threshold', 60)
+            if seconds < 10 or seconds > 3600:
+                await ctx.send("⚠️ The join window must be between 10 seconds and 1 hour (3600 seconds).")
+                return
+            
+            cohort = self.flagged_cohort(guild.id, seconds)
+            if not cohort:
+                await ctx.send(f"⚠️ No flagged members joined in the last {seconds} seconds.")
+                return
+            
+            self.start_cleanup(guild, action, cohort, reason=f"Raid cleanup by {ctx.author}")
+            await ctx.send(f"🧹 Starting to {action} **{len(cohort)}** members who joined in the last {seconds} seconds.")
+            return
+        
+        if cleanup is None:
+            await ctx.send("ℹ️ No raid cleanup has run since the bot started.")
+            return
+        
+        if action == "status":
+            await ctx.send(embed=self.cleanup_embed(cleanup))
+        
+        elif action == "cancel":
+            if cleanup.done:
+                await ctx.send("⚠️ The raid cleanup has already finished.")
+                return
+            cleanup.cancel()
+            await cleanup.wait()
+            await ctx.send(embed=self.cleanup_embed(cleanup))
+        
+        elif action == "undo":
+            if cleanup.action != 'ban':
+                await ctx.send("⚠️ Kicks cannot be undone; kicked members can rejoin with an invite.")
+                return
+            await ctx.send(f"↩️ Unbanning {len(cleanup.removed)} members...")
+            unbanned = await cleanup.undo(reason=f"Raid cleanup undone by {ctx.author}")
+            await ctx.send(f"✅ Unbanned **{unbanned}** members.")
+        
+        else:
+            await ctx.send("⚠️ Invalid action. Use `status`, `cancel`, `undo`, `kick [seconds]`, or `ban [seconds]`.")
+    
+    async def cog_unload(self):
         """Save settings when the cog is unloaded"""
-        # In a real implementation, we would save settings to a database here
-        pass
+        # Stop resuming (unlock timers are persistent and fire on the next start)
+        self.resume_lockdowns.cancel()
+        
+        # Stop raid cleanups after the calls already in flight
+        for cleanup in self.cleanups.values():
+            cleanup.cancel()
+        for report in self.cleanup_reports.values():
+            report.cancel()
+        
+        # Write any settings changes that are still batched
+        await self.store.flush()
 
 async def setup(bot):
     await bot.add_cog(RaidProtection(bot))
\ No newline at end of file
@@ -1,16 +1,31 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 import asyncio
+import io
 import logging
 import json
 import os
-import datetime
 import random
 import string
 from discord import ui
 
+from bot.python.utils.captcha import generate_code, get_captcha_pool
+from bot.python.utils.channel_resolver import get_channel_resolver
+from bot.python.utils.layered_settings import SettingsView, freeze_defaults, freeze_overrides
+from bot.python.utils.log_sink import get_log_sink
+from bot.python.utils.rest_scheduler import HIGH, LOW, NORMAL, get_rest_scheduler
+from bot.python.utils.settings_store import get_settings_store
+from bot.python.utils.shard_metrics import owned_shards
+from bot.python.utils.verification_store import SWEEP_BATCH, get_verification_store
+
 logger = logging.getLogger('guard-shin')
 
+# Settings store namespace for this cog
+SETTINGS_NAMESPACE = 'verification'
+
+# Seconds between sweeps for members whose verification time ran out
+PENDING_SWEEP_SECONDS = 60
+
 # Verification types
 VERIFICATION_TYPES = {
     "reaction": "React to a message",
@@ -39,19 +54,31 @@ class VerificationView(ui.View):
 class Verification(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.settings = {}  # guild_id -> settings
-        self.pending_verifications = {}  # user_id -> verification_data
-        self.captchas = {}  # user_id -> captcha_data
-        self.load_settings()
+        self.pending = get_verification_store(bot)  # (guild_id, user_id) -> pending verification, on disk
+        self.rest = get_rest_scheduler(bot)  # shared REST scheduler
+        self.log_sink = get_log_sink(bot)  # batched log embeds
+        self.channels = get_channel_resolver(bot)  # cached verification/welcome channel lookups
+        self.message_cache = {}  # guild_id -> (channel_id, message_id) of a verification message known to exist
+        self.message_checks = {}  # guild_id -> in-flight fetch confirming the verification message
+        
+        # Settings are loaded per guild on first use
+        self.store = get_settings_store(bot)
+        self.defaults = freeze_defaults(self.default_settings())  # immutable, shared by every guild
+        self.settings = {}  # guild_id -> SettingsView over the guild's overrides
         
         # Register persistent view
         self.bot.add_view(VerificationView())
+        
+        # One sweeper enforces auto-kick for every guild
+        self.sweep_pending.start()
+        
+        # Captcha images are rendered ahead of time in worker processes
+        self.captcha_pool = get_captcha_pool(bot)
+        self.captcha_pool.start()
     
-    def load_settings(self):
-        """Load verification settings from storage"""
-        # This would normally load from a database
-        # For now, we'll use default settings for all guilds
-        default_settings = {
+    def default_settings(self):
+        """Build the default verification settings for a guild"""
+        return {
             'enabled': True,
             'verification_type': 'button',  # reaction, button, captcha, message
             'verification_channel_id': None,
@@ -65,10 +92,32 @@ class Verification(commands.Cog):
             'auto_kick': False,
             'auto_kick_delay': 1440  # 24 hours in minutes
         }
-        
-        # Apply default settings to all guilds
-        for guild in self.bot.guilds:
-            self.settings[guild.id] = default_settings.copy()
+    
+    async def get_settings(self, guild_id):
+        """Get a guild's settings, loading them from the settings store on first use"""
+        settings = self.settings.get(guild_id)
+        if settings is None:
+            stored = await self.store.load(SETTINGS_NAMESPACE, guild_id)
+            settings = self.settings.get(guild_id)
+            if settings is None:
+                settings = self.settings[guild_id] = SettingsView(self.defaults, freeze_overrides(stored))
+        return settings
+    
+    def save_settings(self, guild_id):
+        """Queue a guild's settings for a batched write to the settings store"""
+        settings = self.settings.get(guild_id)
+        if settings is not None:
+            self.store.save(SETTINGS_NAMESPACE, guild_id, settings.overrides)
+    
+    async def cog_before_invoke(self, ctx):
+        """Make sure the guild's settings are loaded before a command runs"""
+        if ctx.guild:
+            await self.get_settings(ctx.guild.id)
+    
+    async def cog_after_invoke(self, ctx):
+        """Persist any settings the command changed"""
+        if ctx.guild:
+            self.save_settings(ctx.guild.id)
     
     @commands.Cog.listener()
     async def on_member_join(self, member):
@@ -80,37 +129,29 @@ class Verification(commands.Cog):
         guild = member.guild
         
         # Get settings for this guild
-        settings = self.settings.get(guild.id, {})
+        settings = await self.get_settings(guild.id)
         
         # Skip if verification is disabled
         if not settings.get('enabled', False):
             return
         
-        # Get verification channel
-        verification_channel_id = settings.get('verification_channel_id')
-        if not verification_channel_id:
-            # Try to find a channel with 'verification' or 'welcome' in the name
-            verification_channels = [c for c in guild.text_channels if 'verif' in c.name.lower() or 'welcome' in c.name.lower()]
-            if verification_channels:
-                verification_channel = verification_channels[0]
-                settings['verification_channel_id'] = verification_channel.id
-            else:
-                logger.warning(f"No verification channel set for {guild.name} and none found")
-                return
-        else:
-            verification_channel = guild.get_channel(int(verification_channel_id))
-            if not verification_channel:
-                logger.warning(f"Verification channel not found in {guild.name}")
-                return
+        # Get verification channel (configured, or the cached 'verif'/'welcome' name match)
+        verification_channel = await self.channels.resolve(guild, 'verification', settings.get('verification_channel_id'))
+        if not verification_channel:
+            logger.warning(f"No verification channel set for {guild.name} and none found")
+            return
         
         # Get verification type
         verification_type = settings.get('verification_type', 'button')
         
+        # Track the member until they verify (captcha and message entries are added with their code)
+        if verification_type in ["button", "reaction"]:
+            await self.add_pending(member, settings)
+        
         # Check if there's a verification message to direct users to
         verification_message_id = settings.get('verification_message_id')
         if verification_message_id:
-            try:
-                verification_message = await verification_channel.fetch_message(int(verification_message_id))
+            if await self.verification_message_exists(guild, verification_channel, int(verification_message_id)):
                 # Just direct the user to the existing message
                 try:
                     await member.send(
@@ -120,9 +161,10 @@ class Verification(commands.Cog):
                 except discord.Forbidden:
                     logger.warning(f"Cannot send DM to {member} in {guild.name}")
                 return
-            except (discord.NotFound, discord.Forbidden):
-                # Message no longer exists, we'll create a new one
-                settings['verification_message_id'] = None
+            
+            # Message no longer exists, we'll create a new one
+            settings['verification_message_id'] = None
+            self.save_settings(guild.id)
         
         # Create appropriate verification based on the type
         if verification_type == "button":
@@ -154,7 +196,7 @@ class Verification(commands.Cog):
             message = await channel.send(embed=embed, view=view)
             
             # Save the message ID
-            settings['verification_message_id'] = message.id
+            self.remember_verification_message(member.guild.id, message)
         
         # Try to notify the member
         try:
@@ -182,7 +224,7 @@ class Verification(commands.Cog):
             await message.add_reaction("✅")
             
             # Save the message ID
-            settings['verification_message_id'] = message.id
+            self.remember_verification_message(member.guild.id, message)
         else:
             # Use existing message
             try:
@@ -201,7 +243,7 @@ class Verification(commands.Cog):
                 await message.add_reaction("✅")
                 
                 # Save the message ID
-                settings['verification_message_id'] = message.id
+                self.remember_verification_message(member.guild.id, message)
         
         # Try to notify the member
         try:
@@ -214,32 +256,42 @@ class Verification(commands.Cog):
     
     async def setup_captcha_verification(self, member, channel, settings):
         """Set up captcha-based verification"""
-        # Generate a captcha
-        captcha_code = self.generate_captcha(settings.get('captcha_difficulty', 'medium'))
+        # Take a pre-rendered captcha (a plain code when images are not available)
+        captcha = await self.captcha_pool.get(settings.get('captcha_difficulty', 'medium'))
         
         # Store the captcha
-        self.captchas[member.id] = {
-            'code': captcha_code,
-            'guild_id': member.guild.id,
-            'created_at': datetime.datetime.now()
-        }
+        await self.add_pending(member, settings, captcha.code)
         
-        # Create captcha embed
-        embed = discord.Embed(
-            title="Verification Required",
-            description=f"{member.mention}, please type the following code to verify yourself:\n\n"
-                       f"`{captcha_code}`\n\n"
-                       f"Type the code in this channel.",
-            color=discord.Color.blue()
-        )
-        
-        await channel.send(embed=embed)
+        if captcha.image:
+            # Image captcha: the code only appears in the picture
+            embed = discord.Embed(
+                title="Verification Required",
+                description=f"{member.mention}, please type the code shown in the image to verify yourself.\n\n"
+                           f"Type the code in this channel.",
+                color=discord.Color.blue()
+            )
+            embed.set_image(url="attachment://captcha.png")
+            
+            await channel.send(embed=embed, file=discord.File(io.BytesIO(captcha.image), filename="captcha.png"))
+            instructions = "typing the code shown in the captcha image there."
+        else:
+            # Create captcha embed
+            embed = discord.Embed(
+                title="Verification Required",
+                description=f"{member.mention}, please type the following code to verify yourself:\n\n"
+                           f"`{captcha.code}`\n\n"
+                           f"Type the code in this channel.",
+                color=discord.Color.blue()
+            )
+            
+            await channel.send(embed=embed)
+            instructions = f"typing the captcha code: `{captcha.code}`"
         
         # Try to notify the member
         try:
             await member.send(
                 f"Welcome to **{member.guild.name}**! Please verify yourself in {channel.mention} by "
-                f"typing the captcha code: `{captcha_code}`"
+                f"{instructions}"
             )
         except discord.Forbidden:
             logger.warning(f"Cannot send DM to {member} in {member.guild.name}")
@@ -251,11 +303,7 @@ class Verification(commands.Cog):
         verification_phrase = f"I verify {verification_code}"
         
         # Store the verification data
-        self.pending_verifications[member.id] = {
-            'phrase': verification_phrase,
-            'guild_id': member.guild.id,
-            'created_at': datetime.datetime.now()
-        }
+        await self.add_pending(member, settings, verification_phrase)
         
         # Create verification embed
         embed = discord.Embed(
@@ -285,7 +333,7 @@ class Verification(commands.Cog):
             return
         
         # Get settings for this guild
-        settings = self.settings.get(message.guild.id, {})
+        settings = await self.get_settings(message.guild.id)
         
         # Skip if verification is disabled
         if not settings.get('enabled', False):
@@ -302,17 +350,13 @@ class Verification(commands.Cog):
         # Process message verification
         if verification_type == "message":
             # Check if user has pending verification
-            if message.author.id in self.pending_verifications:
-                verification_data = self.pending_verifications[message.author.id]
-                
+            pending = await self.pending.get(message.guild.id, message.author.id)
+            if pending and pending.code:
                 # Check if the message matches the phrase
-                if message.content.strip().lower() == verification_data['phrase'].lower():
-                    # Verify the user
+                if message.content.strip().lower() == pending.code.lower():
+                    # Verify the user (this also clears the pending entry)
                     await self.verify_user(message.author, message.guild, "message verification", message.channel)
                     
-                    # Clean up
-                    del self.pending_verifications[message.author.id]
-                    
                     # Delete the verification message
                     try:
                         await message.delete()
@@ -322,17 +366,13 @@ class Verification(commands.Cog):
         # Process captcha verification
         elif verification_type == "captcha":
             # Check if user has a captcha
-            if message.author.id in self.captchas:
-                captcha_data = self.captchas[message.author.id]
-                
+            pending = await self.pending.get(message.guild.id, message.author.id)
+            if pending and pending.code:
                 # Check if the message matches the captcha
-                if message.content.strip().upper() == captcha_data['code'].upper():
-                    # Verify the user
+                if message.content.strip().upper() == pending.code.upper():
+                    # Verify the user (this also clears the pending entry)
                     await self.verify_user(message.author, message.guild, "captcha verification", message.channel)
                     
-                    # Clean up
-                    del self.captchas[message.author.id]
-                    
                     # Delete the verification message
                     try:
                         await message.delete()
@@ -352,7 +392,7 @@ class Verification(commands.Cog):
             return
         
         # Get settings for this guild
-        settings = self.settings.get(guild.id, {})
+        settings = await self.get_settings(guild.id)
         
         # Skip if verification is disabled
         if not settings.get('enabled', False):
@@ -388,7 +428,7 @@ class Verification(commands.Cog):
         guild = interaction.guild
         
         # Get settings for this guild
-        settings = self.settings.get(guild.id, {})
+        settings = await self.get_settings(guild.id)
         
         # Skip if verification is disabled
         if not settings.get('enabled', False):
@@ -421,7 +461,7 @@ class Verification(commands.Cog):
     async def verify_user(self, member, guild, method, channel=None):
         """Verify a user by giving them the verified role"""
         # Get settings for this guild
-        settings = self.settings.get(guild.id, {})
+        settings = await self.get_settings(guild.id)
         
         # Get the verified role
         verified_role_id = settings.get('verified_role_id')
@@ -443,12 +483,14 @@ class Verification(commands.Cog):
         # Check if the user already has the role
         if verified_role in member.roles:
             logger.info(f"{member} in {guild.name} already verified")
+            await self.pending.remove(guild.id, member.id)
             return True
         
         # Add the role
         try:
-            await member.add_roles(verified_role, reason=f"Verified via {method}")
+            await self.rest.run(HIGH, f"guild:{guild.id}", member.add_roles, verified_role, reason=f"Verified via {method}")
             logger.info(f"Verified {member} in {guild.name} via {method}")
+            await self.pending.remove(guild.id, member.id)
             
             # Log the verification
             await self.log_verification(member, guild, method)
@@ -474,7 +516,7 @@ class Verification(commands.Cog):
     async def log_verification(self, member, guild, method):
         """Log verification to a specified channel"""
         # Get settings for this guild
-        settings = self.settings.get(guild.id, {})
+        settings = await self.get_settings(guild.id)
         
         # Get log channel
         log_channel_id = settings.get('log_channel_id')
@@ -501,26 +543,17 @@ class Verification(commands.Cog):
         # Add user avatar
         embed.set_thumbnail(url=member.display_avatar.url)
         
-        await log_channel.send(embed=embed)
+        self.log_sink.log(log_channel, embed)
     
     async def send_welcome_message(self, member, guild):
         """Send a welcome message for verified users"""
         # Get settings for this guild
-        settings = self.settings.get(guild.id, {})
-        
-        # Get welcome channel
-        welcome_channel_id = settings.get('welcome_channel_id')
-        if not welcome_channel_id:
-            # Try to find a welcome channel
-            welcome_channels = [c for c in guild.text_channels if 'welcome' in c.name.lower() or 'general' in c.name.lower()]
-            if welcome_channels:
-                welcome_channel = welcome_channels[0]
-            else:
-                return  # No welcome channel found
-        else:
-            welcome_channel = guild.get_channel(int(welcome_channel_id))
-            if not welcome_channel:
-                return
+        settings = await self.get_settings(guild.id)
+        
+        # Get welcome channel (configured, or the cached 'welcome'/'general' name match)
+        welcome_channel = await self.channels.resolve(guild, 'welcome', settings.get('welcome_channel_id'))
+        if not welcome_channel:
+            return  # No welcome channel found
         
         # Get welcome message
         welcome_message = settings.get('welcome_message', "Welcome to {server}, {user}!")
@@ -533,23 +566,141 @@ class Verification(commands.Cog):
             member_count=guild.member_count
         )
         
-        # Send the welcome message
-        await welcome_channel.send(message)
+        # Send the welcome message (cosmetic, so it never delays moderation)
+        self.rest.spawn(LOW, f"channel:{welcome_channel.id}", welcome_channel.send, message)
     
-    def generate_captcha(self, difficulty="medium"):
-        """Generate a CAPTCHA code based on difficulty"""
-        if difficulty == "easy":
-            # Simple numeric code
-            return ''.join(random.choices(string.digits, k=5))
+    async def verification_message_exists(self, guild, channel, message_id):
+        """Whether a guild's verification message still exists
+        
+        The message is fetched at most once (concurrent joins share the fetch);
+        after that its existence is cached and only gateway delete events
+        clear it, so a join normally costs no REST call for this check.
+        """
+        if self.message_cache.get(guild.id) == (channel.id, message_id):
+            return True
         
-        elif difficulty == "hard":
-            # Complex alphanumeric with symbols
-            chars = string.ascii_uppercase + string.digits + "!@#$%&*"
-            return ''.join(random.choices(chars, k=8))
+        check = self.message_checks.get(guild.id)
+        if check is None:
+            check = self.message_checks[guild.id] = asyncio.ensure_future(self.fetch_verification_message(channel, message_id))
+            check.add_done_callback(lambda _: self.message_checks.pop(guild.id, None))
         
-        else:  # medium (default)
-            # Alphanumeric
-            return ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
+        # Joiners being cancelled must not cancel the shared fetch
+        if not await asyncio.shield(check):
+            return False
+        self.message_cache[guild.id] = (channel.id, message_id)
+        return True
+    
+    async def fetch_verification_message(self, channel, message_id):
+        """Fetch a verification message to confirm it exists"""
+        try:
+            await self.rest.run(NORMAL, f"channel:{channel.id}", channel.fetch_message, message_id)
+            return True
+        except (discord.NotFound, discord.Forbidden):
+            return False
+    
+    def remember_verification_message(self, guild_id, message):
+        """Save a newly sent verification message and mark it as existing"""
+        self.settings[guild_id]['verification_message_id'] = message.id
+        self.message_cache[guild_id] = (message.channel.id, message.id)
+        self.save_settings(guild_id)
+    
+    def forget_verification_message(self, guild_id):
+        """The guild's verification message was deleted; the next join sends a new one"""
+        self.message_cache.pop(guild_id, None)
+        settings = self.settings.get(guild_id)
+        if settings is not None and settings.get('verification_message_id'):
+            settings['verification_message_id'] = None
+            self.save_settings(guild_id)
+    
+    def verification_message_id(self, guild_id):
+        """The guild's verification message id, from the cache or already-loaded settings (never the database)"""
+        cached = self.message_cache.get(guild_id)
+        if cached is not None:
+            return cached[1]
+        settings = self.settings.get(guild_id)
+        message_id = settings.get('verification_message_id') if settings is not None else None
+        return int(message_id) if message_id else None
+    
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload):
+        """Notice when a verification message is deleted"""
+        if payload.guild_id and self.verification_message_id(payload.guild_id) == payload.message_id:
+            self.forget_verification_message(payload.guild_id)
+    
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload):
+        """Notice when a verification message is purged"""
+        if payload.guild_id and self.verification_message_id(payload.guild_id) in payload.message_ids:
+            self.forget_verification_message(payload.guild_id)
+    
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel):
+        """Notice when the channel holding a verification message is deleted"""
+        cached = self.message_cache.get(channel.guild.id)
+        if cached is not None and cached[0] == channel.id:
+            self.forget_verification_message(channel.guild.id)
+    
+    async def add_pending(self, member, settings, code=None):
+        """Record a member as pending until they verify or their auto-kick delay runs out"""
+        ttl = settings.get('auto_kick_delay', 1440) * 60
+        await self.pending.add(member.guild.id, member.id, settings.get('verification_type', 'button'), ttl, code)
+    
+    @commands.Cog.listener()
+    async def on_member_remove(self, member):
+        """Forget members who leave before verifying"""
+        await self.pending.remove(member.guild.id, member.id)
+    
+    @tasks.loop(seconds=PENDING_SWEEP_SECONDS)
+    async def sweep_pending(self):
+        """Kick members whose verification time ran out (where auto-kick is on) and drop their entries"""
+        try:
+            while True:
+                # Overdue entries come off the expiry index a batch at a time. The database is
+                # shared by every process, so only guilds on this process's shards are taken;
+                # the others are left for the process that runs them
+                batch = await self.pending.due(shards=owned_shards(self.bot))
+                if not batch:
+                    return
+                
+                await asyncio.gather(*(self.expire_pending(entry) for entry in batch))
+                await self.pending.remove_many((entry.guild_id, entry.user_id) for entry in batch)
+                if len(batch) < SWEEP_BATCH:
+                    return
+        except Exception as e:
+            logger.error(f"Error sweeping pending verifications: {e}")
+    
+    @sweep_pending.before_loop
+    async def before_sweep_pending(self):
+        """Wait until the member cache is ready"""
+        await self.bot.wait_until_ready()
+    
+    async def expire_pending(self, entry):
+        """Auto-kick one member whose verification time ran out, if they are still unverified"""
+        guild = self.bot.get_guild(entry.guild_id)
+        member = guild.get_member(entry.user_id) if guild else None
+        if member is None:
+            return  # Left the server (or the bot left the guild)
+        
+        settings = await self.get_settings(guild.id)
+        if not settings.get('enabled', False) or not settings.get('auto_kick', False):
+            return
+        
+        # Verified some other way (e.g. a moderator gave them the role)
+        verified_role_id = settings.get('verified_role_id')
+        if verified_role_id and any(role.id == int(verified_role_id) for role in member.roles):
+            return
+        
+        delay = settings.get('auto_kick_delay', 1440)
+        try:
+            await self.rest.run(NORMAL, f"member:{guild.id}:{member.id}", member.kick,
+                                reason=f"Did not verify within {delay} minutes")
+            logger.info(f"Auto-kicked unverified member {member} from {guild.name}")
+        except discord.HTTPException as e:
+            logger.warning(f"Failed to auto-kick {member} from {guild.name}: {e}")
+    
+    def generate_captcha(self, difficulty="medium"):
+        """Generate a plain-text CAPTCHA code based on difficulty"""
+        return generate_code(difficulty)
     
     @commands.command(name="verification")
     @commands.has_permissions(administrator=True)
@@ -557,10 +708,6 @@ class Verification(commands.Cog):
         """Configure verification settings"""
         guild = ctx.guild
         
-        # Initialize settings if they don't exist
-        if guild.id not in self.settings:
-            self.load_settings()
-        
         # Show status if no setting specified
         if not setting or setting.lower() in ["status", "check"]:
             settings = self.settings[guild.id]
@@ -618,6 +765,16 @@ class Verification(commands.Cog):
                 name="Auto-Kick Unverified",
                 value=f"{'✅ Yes' if auto_kick else '❌ No'} (after {auto_kick_delay} minutes)"
             )
+            embed.add_field(name="Pending Members", value=str(await self.pending.count(guild.id)))
+            
+            # Captcha rendering
+            if verification_type == "captcha":
+                pool = self.captcha_pool.stats()
+                embed.add_field(
+                    name="Captcha Images",
+                    value=(f"✅ Yes ({sum(pool['ready'].values())} pre-rendered)" if pool['enabled']
+                           else "❌ No (install Pillow and NumPy; plain-text codes are used)")
+                )
             
             await ctx.send(embed=embed)
             return
@@ -868,7 +1025,7 @@ class Verification(commands.Cog):
                 view = VerificationView()
                 message = await verification_channel.send(embed=embed, view=view)
                 
-                self.settings[guild.id]['verification_message_id'] = message.id
+                self.remember_verification_message(guild.id, message)
                 
             elif verification_type == "reaction":
                 embed = discord.Embed(
@@ -880,7 +1037,7 @@ class Verification(commands.Cog):
                 message = await verification_channel.send(embed=embed)
                 await message.add_reaction("✅")
                 
-                self.settings[guild.id]['verification_message_id'] = message.id
+                self.remember_verification_message(guild.id, message)
                 
             elif verification_type in ["captcha", "message"]:
                 await ctx.send(f"⚠️ {verification_type.capitalize()} verification doesn't use a static message. Each user will receive individual instructions.")
@@ -906,10 +1063,13 @@ class Verification(commands.Cog):
                 "- `status` - Show current settings"
             )
     
-    def cog_unload(self):
+    async def cog_unload(self):
         """Save settings when the cog is unloaded"""
-        # In a real implementation, we would save settings to a database here
-        pass
+        # Stop the auto-kick sweeper (pending members are on disk and picked up on the next start)
+        self.sweep_pending.cancel()
+        
+        # Write any settings changes that are still batched
+        await self.store.flush()
 
 async def setup(bot):
     await bot.add_cog(Verification(bot))
\ No newline at end of file
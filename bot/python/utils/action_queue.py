@@ -0,0 +1,352 @@
+"""
+Guard-shin Discord Bot - Batched Moderation Action Queue
+This module moves auto-moderation REST calls off the message handler. Actions
+are queued per guild and drained by a short-lived worker that bulk-deletes
+messages per channel, applies each member's timeout, kick or ban once, and
+merges warning notices into a single message per channel.
+"""
+
+import asyncio
+import datetime
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import discord
+
+from bot.python.utils.rest_scheduler import CRITICAL, HIGH, NORMAL, RestScheduler
+
+logger = logging.getLogger('guard-shin.action_queue')
+
+# Seconds a worker waits after the first queued action so a burst can be batched
+BATCH_WINDOW = 0.5
+
+# Discord limits
+BULK_DELETE_LIMIT = 100  # messages per delete_messages call
+BULK_DELETE_MAX_AGE = datetime.timedelta(days=14) - datetime.timedelta(minutes=5)
+MESSAGE_LIMIT = 2000  # characters per message
+
+# Seconds merged notices stay in the channel
+NOTICE_LIFETIME = 10
+
+# Removals override each other in this order (a ban supersedes a kick)
+_REMOVAL_RANK = {'kick': 1, 'ban': 2}
+
+
+class _GuildActions:
+    """Actions waiting to be sent for one guild"""
+
+    __slots__ = ('deletes', 'timeouts', 'removals', 'notices', 'worker')
+
+    def __init__(self):
+        # channel_id -> (channel, {message_id: message})
+        self.deletes: Dict[int, Tuple[Any, Dict[int, Any]]] = {}
+        # user_id -> (member, until, reason, channel, notice)
+        self.timeouts: Dict[int, Tuple[Any, datetime.datetime, str, Any, Optional[str]]] = {}
+        # user_id -> (kind, member, reason, channel, notice)
+        self.removals: Dict[int, Tuple[str, Any, str, Any, Optional[str]]] = {}
+        # channel_id -> (channel, [notice lines])
+        self.notices: Dict[int, Tuple[Any, List[str]]] = {}
+        self.worker: Optional[asyncio.Task] = None
+
+    def __bool__(self) -> bool:
+        return bool(self.deletes or self.timeouts or self.removals or self.notices)
+
+
+class ActionQueue:
+    """Per-guild queue of moderation actions, drained in batches
+
+    Queuing never waits on Discord: each method records the action and makes
+    sure the guild has a worker. The worker sleeps for ``window`` seconds to
+    collect a burst, then sends deletes first, then member actions, then
+    notices, and exits once the guild has nothing left to send.
+    """
+
+    def __init__(self, rest: RestScheduler, window: float = BATCH_WINDOW):
+        """Create the queue
+
+        Args:
+            rest: Scheduler the REST calls are sent through
+            window: Seconds to collect actions before sending a batch
+        """
+        self.rest = rest
+        self.window = window
+        self._guilds: Dict[int, _GuildActions] = {}
+
+        # Most recent timeout applied per (guild_id, user_id), so repeats are skipped
+        self._timed_out: Dict[Tuple[int, int], datetime.datetime] = {}
+
+        # Counters
+        self.batches = 0
+        self.deletes_queued = 0
+        self.bulk_deletes = 0
+        self.single_deletes = 0
+        self.timeouts_applied = 0
+        self.timeouts_skipped = 0
+        self.removals_applied = 0
+        self.notices_queued = 0
+        self.notices_sent = 0
+        self.errors = 0
+
+    def _guild(self, guild_id: int) -> _GuildActions:
+        """Get a guild's pending actions and make sure a worker will drain them"""
+        pending = self._guilds.get(guild_id)
+        if pending is None:
+            pending = self._guilds[guild_id] = _GuildActions()
+        if pending.worker is None or pending.worker.done():
+            pending.worker = asyncio.ensure_future(self._run(guild_id, pending))
+        return pending
+
+    def delete(self, message):
+        """Queue a message for deletion"""
+        pending = self._guild(message.guild.id)
+        channel_id = message.channel.id
+        if channel_id not in pending.deletes:
+            pending.deletes[channel_id] = (message.channel, {})
+        pending.deletes[channel_id][1][message.id] = message
+        self.deletes_queued += 1
+
+    def notice(self, channel, text: str):
+        """Queue a notice; notices for the same channel are sent as one message"""
+        pending = self._guild(channel.guild.id)
+        if channel.id not in pending.notices:
+            pending.notices[channel.id] = (channel, [])
+        lines = pending.notices[channel.id][1]
+        if text not in lines:
+            lines.append(text)
+        self.notices_queued += 1
+
+    def timeout(self, member, duration: float, reason: str, channel=None, notice: Optional[str] = None):
+        """Queue a timeout; a member already timed out for at least as long is skipped
+
+        Args:
+            member: The member to time out
+            duration: Timeout length in seconds
+            reason: Audit log reason
+            channel: Channel for the notice
+            notice: Notice to post once the timeout has been applied
+        """
+        guild_id = member.guild.id
+        until = discord.utils.utcnow() + datetime.timedelta(seconds=duration)
+
+        # Skip members whose current timeout already covers this one
+        current = self._timed_out.get((guild_id, member.id)) or getattr(member, 'timed_out_until', None)
+        if current is not None and current >= until - datetime.timedelta(seconds=1):
+            self.timeouts_skipped += 1
+            return
+
+        pending = self._guild(guild_id)
+        queued = pending.timeouts.get(member.id)
+        if queued is not None:
+            self.timeouts_skipped += 1
+            if queued[1] >= until:
+                return
+        pending.timeouts[member.id] = (member, until, reason, channel, notice)
+
+    def remove(self, kind: str, member, reason: str, channel=None, notice: Optional[str] = None):
+        """Queue a kick or ban ("kick" or "ban"); each member is removed at most once per batch"""
+        pending = self._guild(member.guild.id)
+        queued = pending.removals.get(member.id)
+        if queued is not None and _REMOVAL_RANK[queued[0]] >= _REMOVAL_RANK[kind]:
+            return
+        pending.removals[member.id] = (kind, member, reason, channel, notice)
+        # A member being removed does not also need a timeout
+        pending.timeouts.pop(member.id, None)
+
+    async def _run(self, guild_id: int, pending: _GuildActions):
+        """Worker: drain a guild's actions in batches until there are none left"""
+        try:
+            while pending:
+                await asyncio.sleep(self.window)
+                try:
+                    await self._drain(pending)
+                except Exception as e:
+                    self.errors += 1
+                    logger.error(f"Error sending moderation actions: {e}")
+        finally:
+            if not pending and self._guilds.get(guild_id) is pending:
+                del self._guilds[guild_id]
+
+    async def _drain(self, pending: _GuildActions):
+        """Send one batch of a guild's actions"""
+        deletes, pending.deletes = pending.deletes, {}
+        timeouts, pending.timeouts = pending.timeouts, {}
+        removals, pending.removals = pending.removals, {}
+        notices, pending.notices = pending.notices, {}
+        self.batches += 1
+
+        # Deletes first, so flagged content disappears as early as possible
+        await asyncio.gather(*(
+            self._delete_messages(channel, list(messages.values()))
+            for channel, messages in deletes.values()
+        ))
+
+        # Member actions, with their notices merged into the channel notices
+        for member, until, reason, channel, notice in timeouts.values():
+            if await self._apply_timeout(member, until, reason) and channel is not None and notice:
+                self._add_notice(notices, channel, notice)
+
+        for kind, member, reason, channel, notice in removals.values():
+            if await self._apply_removal(kind, member, reason) and channel is not None and notice:
+                self._add_notice(notices, channel, notice)
+
+        await asyncio.gather(*(self._send_notices(channel, lines) for channel, lines in notices.values()))
+
+    @staticmethod
+    def _add_notice(notices: Dict[int, Tuple[Any, List[str]]], channel, text: str):
+        """Add a line to a batch's notices"""
+        if channel.id not in notices:
+            notices[channel.id] = (channel, [])
+        notices[channel.id][1].append(text)
+
+    async def _delete_messages(self, channel, messages: List[Any]):
+        """Delete a channel's queued messages with as few calls as possible"""
+        # Bulk delete only accepts messages younger than two weeks
+        cutoff = discord.utils.utcnow() - BULK_DELETE_MAX_AGE
+        recent = [m for m in messages if m.created_at > cutoff]
+        single = [m for m in messages if m.created_at <= cutoff]
+
+        for start in range(0, len(recent), BULK_DELETE_LIMIT):
+            chunk = recent[start:start + BULK_DELETE_LIMIT]
+            if len(chunk) == 1:
+                single.extend(chunk)
+                continue
+            try:
+                await self.rest.run(CRITICAL, f"channel:{channel.id}", channel.delete_messages, chunk)
+                self.bulk_deletes += 1
+            except discord.errors.Forbidden:
+                logger.warning(f"Missing permissions to delete messages in {channel.guild.name}")
+                return
+            except discord.errors.HTTPException as e:
+                # e.g. a message in the chunk was already deleted; fall back to one call each
+                logger.debug(f"Bulk delete failed in {channel.guild.name}, deleting individually: {e}")
+                single.extend(chunk)
+
+        for message in single:
+            try:
+                await self.rest.run(CRITICAL, f"channel:{channel.id}", message.delete)
+                self.single_deletes += 1
+            except discord.errors.NotFound:
+                pass  # Message may have been deleted already
+            except discord.errors.Forbidden:
+                logger.warning(f"Missing permissions to delete message in {channel.guild.name}")
+                return
+            except discord.errors.HTTPException as e:
+                self.errors += 1
+                logger.error(f"Failed to delete message in {channel.guild.name}: {e}")
+
+    async def _apply_timeout(self, member, until: datetime.datetime, reason: str) -> bool:
+        """Time a member out; returns True on success"""
+        try:
+            await self.rest.run(CRITICAL, f"guild:{member.guild.id}", member.timeout, until, reason=reason)
+        except discord.errors.Forbidden:
+            logger.warning(f"Missing permissions to timeout user in {member.guild.name}")
+            return False
+        except discord.errors.HTTPException as e:
+            self.errors += 1
+            logger.error(f"Failed to timeout {member} in {member.guild.name}: {e}")
+            return False
+
+        self._timed_out[(member.guild.id, member.id)] = until
+        self.timeouts_applied += 1
+        return True
+
+    async def _apply_removal(self, kind: str, member, reason: str) -> bool:
+        """Kick or ban a member, trying to DM them first; returns True on success"""
+        guild = member.guild
+        try:
+            # The DM has to go out before the member leaves the guild
+            await self.rest.run(HIGH, f"dm:{member.id}", member.send,
+                                f"You have been {'banned' if kind == 'ban' else 'kicked'} from {guild.name}: {reason}")
+        except Exception:
+            pass  # Can't DM
+
+        try:
+            if kind == 'ban':
+                await self.rest.run(CRITICAL, f"guild:{guild.id}", guild.ban, member, reason=reason, delete_message_days=1)
+            else:
+                await self.rest.run(CRITICAL, f"guild:{guild.id}", guild.kick, member, reason=reason)
+        except discord.errors.Forbidden:
+            logger.warning(f"Missing permissions to {kind} user in {guild.name}")
+            return False
+        except discord.errors.HTTPException as e:
+            self.errors += 1
+            logger.error(f"Failed to {kind} {member} in {guild.name}: {e}")
+            return False
+
+        self.removals_applied += 1
+        return True
+
+    async def _send_notices(self, channel, lines: List[str]):
+        """Post a channel's notices as one message (split only if it would be too long)"""
+        messages = []
+        current = ""
+        for line in lines:
+            line = line[:MESSAGE_LIMIT]
+            if current and len(current) + len(line) + 1 > MESSAGE_LIMIT:
+                messages.append(current)
+                current = line
+            else:
+                current = f"{current}\n{line}" if current else line
+        if current:
+            messages.append(current)
+
+        for content in messages:
+            try:
+                await self.rest.run(NORMAL, f"channel:{channel.id}", channel.send, content, delete_after=NOTICE_LIFETIME)
+                self.notices_sent += 1
+            except discord.errors.Forbidden:
+                return
+            except discord.errors.HTTPException as e:
+                self.errors += 1
+                logger.error(f"Failed to send notice in {channel.guild.name}: {e}")
+
+    def sweep(self) -> int:
+        """Forget timeouts that have expired
+
+        Returns:
+            The number of entries removed
+        """
+        now = discord.utils.utcnow()
+        expired = [key for key, until in self._timed_out.items() if until <= now]
+        for key in expired:
+            del self._timed_out[key]
+        return len(expired)
+
+    def clear_guild(self, guild_id: int):
+        """Drop a guild's pending actions (e.g. when the bot leaves it)"""
+        pending = self._guilds.pop(guild_id, None)
+        if pending is not None and pending.worker is not None:
+            pending.worker.cancel()
+        for key in [key for key in self._timed_out if key[0] == guild_id]:
+            del self._timed_out[key]
+
+    async def close(self):
+        """Send every pending action now and stop the workers"""
+        guilds = list(self._guilds.values())
+        self._guilds.clear()
+        for pending in guilds:
+            if pending.worker is not None:
+                pending.worker.cancel()
+        await asyncio.gather(*(self._drain(pending) for pending in guilds if pending), return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and batching counters"""
+        return {
+            'active_guilds': len(self._guilds),
+            'pending': sum(
+                sum(len(messages) for _, messages in pending.deletes.values())
+                + len(pending.timeouts) + len(pending.removals)
+                + sum(len(lines) for _, lines in pending.notices.values())
+                for pending in self._guilds.values()
+            ),
+            'batches': self.batches,
+            'deletes_queued': self.deletes_queued,
+            'bulk_deletes': self.bulk_deletes,
+            'single_deletes': self.single_deletes,
+            'timeouts_applied': self.timeouts_applied,
+            'timeouts_skipped': self.timeouts_skipped,
+            'removals_applied': self.removals_applied,
+            'notices_queued': self.notices_queued,
+            'notices_sent': self.notices_sent,
+            'errors': self.errors
+        }
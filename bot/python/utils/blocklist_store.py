@@ -0,0 +1,240 @@
+"""
+Guard-shin Discord Bot - Memory-Mapped Domain Blocklist
+This module compiles large domain blocklist feeds into a sorted binary file
+that is memory-mapped and binary-searched in place, so a list with hundreds of
+thousands of domains is shared by every guild without being loaded into
+Python objects. Reloads happen in a worker thread and swap atomically.
+"""
+
+import array
+import asyncio
+import logging
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from typing import Optional, Tuple
+
+from bot.python.utils.domain_index import host_suffixes, iter_domain_file
+
+logger = logging.getLogger('guard-shin.blocklist_store')
+
+# File layout: header, (count + 1) uint32 offsets into the data block, then the
+# sorted domains as concatenated ASCII bytes
+MAGIC = b'GSBL'
+HEADER = struct.Struct('<4sB3xI')  # magic, byte order (1 = little endian), count
+NATIVE_ORDER = 1 if sys.byteorder == 'little' else 0
+
+
+def compile_blocklist(source_path: str, dest_path: str) -> int:
+    """Compile a text blocklist into the binary format
+
+    The output is written to a temporary file and moved into place with
+    os.replace, so readers never see a partially written file.
+
+    Args:
+        source_path: Text blocklist (see iter_domain_file for the format)
+        dest_path: Binary file to create or replace
+
+    Returns:
+        The number of domains written
+    """
+    # Dotless entries would block whole top-level domains, so they are skipped
+    domains = sorted({
+        domain.encode('utf-8') for domain in iter_domain_file(source_path) if '.' in domain
+    })
+
+    offsets = array.array('I', [0])
+    position = 0
+    for domain in domains:
+        position += len(domain)
+        offsets.append(position)
+
+    # A temp file unique to this call, so processes compiling at the same time never
+    # write into the same file; each one's os.replace swaps in a complete blocklist
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(dest_path) or '.',
+                                     prefix=f"{os.path.basename(dest_path)}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, NATIVE_ORDER, len(domains)))
+            offsets.tofile(f)
+            for domain in domains:
+                f.write(domain)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, dest_path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+    return len(domains)
+
+
+class BlocklistFile:
+    """A compiled blocklist mapped into memory"""
+
+    def __init__(self, path: str):
+        """Map a compiled blocklist
+
+        Raises:
+            ValueError: If the file is not a blocklist compiled on this platform
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            magic, order, count = HEADER.unpack_from(self._mmap, 0)
+            data_start = HEADER.size + 4 * (count + 1)
+            if magic != MAGIC or order != NATIVE_ORDER or len(self._mmap) < data_start:
+                raise ValueError(f"{path} is not a compatible blocklist file")
+        except (struct.error, ValueError):
+            self._mmap.close()
+            raise ValueError(f"{path} is not a compatible blocklist file")
+
+        self.count = count
+        self._data_start = data_start
+        # Zero-copy view of the offset table
+        self._offsets = memoryview(self._mmap)[HEADER.size:data_start].cast('I')
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __contains__(self, domain: str) -> bool:
+        """Binary search for an exact domain"""
+        key = domain.encode('utf-8')
+        buffer = self._mmap
+        offsets = self._offsets
+        base = self._data_start
+        low = 0
+        high = self.count
+
+        while low < high:
+            middle = (low + high) // 2
+            entry = buffer[base + offsets[middle]:base + offsets[middle + 1]]
+            if entry < key:
+                low = middle + 1
+            elif entry > key:
+                high = middle
+            else:
+                return True
+
+        return False
+
+    def close(self):
+        """Unmap the file"""
+        self._offsets.release()
+        self._mmap.close()
+
+
+class BlocklistStore:
+    """Shared, hot-reloadable domain blocklist
+
+    The source is a text feed (refreshed externally, e.g. by cron). It is
+    compiled to "<source>.bin" when the feed is newer than the compiled file,
+    and the compiled file is mapped and searched in place. Lookups always see
+    either the old or the new list, never a mix.
+    """
+
+    def __init__(self, source_path: str, compiled_path: Optional[str] = None):
+        """Create the store (call reload to load it)
+
+        Args:
+            source_path: The text blocklist feed
+            compiled_path: Where to keep the compiled file (defaults to "<source>.bin")
+        """
+        self.source_path = source_path
+        self.compiled_path = compiled_path or f"{source_path}.bin"
+        self._file: Optional[BlocklistFile] = None
+        self._signature: Optional[Tuple[int, int]] = None
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._file) if self._file is not None else 0
+
+    def match_host(self, host: Optional[str]) -> Optional[str]:
+        """Find the blocklisted domain that matches a host or one of its parents
+
+        Args:
+            host: A host returned by parse_host
+
+        Returns:
+            The blocklisted domain, or None
+        """
+        blocklist = self._file
+        if blocklist is None or not host:
+            return None
+
+        for suffix in host_suffixes(host):
+            if '.' not in suffix:
+                break
+            if suffix in blocklist:
+                return suffix
+
+        return None
+
+    def _current_signature(self) -> Optional[Tuple[int, int]]:
+        """Modification time and size of the feed (or of the compiled file if there is no feed)"""
+        for path in (self.source_path, self.compiled_path):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            return stat.st_mtime_ns, stat.st_size
+        return None
+
+    def _load(self) -> BlocklistFile:
+        """Compile the feed if needed and map the result (runs in a worker thread)"""
+        source_exists = os.path.exists(self.source_path)
+        if source_exists:
+            try:
+                stale = os.path.getmtime(self.compiled_path) < os.path.getmtime(self.source_path)
+            except OSError:
+                stale = True
+            if stale:
+                count = compile_blocklist(self.source_path, self.compiled_path)
+                logger.info(f"Compiled {count} blocklisted domains from {self.source_path}")
+
+        try:
+            return BlocklistFile(self.compiled_path)
+        except ValueError:
+            if not source_exists:
+                raise
+            # Compiled on another platform or by an older version
+            compile_blocklist(self.source_path, self.compiled_path)
+            return BlocklistFile(self.compiled_path)
+
+    async def reload(self, force: bool = False) -> bool:
+        """Reload the blocklist if the feed changed, without blocking the event loop
+
+        Args:
+            force: Reload even if the feed looks unchanged
+
+        Returns:
+            True if a new list was swapped in
+        """
+        async with self._lock:
+            signature = self._current_signature()
+            if signature is None or (signature == self._signature and not force):
+                return False
+
+            loop = asyncio.get_running_loop()
+            try:
+                new_file = await loop.run_in_executor(None, self._load)
+            except (OSError, ValueError) as e:
+                logger.error(f"Failed to load domain blocklist {self.source_path}: {e}")
+                return False
+
+            # Lookups run on the event loop without awaiting, so none can be
+            # using the old mapping once the reference has been swapped
+            old_file, self._file = self._file, new_file
+            self._signature = signature
+            if old_file is not None:
+                old_file.close()
+
+            logger.info(f"Loaded {len(new_file)} blocklisted domains from {self.compiled_path}")
+            return True
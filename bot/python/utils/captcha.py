@@ -0,0 +1,312 @@
+"""
+Guard-shin Discord Bot - Image CAPTCHAs
+This module renders verification codes as distorted images with Pillow and
+NumPy. Rendering runs in a process pool so it never blocks the event loop,
+and a pool of finished CAPTCHAs per difficulty is kept topped up in the
+background, so a join wave is served from memory without waiting on a
+render. Without Pillow/NumPy installed, CAPTCHAs fall back to plain-text
+codes.
+"""
+
+import asyncio
+import io
+import logging
+import multiprocessing
+import random
+import string
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Deque, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+try:
+    import numpy as np
+    from PIL import Image, ImageDraw, ImageFilter, ImageFont
+except ImportError:
+    np = None
+    Image = ImageDraw = ImageFilter = ImageFont = None
+
+logger = logging.getLogger('guard-shin.captcha')
+
+# Whether image CAPTCHAs can be rendered
+IMAGES_AVAILABLE = Image is not None and np is not None
+
+# Ready CAPTCHAs kept per difficulty, and the level at which a refill starts
+POOL_SIZE = 250
+POOL_LOW_WATER = 100
+
+# CAPTCHAs rendered per worker call
+RENDER_BATCH = 25
+
+# Render processes
+RENDER_WORKERS = 2
+
+# Difficulties filled at startup (others fill on first use)
+PREFILL_DIFFICULTIES = ('medium',)
+
+# Characters and length per difficulty for plain-text codes
+TEXT_CODES = {
+    'easy': (string.digits, 5),
+    'medium': (string.ascii_uppercase + string.digits, 6),
+    'hard': (string.ascii_uppercase + string.digits + "!@#$%&*", 8)
+}
+
+# Image codes leave out characters that look alike once distorted (0/O, 1/I, 5/S, 8/B)
+IMAGE_CODES = {
+    'easy': ("234679", 5),
+    'medium': ("ACDEFGHJKLMNPQRTUVWXY234679", 6),
+    'hard': ("ACDEFGHJKLMNPQRTUVWXY234679#%&", 7)
+}
+
+# Distortion per difficulty: (wave amplitude in px, noise lines, speckle share)
+DISTORTION = {
+    'easy': (2.0, 3, 0.02),
+    'medium': (4.0, 6, 0.05),
+    'hard': (6.0, 10, 0.08)
+}
+
+IMAGE_SIZE = (260, 90)
+FONT_SIZE = 44
+
+
+class Captcha(NamedTuple):
+    """A code and, when images are available, the PNG showing it"""
+    code: str
+    image: Optional[bytes]
+
+
+def generate_code(difficulty: str = "medium", for_image: bool = False) -> str:
+    """Generate a random code for a difficulty
+
+    Args:
+        difficulty: "easy", "medium" or "hard" (anything else is medium)
+        for_image: Use the alphabet without look-alike characters
+    """
+    codes = IMAGE_CODES if for_image else TEXT_CODES
+    alphabet, length = codes.get(difficulty, codes['medium'])
+    return ''.join(random.choices(alphabet, k=length))
+
+
+_font = None
+
+
+def _load_font():
+    """The font codes are drawn with (loaded once per render process)"""
+    global _font
+    if _font is None:
+        for name in ("DejaVuSans-Bold.ttf", "DejaVuSans.ttf", "Arial.ttf"):
+            try:
+                _font = ImageFont.truetype(name, FONT_SIZE)
+                break
+            except OSError:
+                continue
+        else:
+            try:
+                _font = ImageFont.load_default(size=FONT_SIZE)
+            except TypeError:
+                _font = ImageFont.load_default()  # Pillow < 10.1 has no scalable default font
+    return _font
+
+
+def render_captcha(code: str, difficulty: str = "medium", seed: Optional[int] = None) -> bytes:
+    """Render a code as a distorted PNG (CPU-bound; run it in a worker process)
+
+    Each character is drawn rotated and offset on its own layer, the image is
+    warped with a sine wave along both axes, and noise lines and speckles are
+    added on top.
+    """
+    rng = random.Random(seed)
+    amplitude, lines, speckle = DISTORTION.get(difficulty, DISTORTION['medium'])
+    width, height = IMAGE_SIZE
+    font = _load_font()
+
+    background = tuple(rng.randint(220, 255) for _ in range(3))
+    image = Image.new('RGB', IMAGE_SIZE, background)
+
+    # Characters, each rotated and jittered
+    step = (width - 20) / len(code)
+    for index, char in enumerate(code):
+        layer = Image.new('L', (FONT_SIZE * 2, FONT_SIZE * 2), 0)
+        ImageDraw.Draw(layer).text((FONT_SIZE // 2, FONT_SIZE // 3), char, font=font, fill=255)
+        layer = layer.rotate(rng.uniform(-30, 30), resample=Image.BICUBIC)
+        color = tuple(rng.randint(0, 120) for _ in range(3))
+        x = int(10 + index * step + rng.uniform(-4, 4) - FONT_SIZE // 2)
+        y = int((height - FONT_SIZE * 2) / 2 + rng.uniform(-8, 8))
+        image.paste(color, (x, y), layer)
+
+    # Sine warp: shift rows horizontally and columns vertically
+    pixels = np.asarray(image)
+    period_x = rng.uniform(40, 80)
+    period_y = rng.uniform(25, 50)
+    phase = rng.uniform(0, 2 * np.pi)
+    rows = np.arange(height)[:, None]
+    cols = np.arange(width)[None, :]
+    source_x = np.clip(cols + amplitude * np.sin(2 * np.pi * rows / period_y + phase), 0, width - 1).astype(np.intp)
+    source_y = np.clip(rows + amplitude * np.sin(2 * np.pi * cols / period_x + phase), 0, height - 1).astype(np.intp)
+    pixels = pixels[source_y, source_x]
+
+    # Speckles
+    noise = np.random.default_rng(rng.getrandbits(32))
+    mask = noise.random((height, width)) < speckle
+    pixels = pixels.copy()
+    pixels[mask] = noise.integers(0, 256, size=(int(mask.sum()), 3), dtype=np.uint8)
+    image = Image.fromarray(pixels)
+
+    # Lines through the text
+    draw = ImageDraw.Draw(image)
+    for _ in range(lines):
+        start = (rng.randint(0, width // 3), rng.randint(0, height))
+        end = (rng.randint(2 * width // 3, width), rng.randint(0, height))
+        draw.line([start, end], fill=tuple(rng.randint(0, 160) for _ in range(3)), width=rng.randint(1, 3))
+
+    image = image.filter(ImageFilter.SMOOTH)
+    output = io.BytesIO()
+    image.save(output, format='PNG', compress_level=1)  # fast to encode; the image is tiny either way
+    return output.getvalue()
+
+
+def render_batch(difficulty: str, count: int) -> List[Tuple[str, bytes]]:
+    """Generate and render a batch of CAPTCHAs (runs in a worker process)"""
+    batch = []
+    for _ in range(count):
+        code = generate_code(difficulty, for_image=True)
+        batch.append((code, render_captcha(code, difficulty, random.getrandbits(64))))
+    return batch
+
+
+class CaptchaPool:
+    """Pre-rendered image CAPTCHAs per difficulty, refilled in the background
+
+    ``get`` pops a ready CAPTCHA and, when the pool drops below its low-water
+    mark, starts a refill that renders batches in the process pool until the
+    pool is full again. Only an empty pool makes a caller wait for a render.
+    """
+
+    def __init__(self, size: int = POOL_SIZE, low_water: int = POOL_LOW_WATER,
+                 batch: int = RENDER_BATCH, workers: int = RENDER_WORKERS):
+        """Create the pool (nothing is rendered until start() or the first get())
+
+        Args:
+            size: Ready CAPTCHAs kept per difficulty
+            low_water: Pool level that triggers a refill
+            batch: CAPTCHAs rendered per worker call
+            workers: Render processes
+        """
+        self.size = size
+        self.low_water = low_water
+        self.batch = batch
+        self.workers = workers
+        self.enabled = IMAGES_AVAILABLE
+
+        self._ready: Dict[str, Deque[Captcha]] = {}
+        self._refills: Dict[str, asyncio.Task] = {}
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+        # Counters
+        self.served = 0
+        self.rendered = 0
+        self.misses = 0  # callers that found the pool empty
+        self.errors = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Start the render processes on first use"""
+        if self._executor is None:
+            # Spawned, not forked: the bot process has database and executor threads
+            self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+        return self._executor
+
+    async def _render(self, difficulty: str, count: int) -> List[Captcha]:
+        """Render CAPTCHAs in the process pool"""
+        loop = asyncio.get_running_loop()
+        batch = await loop.run_in_executor(self._get_executor(), render_batch, difficulty, count)
+        self.rendered += len(batch)
+        return [Captcha(code, image) for code, image in batch]
+
+    def start(self, difficulties: Iterable[str] = PREFILL_DIFFICULTIES):
+        """Start filling the pool for some difficulties (needs a running event loop)"""
+        for difficulty in difficulties:
+            self._refill(difficulty)
+
+    def _refill(self, difficulty: str):
+        """Make sure a refill is running for a difficulty"""
+        if not self.enabled:
+            return
+        task = self._refills.get(difficulty)
+        if task is None or task.done():
+            self._refills[difficulty] = asyncio.ensure_future(self._fill(difficulty))
+
+    async def _fill(self, difficulty: str):
+        """Render batches (one per worker at a time) until a difficulty's pool is full"""
+        ready = self._ready.setdefault(difficulty, deque())
+        try:
+            while len(ready) < self.size:
+                missing = min(self.size - len(ready), self.batch * self.workers)
+                counts = [min(self.batch, missing - start) for start in range(0, missing, self.batch)]
+                for batch in await asyncio.gather(*(self._render(difficulty, count) for count in counts)):
+                    ready.extend(batch)
+        except BrokenProcessPool as e:
+            # A render process died (e.g. killed for memory); start a fresh pool on the next refill
+            self.errors += 1
+            logger.error(f"CAPTCHA render pool broke: {e}")
+            self._executor = None
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Error rendering {difficulty} CAPTCHAs: {e}")
+
+    async def get(self, difficulty: str = "medium") -> Captcha:
+        """Get a CAPTCHA, from the pool when one is ready
+
+        Returns:
+            A Captcha; its image is None when images are not available or rendering failed
+        """
+        if difficulty not in DISTORTION:
+            difficulty = 'medium'
+        if not self.enabled:
+            return Captcha(generate_code(difficulty), None)
+
+        ready = self._ready.setdefault(difficulty, deque())
+        if len(ready) <= self.low_water:
+            self._refill(difficulty)
+        if ready:
+            self.served += 1
+            return ready.popleft()
+
+        # Pool drained (or never filled): render this one on its own
+        self.misses += 1
+        try:
+            captcha = (await self._render(difficulty, 1))[0]
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Error rendering a {difficulty} CAPTCHA: {e}")
+            return Captcha(generate_code(difficulty), None)
+        self.served += 1
+        return captcha
+
+    async def close(self):
+        """Stop refilling and shut the render processes down"""
+        for task in self._refills.values():
+            task.cancel()
+        self._refills.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool levels and counters"""
+        return {
+            'enabled': self.enabled,
+            'ready': {difficulty: len(ready) for difficulty, ready in self._ready.items()},
+            'served': self.served,
+            'rendered': self.rendered,
+            'misses': self.misses,
+            'errors': self.errors
+        }
+
+
+def get_captcha_pool(bot) -> CaptchaPool:
+    """Get the CAPTCHA pool shared by every cog, creating it on first use"""
+    pool = getattr(bot, 'captcha_pool', None)
+    if pool is None:
+        pool = bot.captcha_pool = CaptchaPool()
+    return pool
@@ -0,0 +1,166 @@
+"""
+Guard-shin Discord Bot - Channel Role Resolution
+This module answers "which channel is this guild's log / welcome /
+verification / alerts channel" for every cog. An explicitly configured
+channel wins; otherwise the guild's channels are scanned by name once and
+the result is cached until a channel is created, renamed or deleted, so each
+lookup is a dict access instead of a scan over every text channel.
+"""
+
+import logging
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from bot.python.utils.settings_store import get_settings_store
+
+logger = logging.getLogger('guard-shin.channel_resolver')
+
+# Settings store namespace for explicitly configured channels (role -> channel id)
+CHANNEL_ROLES_NAMESPACE = 'channel_roles'
+
+
+class ChannelRule(NamedTuple):
+    """How to find a role's channel by name when none is configured"""
+    names: Tuple[str, ...]  # exact channel names, in order of preference
+    contains: Tuple[str, ...]  # otherwise the first channel whose name contains one of these
+
+
+# Channel roles and their name fallbacks
+CHANNEL_ROLES: Dict[str, ChannelRule] = {
+    'log': ChannelRule((), ('log', 'mod')),
+    'welcome': ChannelRule((), ('welcome', 'general')),
+    'verification': ChannelRule((), ('verif', 'welcome')),
+    'alerts': ChannelRule(("mod-log", "logs", "audit-log", "security", "raid-alerts", "staff-alerts"), ())
+}
+
+
+def match_channel(guild, rule: ChannelRule) -> Optional[Any]:
+    """Scan a guild's text channels for the first one matching a rule"""
+    if rule.names:
+        by_name = {}
+        for channel in guild.text_channels:
+            by_name.setdefault(channel.name, channel)
+        for name in rule.names:
+            if name in by_name:
+                return by_name[name]
+
+    if rule.contains:
+        for channel in guild.text_channels:
+            name = channel.name.lower()
+            if any(part in name for part in rule.contains):
+                return channel
+    return None
+
+
+class ChannelResolver:
+    """Per-guild channel role lookups with explicit config and a cached name scan
+
+    Scan results (including "no match") are cached per guild and role and
+    dropped for the whole guild whenever one of its channels is created,
+    updated or deleted. Configured channels are read through the settings
+    store, which keeps them in memory after the first load.
+    """
+
+    def __init__(self, bot):
+        """Create the resolver and subscribe to channel events
+
+        Args:
+            bot: The bot
+        """
+        self.bot = bot
+        self.store = get_settings_store(bot)
+        self._scans: Dict[int, Dict[str, Optional[int]]] = {}  # guild_id -> role -> channel id (None = no match)
+
+        # Counters
+        self.scans = 0
+        self.invalidations = 0
+
+        bot.add_listener(self._on_channel_event, 'on_guild_channel_create')
+        bot.add_listener(self._on_channel_event, 'on_guild_channel_delete')
+        bot.add_listener(self._on_channel_update, 'on_guild_channel_update')
+        bot.add_listener(self._on_guild_remove, 'on_guild_remove')
+
+    async def resolve(self, guild, role: str, configured: Optional[Any] = None):
+        """Get a guild's channel for a role
+
+        Args:
+            guild: The guild
+            role: One of CHANNEL_ROLES
+            configured: A channel id the calling cog has configured for this role, if any
+
+        Returns:
+            The channel, or None if none is configured or matches by name
+        """
+        # A channel configured in the cog's own settings
+        if configured:
+            channel = guild.get_channel(int(configured))
+            if channel is not None:
+                return channel
+
+        # A channel configured with !channelrole
+        explicit = (await self.store.load(CHANNEL_ROLES_NAMESPACE, guild.id) or {}).get(role)
+        if explicit:
+            channel = guild.get_channel(int(explicit))
+            if channel is not None:
+                return channel
+
+        # The cached name scan
+        scans = self._scans.setdefault(guild.id, {})
+        if role not in scans:
+            self.scans += 1
+            channel = match_channel(guild, CHANNEL_ROLES[role])
+            scans[role] = channel.id if channel is not None else None
+        channel_id = scans[role]
+        return guild.get_channel(channel_id) if channel_id is not None else None
+
+    async def configured(self, guild_id: int) -> Dict[str, int]:
+        """A guild's explicitly configured channels (role -> channel id)"""
+        return dict(await self.store.load(CHANNEL_ROLES_NAMESPACE, guild_id) or {})
+
+    async def configure(self, guild_id: int, role: str, channel_id: Optional[int]):
+        """Set (or with None, clear) the explicit channel for a role"""
+        if role not in CHANNEL_ROLES:
+            raise ValueError(f"Unknown channel role: {role}")
+
+        roles = await self.configured(guild_id)
+        if channel_id is None:
+            roles.pop(role, None)
+        else:
+            roles[role] = channel_id
+        self.store.save(CHANNEL_ROLES_NAMESPACE, guild_id, roles or None)
+
+    def invalidate(self, guild_id: Optional[int] = None):
+        """Drop cached scan results for one guild, or all guilds"""
+        self.invalidations += 1
+        if guild_id is None:
+            self._scans.clear()
+        else:
+            self._scans.pop(guild_id, None)
+
+    async def _on_channel_event(self, channel):
+        """A channel was created or deleted"""
+        self.invalidate(channel.guild.id)
+
+    async def _on_channel_update(self, before, after):
+        """A channel changed; only its name and type affect the scan"""
+        if before.name != after.name or before.type != after.type:
+            self.invalidate(after.guild.id)
+
+    async def _on_guild_remove(self, guild):
+        """The bot left a guild"""
+        self._scans.pop(guild.id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache size and counters"""
+        return {
+            'guilds': len(self._scans),
+            'scans': self.scans,
+            'invalidations': self.invalidations
+        }
+
+
+def get_channel_resolver(bot) -> ChannelResolver:
+    """Get the channel resolver shared by every cog, creating it on first use"""
+    resolver = getattr(bot, 'channel_resolver', None)
+    if resolver is None:
+        resolver = bot.channel_resolver = ChannelResolver(bot)
+    return resolver
@@ -0,0 +1,193 @@
+"""
+Guard-shin Discord Bot - Domain Reputation Index
+This module parses URLs properly and answers allow/deny questions about their
+host with a suffix lookup, so "discord.com" matches "cdn.discord.com" but not
+"discord.com.evil.xyz", and the cost does not grow with the list size.
+"""
+
+import logging
+import os
+from functools import lru_cache
+from typing import Iterable, Iterator, Optional, Tuple
+from urllib.parse import urlsplit
+
+from bot.python.utils.word_matcher import WordMatcher
+
+logger = logging.getLogger('guard-shin.domain_index')
+
+
+def normalize_domain(domain: str) -> Optional[str]:
+    """Normalize a domain or blocklist entry for lookups
+
+    Lowercases, strips surrounding dots and a leading "*." wildcard, and
+    converts internationalized names to their ASCII (punycode) form so
+    lookalike domains match the form blocklists are published in.
+
+    Returns:
+        The normalized domain, or None if nothing is left
+    """
+    domain = domain.strip().lower()
+    if domain.startswith('*.'):
+        domain = domain[2:]
+    domain = domain.strip('.')
+    if not domain:
+        return None
+
+    if not domain.isascii():
+        try:
+            domain = domain.encode('idna').decode('ascii')
+        except UnicodeError:
+            pass
+    return domain
+
+
+def parse_host(url: str) -> Optional[str]:
+    """Extract the normalized host from a URL
+
+    Handles userinfo ("https://discord.com@evil.xyz"), ports and trailing
+    dots the way a browser would.
+
+    Returns:
+        The host, or None if the URL has no usable host
+    """
+    try:
+        host = urlsplit(url).hostname
+    except ValueError:
+        return None
+    if not host:
+        return None
+    return normalize_domain(host)
+
+
+def host_suffixes(host: str) -> Iterator[str]:
+    """Yield the host and each parent domain ("a.b.c" -> "a.b.c", "b.c", "c")"""
+    yield host
+    index = host.find('.')
+    while index != -1:
+        yield host[index + 1:]
+        index = host.find('.', index + 1)
+
+
+def iter_domain_file(path: str) -> Iterator[str]:
+    """Read the normalized domains from a blocklist file
+
+    The file has one domain per line. Blank lines and "#" comments are
+    skipped, and hosts-file lines ("0.0.0.0 evil.xyz") are accepted too,
+    taking the last field.
+    """
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if line:
+                domain = normalize_domain(line.split()[-1])
+                if domain:
+                    yield domain
+
+
+class DomainIndex:
+    """Set of domains matched against a host and all of its parent domains
+
+    Entries containing a dot are treated as domains and match the host or
+    any subdomain of it. Entries without a dot (e.g. "dlscord") are treated
+    as keyword fragments and match anywhere in the host, never the path.
+
+    Domains are kept in a single hash set, which is far smaller than a trie
+    of per-label dicts, so a lookup costs one set probe per label of the host.
+    """
+
+    def __init__(self, entries: Iterable[str] = (), fragments: bool = True):
+        """Build the index
+
+        Args:
+            entries: Domains and keyword fragments
+            fragments: Treat entries without a dot as keyword fragments;
+                when False every entry is a domain (used for allowlists)
+        """
+        self.allow_fragments = fragments
+        self._domains = set()
+        self._fragments: Optional[WordMatcher] = None
+
+        for entry in entries:
+            self.add(entry)
+
+    def add(self, entry: str) -> bool:
+        """Add a domain or fragment
+
+        Returns:
+            True if the entry was not already present
+        """
+        entry = normalize_domain(entry)
+        if not entry:
+            return False
+
+        if self.allow_fragments and '.' not in entry:
+            if self._fragments is None:
+                self._fragments = WordMatcher()
+            return self._fragments.add(entry)
+
+        if entry in self._domains:
+            return False
+        self._domains.add(entry)
+        return True
+
+    def __len__(self) -> int:
+        return len(self._domains) + (len(self._fragments) if self._fragments else 0)
+
+    def match_host(self, host: Optional[str]) -> Optional[str]:
+        """Find the entry that matches a host
+
+        Args:
+            host: A host returned by parse_host
+
+        Returns:
+            The matching domain or fragment, or None
+        """
+        if not host:
+            return None
+
+        domains = self._domains
+        if domains:
+            for suffix in host_suffixes(host):
+                if suffix in domains:
+                    return suffix
+
+        if self._fragments is not None:
+            found = self._fragments.find_all(host)
+            if found:
+                return found[0]
+
+        return None
+
+    def match(self, url: str) -> Optional[str]:
+        """Find the entry that matches a URL's host"""
+        return self.match_host(parse_host(url))
+
+    @classmethod
+    def from_file(cls, path: str, fragments: bool = False) -> 'DomainIndex':
+        """Load a blocklist file (see iter_domain_file for the format)
+
+        Args:
+            path: The blocklist file
+            fragments: Treat dotless entries as keyword fragments
+
+        Returns:
+            The loaded index (empty if the file does not exist)
+        """
+        index = cls(fragments=fragments)
+        if not os.path.exists(path):
+            return index
+
+        try:
+            for domain in iter_domain_file(path):
+                index.add(domain)
+        except OSError as e:
+            logger.error(f"Failed to load domain blocklist {path}: {e}")
+
+        logger.info(f"Loaded {len(index)} domains from {path}")
+        return index
+
+
+@lru_cache(maxsize=64)
+def compile_domain_index(entries: Tuple[str, ...], fragments: bool = True) -> DomainIndex:
+    """Build a domain index, sharing the result between guilds with identical lists"""
+    return DomainIndex(entries, fragments)
@@ -0,0 +1,195 @@
+"""
+Guard-shin Discord Bot - Compiled Auto-Moderation Rules
+This module turns a guild's auto-moderation settings into a compiled ruleset
+and scans each message once so every rule can share the extracted features.
+"""
+
+import re
+from collections import Counter
+from typing import Dict, Any, List, Optional, Tuple
+
+from bot.python.utils.domain_index import DomainIndex, compile_domain_index, parse_host
+from bot.python.utils.pattern_set import PatternSet, compile_pattern_set
+from bot.python.utils.word_matcher import WordMatcher
+
+# Shared patterns, compiled once for the whole process
+URL_PATTERN = re.compile(r'https?://[^\s<>"\'`]+', re.IGNORECASE)
+INVITE_PATTERN = re.compile(r'(?:https?://)?(?:www\.)?(?:discord\.(?:gg|io|me|li|com)/|discordapp\.com/invite/)([a-zA-Z0-9-]+)')
+CUSTOM_EMOJI_PATTERN = re.compile(r'<a?:[a-zA-Z0-9_]+:[0-9]+>')
+WORD_PATTERN = re.compile(r'\b(\w+)\b')
+
+# Order in which rules are evaluated (highest severity first)
+RULE_ORDER: List[Tuple[str, str]] = [
+    ('anti_phishing', 'check_phishing'),
+    ('anti_token_grabber', 'check_token_grabber'),
+    ('anti_ip_grabber', 'check_ip_grabber'),
+    ('scam_detection', 'check_scam'),
+    ('profanity_filter', 'check_profanity'),
+    ('link_filter', 'check_links'),
+    ('invite_filter', 'check_invites'),
+    ('spam_protection', 'check_spam'),
+    ('repeated_text', 'check_repeated_text'),
+    ('caps_filter', 'check_caps'),
+    ('mention_spam', 'check_mention_spam'),
+    ('zalgo_text', 'check_zalgo'),
+    ('emoji_spam', 'check_emoji_spam'),
+    ('new_account_filter', 'check_new_account'),
+]
+
+
+def _is_standard_emoji(code: int) -> bool:
+    """Check whether a code point falls in the emoji ranges the filter counts"""
+    return 0x1F000 <= code <= 0x1F9FF or 0x2600 <= code <= 0x27FF or code == 0x200D
+
+
+class MessageFeatures:
+    """Features extracted from a message in a single scan"""
+
+    __slots__ = (
+        'content', 'lower', 'length', 'urls', 'invites', 'uppercase_count',
+        'letter_count', 'longest_run', 'longest_combining_run', 'standard_emoji_count',
+        'custom_emoji', 'mention_count', '_word_counts', '_hosts'
+    )
+
+    def __init__(self, content: str, mention_count: int = 0):
+        """Scan the message content
+
+        Args:
+            content: The raw message content
+            mention_count: Number of user and role mentions in the message
+        """
+        self.content = content
+        self.lower = content.lower()
+        self.length = len(content)
+        self.mention_count = mention_count
+        self._word_counts = None
+        self._hosts = None
+
+        # URLs and invites (skip the regex engine when there is nothing to find)
+        lower = self.lower
+        self.urls = URL_PATTERN.findall(content) if 'http' in lower else []
+        self.invites = INVITE_PATTERN.findall(content) if 'discord' in lower else []
+        self.custom_emoji = CUSTOM_EMOJI_PATTERN.findall(content) if '<' in content else []
+
+        # Single pass over the characters for caps, runs, zalgo and emoji
+        uppercase = 0
+        letters = 0
+        longest_run = 0
+        run = 0
+        longest_combining = 0
+        combining = 0
+        emoji = 0
+        previous = None
+
+        for char in content:
+            if char.isalpha():
+                letters += 1
+                if char.isupper():
+                    uppercase += 1
+
+            if char == previous and char != '\n':
+                run += 1
+            else:
+                run = 1
+                previous = char
+            if run > longest_run:
+                longest_run = run
+
+            code = ord(char)
+            if 0x0300 <= code <= 0x036F or code == 0x0489:
+                combining += 1
+                if combining > longest_combining:
+                    longest_combining = combining
+            else:
+                combining = 0
+
+            if code >= 0x200D and _is_standard_emoji(code):
+                emoji += 1
+
+        self.uppercase_count = uppercase
+        self.letter_count = letters
+        self.longest_run = longest_run
+        self.longest_combining_run = longest_combining
+        self.standard_emoji_count = emoji
+
+    @classmethod
+    def from_message(cls, message) -> 'MessageFeatures':
+        """Build features from a discord.Message"""
+        return cls(message.content, len(message.mentions) + len(message.role_mentions))
+
+    @property
+    def word_counts(self) -> Counter:
+        """Occurrences of each word with 3+ characters (computed on first use)"""
+        if self._word_counts is None:
+            self._word_counts = Counter(w for w in WORD_PATTERN.findall(self.lower) if len(w) >= 3)
+        return self._word_counts
+
+    @property
+    def hosts(self) -> List[Tuple[str, str]]:
+        """(url, host) pairs for every URL with a usable host (parsed on first use)"""
+        if self._hosts is None:
+            self._hosts = [(url, host) for url, host in ((url, parse_host(url)) for url in self.urls) if host]
+        return self._hosts
+
+    @property
+    def emoji_count(self) -> int:
+        """Total number of standard and custom emojis"""
+        return self.standard_emoji_count + len(self.custom_emoji)
+
+    @property
+    def emoji_chars(self) -> int:
+        """Number of characters taken up by emojis"""
+        return self.standard_emoji_count + sum(len(match) for match in self.custom_emoji)
+
+
+class CompiledRuleset:
+    """Guild auto-moderation settings compiled for fast per-message evaluation
+
+    The ruleset is built once whenever the guild's settings change. It keeps
+    direct references to each rule's settings, the profanity automaton,
+    domain indexes, and the ordered list of enabled checks.
+    """
+
+    def __init__(self, settings: Dict[str, Any], word_matcher: Optional[WordMatcher] = None):
+        """Compile a guild's settings
+
+        Args:
+            settings: The guild's auto-moderation settings
+            word_matcher: The guild's profanity automaton, kept across recompiles
+                so large word lists are not rebuilt on every settings change
+        """
+        self.enabled = settings.get('enabled', False)
+        self.rules = {name: settings.get(name, {}) for name, _ in RULE_ORDER}
+        self.log_channel_id = settings.get('logging', {}).get('log_channel')
+
+        # Ordered check method names for the rules that are switched on
+        self.checks = [check for name, check in RULE_ORDER if self.rules[name].get('enabled', False)]
+
+        # Profanity filter
+        profanity = self.rules['profanity_filter']
+        if word_matcher is None:
+            word_matcher = WordMatcher(profanity.get('words', []))
+        word_matcher.configure(profanity.get('whole_words', False), profanity.get('normalize_leetspeak', False))
+        self.word_matcher = word_matcher
+
+        # Link filter
+        self.allowed_domains: DomainIndex = compile_domain_index(
+            tuple(self.rules['link_filter'].get('allowed_domains', [])), fragments=False
+        )
+
+        # Scam detection
+        self.scam_patterns: PatternSet = compile_pattern_set(tuple(self.rules['scam_detection'].get('patterns', [])))
+        self.dangerous_domains: DomainIndex = compile_domain_index(
+            tuple(self.rules['scam_detection'].get('dangerous_domains', []))
+        )
+
+        # Invite filter
+        self.invite_whitelist = frozenset(str(guild_id) for guild_id in self.rules['invite_filter'].get('whitelist', []))
+
+    def action(self, rule: str, default: str) -> str:
+        """Get the configured action for a rule"""
+        return self.rules[rule].get('action', default)
+
+    def option(self, rule: str, key: str, default: Any = None) -> Any:
+        """Get a configured option for a rule"""
+        return self.rules[rule].get(key, default)
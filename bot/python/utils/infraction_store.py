@@ -0,0 +1,251 @@
+"""
+Guard-shin Discord Bot - Infraction Store
+This module keeps moderation infractions in the shared SQLite database.
+Infraction ids come from a per-guild sequence, so adding one never scans the
+guild's history, and history is read a page at a time with keyset pagination
+over indexed columns instead of loading and sorting every record.
+"""
+
+import asyncio
+import datetime
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from bot.python.utils.settings_store import SETTINGS_DB_PATH
+
+logger = logging.getLogger('guard-shin.infraction_store')
+
+# Infractions shown per page
+PAGE_SIZE = 5
+
+# Ids are allocated in creation order, so the (guild_id, id) primary key also
+# orders a guild's history by time; the user index serves per-member pages.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS infractions (
+    guild_id INTEGER NOT NULL,
+    id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    mod_id INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    reason TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL,
+    active INTEGER NOT NULL,
+    removed_by INTEGER,
+    removed_at REAL,
+    removal_reason TEXT,
+    PRIMARY KEY (guild_id, id)
+);
+CREATE INDEX IF NOT EXISTS infractions_user ON infractions (guild_id, user_id, id);
+CREATE TABLE IF NOT EXISTS infraction_sequences (
+    guild_id INTEGER PRIMARY KEY,
+    last_id INTEGER NOT NULL
+);
+"""
+
+_COLUMNS = ("id, user_id, mod_id, type, reason, created_at, expires_at, active, "
+            "removed_by, removed_at, removal_reason")
+
+
+def _to_infraction(row: Tuple) -> Dict[str, Any]:
+    """Turn a database row into the infraction dict the commands display"""
+    (infraction_id, user_id, mod_id, infraction_type, reason, created_at, expires_at, active,
+     removed_by, removed_at, removal_reason) = row
+    infraction = {
+        'id': infraction_id,
+        'user_id': str(user_id),
+        'mod_id': str(mod_id),
+        'type': infraction_type,
+        'reason': reason,
+        'timestamp': datetime.datetime.fromtimestamp(created_at).isoformat(),
+        'active': bool(active)
+    }
+    if expires_at is not None:
+        infraction['expires_at'] = datetime.datetime.fromtimestamp(expires_at).isoformat()
+    if removed_at is not None:
+        infraction['removed_by'] = str(removed_by) if removed_by is not None else None
+        infraction['removed_at'] = datetime.datetime.fromtimestamp(removed_at).isoformat()
+        infraction['removal_reason'] = removal_reason
+    return infraction
+
+
+class InfractionStore:
+    """Async repository of infractions, one id sequence per guild"""
+
+    def __init__(self, path: str = SETTINGS_DB_PATH):
+        """Create the store (the database is opened on first use)
+
+        Args:
+            path: SQLite database file
+        """
+        self.path = path
+
+        # Every database call runs on this one thread, which owns the connection
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='infraction-store')
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database (database thread only)"""
+        if self._connection is None:
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(_SCHEMA)
+            connection.commit()
+            self._connection = connection
+        return self._connection
+
+    def _insert(self, guild_id: int, user_id: int, mod_id: int, infraction_type: str, reason: str,
+                created_at: float, expires_at: Optional[float], active: bool) -> Tuple:
+        """Allocate the guild's next id and insert the infraction (database thread only)"""
+        connection = self._connect()
+        with connection:
+            cursor = connection.execute(
+                "UPDATE infraction_sequences SET last_id = last_id + 1 WHERE guild_id = ?", (guild_id,)
+            )
+            if cursor.rowcount == 0:
+                connection.execute("INSERT INTO infraction_sequences (guild_id, last_id) VALUES (?, 1)", (guild_id,))
+            infraction_id = connection.execute(
+                "SELECT last_id FROM infraction_sequences WHERE guild_id = ?", (guild_id,)
+            ).fetchone()[0]
+
+            row = (infraction_id, user_id, mod_id, infraction_type, reason, created_at, expires_at, int(active),
+                   None, None, None)
+            connection.execute(
+                f"INSERT INTO infractions (guild_id, {_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (guild_id,) + row
+            )
+        return row
+
+    def _select_page(self, guild_id: int, user_id: Optional[int], before: Optional[int],
+                     limit: int) -> List[Tuple]:
+        """Newest infractions older than `before` (database thread only)"""
+        query = f"SELECT {_COLUMNS} FROM infractions WHERE guild_id = ?"
+        params: List[Any] = [guild_id]
+        if user_id is not None:
+            query += " AND user_id = ?"
+            params.append(user_id)
+        if before is not None:
+            query += " AND id < ?"
+            params.append(before)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        return self._connect().execute(query, params).fetchall()
+
+    def _select_one(self, guild_id: int, infraction_id: int) -> Optional[Tuple]:
+        """One infraction by id (database thread only)"""
+        return self._connect().execute(
+            f"SELECT {_COLUMNS} FROM infractions WHERE guild_id = ? AND id = ?", (guild_id, infraction_id)
+        ).fetchone()
+
+    def _count(self, guild_id: int, user_id: Optional[int]) -> int:
+        """Number of infractions (database thread only)"""
+        if user_id is None:
+            query, params = "SELECT COUNT(*) FROM infractions WHERE guild_id = ?", (guild_id,)
+        else:
+            query, params = "SELECT COUNT(*) FROM infractions WHERE guild_id = ? AND user_id = ?", (guild_id, user_id)
+        return self._connect().execute(query, params).fetchone()[0]
+
+    def _close_rows(self, where: str, params: Tuple, removed_by: Optional[int], removal_reason: Optional[str]) -> int:
+        """Mark matching active infractions inactive (database thread only)"""
+        connection = self._connect()
+        with connection:
+            cursor = connection.execute(
+                f"UPDATE infractions SET active = 0, removed_by = ?, removed_at = ?, removal_reason = ? "
+                f"WHERE active = 1 AND {where}",
+                (removed_by, time.time(), removal_reason) + params
+            )
+        return cursor.rowcount
+
+    async def _run(self, function, *args):
+        """Run a database call on the database thread"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, function, *args)
+
+    async def add(self, guild_id: int, user_id: int, mod_id: int, infraction_type: str,
+                  reason: Optional[str] = None, duration: Optional[datetime.timedelta] = None,
+                  active: bool = True) -> Dict[str, Any]:
+        """Record an infraction
+
+        Args:
+            guild_id: Guild ID
+            user_id: Member the infraction is for
+            mod_id: Moderator who issued it
+            infraction_type: e.g. 'warn', 'kick', 'ban', 'tempban', 'mute', 'tempmute'
+            reason: Reason given by the moderator
+            duration: How long a temporary infraction lasts
+            active: Whether the infraction is in effect
+
+        Returns:
+            The new infraction, with its guild-specific id
+        """
+        created_at = time.time()
+        expires_at = created_at + duration.total_seconds() if duration else None
+        row = await self._run(self._insert, guild_id, user_id, mod_id, infraction_type,
+                              reason or "No reason provided", created_at, expires_at, active)
+        return _to_infraction(row)
+
+    async def get(self, guild_id: int, infraction_id: int) -> Optional[Dict[str, Any]]:
+        """Get one infraction by its id, or None"""
+        row = await self._run(self._select_one, guild_id, infraction_id)
+        return _to_infraction(row) if row else None
+
+    async def page(self, guild_id: int, user_id: Optional[int] = None, before: Optional[int] = None,
+                   limit: int = PAGE_SIZE) -> List[Dict[str, Any]]:
+        """Get a page of infractions, newest first
+
+        Args:
+            guild_id: Guild ID
+            user_id: Only this member's infractions (None for the whole guild)
+            before: Keyset cursor: only infractions with a lower id (None for the newest page)
+            limit: Page size
+
+        Returns:
+            Up to `limit` infractions; the last one's id is the cursor for the next page
+        """
+        rows = await self._run(self._select_page, guild_id, user_id, before, limit)
+        return [_to_infraction(row) for row in rows]
+
+    async def count(self, guild_id: int, user_id: Optional[int] = None) -> int:
+        """Number of infractions for a guild or one member"""
+        return await self._run(self._count, guild_id, user_id)
+
+    async def deactivate(self, guild_id: int, user_id: int, types: Iterable[str],
+                         removed_by: Optional[int] = None, reason: Optional[str] = None) -> int:
+        """Mark a member's active infractions of the given types inactive
+
+        Returns:
+            Number of infractions closed
+        """
+        types = tuple(types)
+        placeholders = ",".join("?" * len(types))
+        return await self._run(self._close_rows, f"guild_id = ? AND user_id = ? AND type IN ({placeholders})",
+                               (guild_id, user_id) + types, removed_by, reason)
+
+    async def expire(self, guild_id: int, infraction_id: int) -> bool:
+        """Mark a temporary infraction inactive once it runs out
+
+        Returns:
+            True if the infraction was still active
+        """
+        closed = await self._run(self._close_rows, "guild_id = ? AND id = ?", (guild_id, infraction_id),
+                                 None, "Expired")
+        return closed > 0
+
+    async def close(self):
+        """Close the database"""
+        if self._connection is not None:
+            await self._run(self._connection.close)
+            self._connection = None
+        self._executor.shutdown(wait=False)
+
+
+def get_infraction_store(bot) -> InfractionStore:
+    """Get the infraction store shared by every cog, creating it on first use"""
+    store = getattr(bot, 'infraction_store', None)
+    if store is None:
+        store = bot.infraction_store = InfractionStore()
+    return store
@@ -0,0 +1,152 @@
+"""
+Guard-shin Discord Bot - Invite Resolution Cache
+This module caches invite code lookups with a TTL'd LRU, remembers invalid
+codes for a shorter time, and collapses concurrent lookups of the same code
+into a single request so invite-spam raids cost one HTTP call per code.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, NamedTuple, Optional, Tuple, Type
+
+
+class ResolvedInvite(NamedTuple):
+    """The parts of an invite the filters need"""
+    guild_id: Optional[int]
+    guild_name: Optional[str]
+    features: FrozenSet[str]
+
+
+class InviteCache:
+    """TTL'd LRU cache of invite code -> ResolvedInvite
+
+    Codes that do not exist are cached as None (negative entries) with their
+    own, usually shorter, TTL. Errors other than the configured "not found"
+    exceptions are passed to every waiter and never cached.
+    """
+
+    def __init__(self, fetch: Callable[[str], Awaitable[ResolvedInvite]],
+                 not_found: Tuple[Type[BaseException], ...] = (),
+                 max_size: int = 10000, ttl: float = 3600, negative_ttl: float = 300):
+        """Create the cache
+
+        Args:
+            fetch: Coroutine function resolving an invite code
+            not_found: Exceptions from fetch that mean the code does not exist
+            max_size: Maximum number of cached codes (least recently used are evicted)
+            ttl: Seconds to keep a resolved invite
+            negative_ttl: Seconds to keep a code that does not exist
+        """
+        self._fetch = fetch
+        self._not_found = not_found
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+
+        self._entries: 'OrderedDict[str, Tuple[float, Optional[ResolvedInvite]]]' = OrderedDict()
+        self._pending: Dict[str, asyncio.Future] = {}
+
+        # Counters for sizing the cache
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.errors = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, code: str) -> Tuple[bool, Optional[ResolvedInvite]]:
+        """Look up a code without fetching
+
+        Returns:
+            (found, invite) - invite is None for a cached negative entry
+        """
+        entry = self._entries.get(code)
+        if entry is None:
+            return False, None
+
+        expires_at, invite = entry
+        if expires_at <= time.monotonic():
+            del self._entries[code]
+            return False, None
+
+        self._entries.move_to_end(code)
+        return True, invite
+
+    def put(self, code: str, invite: Optional[ResolvedInvite]):
+        """Store a resolved invite (or None for a code that does not exist)"""
+        ttl = self.ttl if invite is not None else self.negative_ttl
+        self._entries[code] = (time.monotonic() + ttl, invite)
+        self._entries.move_to_end(code)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, code: Optional[str] = None):
+        """Drop one code, or the whole cache"""
+        if code is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(code, None)
+
+    async def resolve(self, code: str) -> Optional[ResolvedInvite]:
+        """Resolve an invite code, using the cache when possible
+
+        Returns:
+            The resolved invite, or None if the code does not exist
+        """
+        found, invite = self.get(code)
+        if found:
+            if invite is None:
+                self.negative_hits += 1
+            else:
+                self.hits += 1
+            return invite
+
+        # Join a lookup that is already in flight
+        pending = self._pending.get(code)
+        if pending is not None:
+            self.coalesced += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        task = asyncio.ensure_future(self._fetch_and_store(code))
+        self._pending[code] = task
+        # Waiters being cancelled must not cancel the shared request
+        return await asyncio.shield(task)
+
+    async def _fetch_and_store(self, code: str) -> Optional[ResolvedInvite]:
+        """Fetch a code once on behalf of every waiter"""
+        try:
+            try:
+                invite = await self._fetch(code)
+            except self._not_found:
+                invite = None
+            except Exception:
+                self.errors += 1
+                raise
+
+            self.put(code, invite)
+            return invite
+        finally:
+            self._pending.pop(code, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache counters and hit rate"""
+        lookups = self.hits + self.negative_hits + self.misses + self.coalesced
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'negative_hits': self.negative_hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'evictions': self.evictions,
+            'errors': self.errors,
+            'in_flight': len(self._pending),
+            'hit_rate': (self.hits + self.negative_hits + self.coalesced) / lookups if lookups else 0.0
+        }
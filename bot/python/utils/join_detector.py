@@ -0,0 +1,207 @@
+"""
+Guard-shin Discord Bot - Streaming Join-Rate Detector
+This module scores member joins for raid detection in constant time per
+join. Join counts over several windows (10s, 60s, 10m and the guild's own
+window) come from one ring of one-second buckets with a running sum per
+window, and account age, default avatars and look-alike usernames are
+tracked incrementally alongside them, so a guild taking thousands of joins a
+minute costs a few integer updates per join.
+"""
+
+import math
+import re
+import time
+from collections import Counter, deque
+from typing import Any, Deque, Dict, List, NamedTuple, Optional, Tuple
+
+# Windows tracked for every guild, in seconds (the guild's configured window is added)
+WINDOWS = (10, 60, 600)
+
+# Short window that catches bursts before the configured window fills
+BURST_WINDOW = 10
+
+# A burst counts as a raid at this many times the configured join rate
+BURST_FACTOR = 3
+
+# Accounts younger than this count as new
+YOUNG_ACCOUNT_DAYS = 7
+
+# Features (new account, default avatar, similar name) a join needs to be suspicious;
+# one alone, such as a default avatar, is common among ordinary joins
+SUSPICIOUS_FEATURES = 2
+
+# How far an all-suspicious window raises the score: 0.25 lifts 80% of the threshold to a raid,
+# so suspicion only decides joins that are already close to the configured rate
+SUSPICIOUS_BOOST = 0.25
+
+# Joins sharing a name skeleton within the similarity window are look-alikes
+SIMILAR_NAME_COUNT = 3
+SIMILARITY_WINDOW = 60
+
+# Joins remembered for the cleanup cohort
+MAX_RECENT_JOINS = 5000
+
+_NAME_NOISE = re.compile(r'[\d\W_]+')
+
+
+def name_skeleton(name: str) -> str:
+    """Reduce a username to letters only, so "raider_01" and "Raider.77" collide"""
+    return _NAME_NOISE.sub('', name.lower())
+
+
+class WindowCounter:
+    """Event counts over several trailing windows from one ring of one-second buckets
+
+    Each window keeps a running sum; advancing the clock subtracts the
+    buckets that fall out of each window, so adding an event and reading a
+    count are O(number of windows) regardless of the event rate.
+    """
+
+    __slots__ = ('windows', 'size', 'buckets', 'sums', 'second')
+
+    def __init__(self, windows: Tuple[int, ...]):
+        self.windows = tuple(sorted(set(windows)))
+        self.size = self.windows[-1]
+        self.buckets = [0] * self.size
+        self.sums = [0] * len(self.windows)
+        self.second = 0  # the second the newest bucket belongs to
+
+    def _advance(self, second: int):
+        """Move the clock forward, expiring buckets that left each window"""
+        if second <= self.second:
+            return
+        if second - self.second >= self.size:
+            # Idle for longer than the largest window: everything has expired
+            self.buckets = [0] * self.size
+            self.sums = [0] * len(self.windows)
+            self.second = second
+            return
+
+        for current in range(self.second + 1, second + 1):
+            for index, window in enumerate(self.windows):
+                self.sums[index] -= self.buckets[(current - window) % self.size]
+            self.buckets[current % self.size] = 0
+        self.second = second
+
+    def add(self, now: float, count: int = 1):
+        """Record events at a time"""
+        second = int(now)
+        self._advance(second)
+        self.buckets[second % self.size] += count
+        for index in range(len(self.sums)):
+            self.sums[index] += count
+
+    def counts(self, now: float) -> Dict[int, int]:
+        """Events in each window ending now"""
+        self._advance(int(now))
+        return dict(zip(self.windows, self.sums))
+
+
+class JoinScore(NamedTuple):
+    """The detector's verdict on one join"""
+    score: float  # >= 1.0 means the guild is being raided
+    counts: Dict[int, int]  # joins per window
+    suspicious: bool  # whether this member looks like a raid account (SUSPICIOUS_FEATURES or more)
+    reasons: Tuple[str, ...]  # which features flagged this member
+
+
+class JoinDetector:
+    """Per-guild raid detector fed one join at a time
+
+    The score compares the join count in the configured window with the
+    configured threshold (1.0 = threshold reached), and the 10 second count
+    with BURST_FACTOR times that rate. The share of suspicious accounts among
+    recent joins raises the score by up to SUSPICIOUS_BOOST, so a cohort of
+    fresh, avatar-less, look-alike accounts trips detection slightly before
+    the plain count would, but ordinary joins well under the threshold never do.
+    """
+
+    def __init__(self, join_threshold: int, window: int):
+        """Create a detector
+
+        Args:
+            join_threshold: Joins within the window that count as a raid
+            window: The guild's detection window in seconds
+        """
+        self.join_threshold = join_threshold
+        self.window = window
+        self.burst_threshold = max(3, math.ceil(join_threshold * BURST_WINDOW / window * BURST_FACTOR))
+
+        windows = WINDOWS + (window,)
+        self.joins = WindowCounter(windows)
+        self.suspicious = WindowCounter(windows)
+
+        # Name skeletons seen in the similarity window
+        self._names: Deque[Tuple[float, str]] = deque()
+        self._name_counts: Counter = Counter()
+
+        # (joined_at, member_id, suspicious) for the cleanup cohort
+        self.recent: Deque[Tuple[float, int, bool]] = deque(maxlen=MAX_RECENT_JOINS)
+
+    def matches(self, join_threshold: int, window: int) -> bool:
+        """Whether the detector was built for these settings"""
+        return self.join_threshold == join_threshold and self.window == window
+
+    def _similar_name(self, now: float, name: str) -> bool:
+        """Record a username and report whether enough recent joins share its skeleton"""
+        while self._names and self._names[0][0] <= now - SIMILARITY_WINDOW:
+            _, old = self._names.popleft()
+            self._name_counts[old] -= 1
+            if not self._name_counts[old]:
+                del self._name_counts[old]
+
+        skeleton = name_skeleton(name)
+        if len(skeleton) < 3:
+            return False
+        self._names.append((now, skeleton))
+        self._name_counts[skeleton] += 1
+        return self._name_counts[skeleton] >= SIMILAR_NAME_COUNT
+
+    def add(self, member, now: Optional[float] = None) -> JoinScore:
+        """Score a join
+
+        Args:
+            member: The member who joined (uses created_at, avatar and name)
+            now: Unix time of the join (defaults to now)
+        """
+        now = time.time() if now is None else now
+
+        reasons = []
+        created_at = getattr(member, 'created_at', None)
+        if created_at is not None and now - created_at.timestamp() < YOUNG_ACCOUNT_DAYS * 86400:
+            reasons.append('new account')
+        if getattr(member, 'avatar', None) is None:
+            reasons.append('default avatar')
+        if self._similar_name(now, getattr(member, 'name', '')):
+            reasons.append('similar name')
+        suspicious = len(reasons) >= SUSPICIOUS_FEATURES
+
+        self.joins.add(now)
+        if suspicious:
+            self.suspicious.add(now)
+        self.recent.append((now, member.id, suspicious))
+
+        counts = self.joins.counts(now)
+        flagged = self.suspicious.counts(now)[self.window]
+        rate = max(counts[self.window] / self.join_threshold, counts[BURST_WINDOW] / self.burst_threshold)
+
+        # Suspicious joins only tip a rate that is already near the threshold
+        share = flagged / counts[self.window] if counts[self.window] else 0.0
+        score = rate * (1 + SUSPICIOUS_BOOST * share)
+        return JoinScore(score, counts, suspicious, tuple(reasons))
+
+    def cohort(self, since: float, suspicious_only: bool = False) -> List[int]:
+        """Members who joined at or after a time, oldest first"""
+        return [member_id for joined_at, member_id, suspicious in self.recent
+                if joined_at >= since and (suspicious or not suspicious_only)]
+
+    def stats(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """Join and suspicious-join counts per window"""
+        now = time.time() if now is None else now
+        return {
+            'joins': self.joins.counts(now),
+            'suspicious': self.suspicious.counts(now),
+            'join_threshold': self.join_threshold,
+            'burst_threshold': self.burst_threshold,
+            'window': self.window
+        }
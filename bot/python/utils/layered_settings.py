@@ -0,0 +1,169 @@
+"""
+Guard-shin Discord Bot - Layered Guild Settings
+This module resolves a guild's settings through two layers: one immutable
+default layer shared by every guild, and a sparse per-guild override layer
+that only holds the values the guild actually changed. Writes are
+copy-on-write into the override layer, so defaults can never be modified and
+overrides never leak between guilds.
+"""
+
+from collections.abc import Mapping, MutableMapping
+from types import MappingProxyType
+from typing import Any, Dict, Iterator, Optional
+
+
+def freeze_defaults(value: Any) -> Any:
+    """Turn a defaults tree into an immutable one (dicts -> read-only mappings, lists -> tuples)"""
+    if isinstance(value, Mapping):
+        return MappingProxyType({key: freeze_defaults(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return tuple(freeze_defaults(item) for item in value)
+    return value
+
+
+def freeze_value(value: Any) -> Any:
+    """Make a leaf value immutable (lists -> tuples); dicts stay dicts so overrides remain JSON-friendly"""
+    if isinstance(value, Mapping):
+        return {key: freeze_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return tuple(freeze_value(item) for item in value)
+    return value
+
+
+def freeze_overrides(overrides: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Freeze the lists in a stored override tree, in place
+
+    Returns:
+        The same dict (or a new empty one if there were no overrides)
+    """
+    if not overrides:
+        return {}
+    for key, value in overrides.items():
+        if isinstance(value, dict):
+            freeze_overrides(value)
+        else:
+            overrides[key] = freeze_value(value)
+    return overrides
+
+
+class SettingsView(MutableMapping):
+    """Mapping that reads overrides first, then defaults, and writes overrides only
+
+    Nested sections are returned as child views that look their override dict
+    up through the parent on every access, so views never go stale. A
+    section's override dict is only created when something in it is written,
+    and it is pruned again once every value is back to its default.
+    """
+
+    __slots__ = ('_defaults', '_root', '_parent', '_key')
+
+    def __init__(self, defaults: Mapping, overrides: Optional[Dict[str, Any]] = None,
+                 parent: Optional['SettingsView'] = None, key: Optional[str] = None):
+        """Create a view
+
+        Args:
+            defaults: The immutable default layer (see freeze_defaults)
+            overrides: The guild's sparse overrides (see freeze_overrides); top-level views only
+            parent: The enclosing view, for nested sections
+            key: This section's key in the parent
+        """
+        self._defaults = defaults
+        self._root = overrides if overrides is not None or parent is not None else {}
+        self._parent = parent
+        self._key = key
+
+    @property
+    def overrides(self) -> Dict[str, Any]:
+        """The override layer (what gets persisted)"""
+        overrides = self._current()
+        return overrides if overrides is not None else {}
+
+    def _current(self) -> Optional[Dict[str, Any]]:
+        """This section's override dict, or None if nothing in it was changed"""
+        if self._parent is None:
+            return self._root
+        parent = self._parent._current()
+        if parent is None:
+            return None
+        value = parent.get(self._key)
+        return value if isinstance(value, dict) else None
+
+    def _writable(self) -> Dict[str, Any]:
+        """This section's override dict, created (with its parents') on first write"""
+        if self._parent is None:
+            return self._root
+        parent = self._parent._writable()
+        value = parent.get(self._key)
+        if not isinstance(value, dict):
+            value = parent[self._key] = {}
+        return value
+
+    def _prune(self):
+        """Remove this section's override dict from the parent once it is empty"""
+        if self._parent is None:
+            return
+        parent = self._parent._current()
+        if parent is not None and parent.get(self._key) == {}:
+            del parent[self._key]
+            self._parent._prune()
+
+    def __getitem__(self, key: str) -> Any:
+        default = self._defaults.get(key)
+        if isinstance(default, Mapping):
+            return SettingsView(default, parent=self, key=key)
+
+        overrides = self._current()
+        if overrides is not None and key in overrides:
+            value = overrides[key]
+            if isinstance(value, dict):
+                # A section that only exists for this guild
+                return SettingsView(MappingProxyType({}), parent=self, key=key)
+            return value
+
+        if key in self._defaults:
+            return default
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any):
+        default = self._defaults.get(key)
+        if isinstance(default, Mapping) and isinstance(value, Mapping):
+            # Assigning a whole section writes each key through the child view
+            child = SettingsView(default, parent=self, key=key)
+            for item_key, item in value.items():
+                child[item_key] = item
+            return
+
+        value = freeze_value(value)
+        if key in self._defaults and value == default:
+            # Back to the default: drop the override to keep the layer sparse
+            overrides = self._current()
+            if overrides is not None and key in overrides:
+                del overrides[key]
+                self._prune()
+            return
+
+        self._writable()[key] = value
+
+    def __delitem__(self, key: str):
+        """Reset a key to its default"""
+        overrides = self._current()
+        if overrides is None or key not in overrides:
+            raise KeyError(key)
+        del overrides[key]
+        self._prune()
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._defaults
+        overrides = self._current()
+        if overrides:
+            for key in overrides:
+                if key not in self._defaults:
+                    yield key
+
+    def __len__(self) -> int:
+        overrides = self._current()
+        extra = sum(1 for key in overrides if key not in self._defaults) if overrides else 0
+        return len(self._defaults) + extra
+
+    def __repr__(self) -> str:
+        return f"SettingsView({dict(self)!r})"
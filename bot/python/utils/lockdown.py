@@ -0,0 +1,131 @@
+"""
+Guard-shin Discord Bot - Lockdown Strategies
+This module holds the lockdown mechanics shared by the raid protection and
+moderation cogs: per-channel overwrite edits fanned out with bounded
+concurrency, and a role-level lockdown that takes away Send Messages on one
+role with a single REST call, no matter how many channels the guild has.
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import discord
+
+from bot.python.utils.rest_scheduler import RestScheduler
+
+logger = logging.getLogger('guard-shin.lockdown')
+
+# Lockdown strategies admins can pick
+LOCKDOWN_MODES = ('auto', 'channels', 'role')
+
+# Guilds with more text channels than this use the role strategy in "auto" mode
+AUTO_ROLE_CHANNELS = 50
+
+# Channel permission edits in flight at once
+EDIT_CONCURRENCY = 10
+
+# Permissions a lockdown takes away
+LOCKED_PERMISSIONS = ('send_messages', 'send_messages_in_threads', 'create_public_threads',
+                      'create_private_threads', 'add_reactions')
+
+
+def resolve_mode(guild, mode: Optional[str]) -> str:
+    """Pick the strategy for a guild ("channels" or "role")
+
+    Args:
+        guild: The guild
+        mode: The configured mode ("auto", "channels" or "role")
+    """
+    if mode in ('channels', 'role'):
+        return mode
+    return 'role' if len(guild.text_channels) > AUTO_ROLE_CHANNELS else 'channels'
+
+
+def lockdown_role(guild, role_id: Optional[int] = None):
+    """The role a role-level lockdown edits (the configured role, else @everyone)"""
+    if role_id:
+        role = guild.get_role(int(role_id))
+        if role is not None:
+            return role
+    return guild.default_role
+
+
+def snapshot_overwrite(overwrite) -> Optional[List[int]]:
+    """Serialize an overwrite as [allow, deny] (None if it is empty)"""
+    if overwrite.is_empty():
+        return None
+    return [permissions.value for permissions in overwrite.pair()]
+
+
+def restore_overwrite(saved: Optional[List[int]]):
+    """Rebuild an overwrite saved with snapshot_overwrite (None removes it)"""
+    if saved is None:
+        return None
+    return discord.PermissionOverwrite.from_pair(discord.Permissions(saved[0]), discord.Permissions(saved[1]))
+
+
+def role_lock_exceptions(guild, role) -> List[Any]:
+    """Channels whose overwrite explicitly lets the role speak
+
+    A role edit does not affect these, so a role-level lockdown still has
+    to lock them one by one.
+    """
+    return [channel for channel in guild.text_channels if channel.overwrites_for(role).send_messages is True]
+
+
+async def edit_overwrites(rest: RestScheduler, guild, target, edits: Iterable[Tuple[Any, Any]], priority: int,
+                          reason: str, progress: Dict[str, int], concurrency: int = EDIT_CONCURRENCY):
+    """Apply overwrites for one role to many channels concurrently
+
+    Args:
+        rest: REST scheduler to send the edits through
+        guild: The guild
+        target: The role whose overwrites are edited
+        edits: (channel, overwrite) pairs; an overwrite of None removes it
+        priority: REST scheduler priority for the edits
+        reason: Audit log reason
+        progress: Dict whose 'done' and 'failed' counters are updated as edits finish
+        concurrency: Edits in flight at once
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def edit(channel, overwrite):
+        async with semaphore:
+            try:
+                await rest.run(priority, f"channel:{channel.id}", channel.set_permissions, target,
+                               overwrite=overwrite, reason=reason)
+                progress['done'] += 1
+            except discord.HTTPException as e:
+                progress['failed'] += 1
+                logger.warning(f"Failed to update permissions for #{channel.name} in {guild.name}: {e}")
+
+    await asyncio.gather(*(edit(channel, overwrite) for channel, overwrite in edits))
+
+
+async def lock_role(rest: RestScheduler, role, priority: int, reason: str) -> Optional[int]:
+    """Take the lockdown permissions away from a role with one edit
+
+    Returns:
+        The role's original permission value, or None if it was already locked
+    """
+    original = role.permissions
+    if not original.send_messages:
+        return None
+
+    permissions = discord.Permissions(original.value)
+    permissions.update(**{name: False for name in LOCKED_PERMISSIONS})
+    await rest.run(priority, f"guild:{role.guild.id}", role.edit, permissions=permissions, reason=reason)
+    return original.value
+
+
+async def unlock_role(rest: RestScheduler, role, original: int, priority: int, reason: str):
+    """Give a role back the lockdown permissions it had before lock_role
+
+    Only the permissions the lockdown took away are restored, so changes
+    made to the role's other permissions during the lockdown are kept.
+    """
+    saved = discord.Permissions(original)
+    permissions = discord.Permissions(role.permissions.value)
+    permissions.update(**{name: getattr(saved, name) for name in LOCKED_PERMISSIONS})
+    await rest.run(priority, f"guild:{role.guild.id}", role.edit, permissions=permissions, reason=reason)
@@ -0,0 +1,189 @@
+"""
+Guard-shin Discord Bot - Buffered Mod-Log Sink
+This module collects log embeds from every cog and sends them per log
+channel in batches: up to ten embeds per message, one batch per interval.
+When a burst outgrows the buffer the extra events are counted instead of
+sent and summarized in a "N more events suppressed" digest, so a raid costs a
+few low-priority messages instead of one per event.
+"""
+
+import asyncio
+import logging
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import discord
+
+from bot.python.utils.rest_scheduler import LOW, RestScheduler, get_rest_scheduler
+
+logger = logging.getLogger('guard-shin.log_sink')
+
+# Seconds a channel's buffer collects embeds before it is flushed
+FLUSH_INTERVAL = 2.0
+
+# Embeds buffered per channel per flush; the rest are summarized
+MAX_BUFFERED = 30
+
+# Discord limits
+EMBEDS_PER_MESSAGE = 10
+EMBED_CHARS_PER_MESSAGE = 6000
+
+# Suppressed event kinds listed in a digest
+DIGEST_KINDS = 10
+
+
+class _ChannelLog:
+    """Embeds waiting to be sent to one log channel"""
+
+    __slots__ = ('channel', 'embeds', 'suppressed', 'worker')
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.embeds: List[discord.Embed] = []
+        self.suppressed: Counter = Counter()  # embed title -> events dropped this interval
+        self.worker: Optional[asyncio.Task] = None
+
+    def __bool__(self) -> bool:
+        return bool(self.embeds or self.suppressed)
+
+
+def pack_embeds(embeds: List[discord.Embed]) -> List[List[discord.Embed]]:
+    """Split embeds into messages within Discord's per-message embed count and size limits"""
+    messages: List[List[discord.Embed]] = []
+    current: List[discord.Embed] = []
+    size = 0
+    for embed in embeds:
+        length = len(embed)
+        if current and (len(current) >= EMBEDS_PER_MESSAGE or size + length > EMBED_CHARS_PER_MESSAGE):
+            messages.append(current)
+            current, size = [], 0
+        current.append(embed)
+        size += length
+    if current:
+        messages.append(current)
+    return messages
+
+
+def digest_embed(suppressed: Counter) -> discord.Embed:
+    """Summarize the events dropped from a flush"""
+    total = sum(suppressed.values())
+    embed = discord.Embed(
+        title="📋 Log Digest",
+        description=f"{total} more events suppressed",
+        color=discord.Color.dark_grey(),
+        timestamp=discord.utils.utcnow()
+    )
+    lines = [f"{title} × {count}" for title, count in suppressed.most_common(DIGEST_KINDS)]
+    if len(suppressed) > DIGEST_KINDS:
+        lines.append(f"... and {len(suppressed) - DIGEST_KINDS} other kinds")
+    embed.add_field(name="Events", value="\n".join(lines)[:1024], inline=False)
+    return embed
+
+
+class LogSink:
+    """Per-channel buffer of log embeds, flushed in batches
+
+    Logging never waits on Discord: ``log`` appends the embed and makes sure
+    the channel has a worker. The worker sleeps for ``interval`` seconds,
+    sends the buffer as a few LOW priority messages, and exits once the
+    channel has nothing left to send.
+    """
+
+    def __init__(self, rest: RestScheduler, interval: float = FLUSH_INTERVAL, max_buffered: int = MAX_BUFFERED):
+        """Create the sink
+
+        Args:
+            rest: Scheduler the messages are sent through
+            interval: Seconds to collect embeds before flushing a channel
+            max_buffered: Embeds kept per channel per flush before events are only counted
+        """
+        self.rest = rest
+        self.interval = interval
+        self.max_buffered = max_buffered
+        self._channels: Dict[int, _ChannelLog] = {}
+
+        # Counters
+        self.logged = 0
+        self.suppressed = 0
+        self.messages_sent = 0
+        self.errors = 0
+
+    def log(self, channel, embed: discord.Embed):
+        """Queue a log embed for a channel"""
+        pending = self._channels.get(channel.id)
+        if pending is None:
+            pending = self._channels[channel.id] = _ChannelLog(channel)
+        pending.channel = channel
+
+        if len(pending.embeds) < self.max_buffered:
+            pending.embeds.append(embed)
+            self.logged += 1
+        else:
+            pending.suppressed[embed.title or "Untitled event"] += 1
+            self.suppressed += 1
+
+        if pending.worker is None or pending.worker.done():
+            pending.worker = asyncio.ensure_future(self._run(channel.id, pending))
+
+    async def _run(self, channel_id: int, pending: _ChannelLog):
+        """Worker: flush a channel's buffer every interval until it stays empty"""
+        try:
+            while pending:
+                await asyncio.sleep(self.interval)
+                try:
+                    await self._flush(pending)
+                except Exception as e:
+                    self.errors += 1
+                    logger.error(f"Error flushing log embeds: {e}")
+        finally:
+            if not pending and self._channels.get(channel_id) is pending:
+                del self._channels[channel_id]
+
+    async def _flush(self, pending: _ChannelLog):
+        """Send one interval's embeds (and the digest of what was dropped)"""
+        embeds, pending.embeds = pending.embeds, []
+        suppressed, pending.suppressed = pending.suppressed, Counter()
+        if suppressed:
+            embeds.append(digest_embed(suppressed))
+
+        channel = pending.channel
+        for batch in pack_embeds(embeds):
+            try:
+                await self.rest.run(LOW, f"channel:{channel.id}", channel.send, embeds=batch)
+                self.messages_sent += 1
+            except discord.Forbidden:
+                logger.warning(f"Missing permissions to send logs to {channel.name} in {channel.guild.name}")
+                return
+            except discord.HTTPException as e:
+                self.errors += 1
+                logger.warning(f"Failed to send log embeds to {channel.name}: {e}")
+
+    async def close(self):
+        """Flush every buffer now and stop the workers"""
+        for pending in list(self._channels.values()):
+            if pending.worker is not None:
+                pending.worker.cancel()
+            try:
+                await self._flush(pending)
+            except Exception as e:
+                logger.error(f"Error flushing log embeds: {e}")
+        self._channels.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Buffered embeds and counters"""
+        return {
+            'channels': len(self._channels),
+            'buffered': sum(len(pending.embeds) for pending in self._channels.values()),
+            'logged': self.logged,
+            'suppressed': self.suppressed,
+            'messages_sent': self.messages_sent,
+            'errors': self.errors
+        }
+
+
+def get_log_sink(bot) -> LogSink:
+    """Get the log sink shared by every cog, creating it on first use"""
+    sink = getattr(bot, 'log_sink', None)
+    if sink is None:
+        sink = bot.log_sink = LogSink(get_rest_scheduler(bot))
+    return sink
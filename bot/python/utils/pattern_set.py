@@ -0,0 +1,193 @@
+"""
+Guard-shin Discord Bot - Combined Pattern Sets
+This module compiles a list of regular expressions into a single alternation
+with one named group per pattern, fronted by a cheap literal prefilter so
+clean messages usually never reach the regex engine.
+"""
+
+import re
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple
+
+# Regex metacharacters that end a literal run
+_METACHARACTERS = set('.^$*+?{}[]()|')
+
+# Quantifiers that make the preceding character optional
+_OPTIONAL_QUANTIFIERS = set('*?{')
+
+
+def required_literal(pattern: str) -> Optional[str]:
+    """Find the longest literal substring every match of a pattern must contain
+
+    This is a conservative scan of the pattern's top level: escaped
+    punctuation counts as literal text, while classes, groups, wildcards and
+    optional quantifiers end the current run.
+
+    Args:
+        pattern: The regular expression
+
+    Returns:
+        The literal, or None if no literal could be proven
+    """
+    runs = []
+    current = []
+    index = 0
+    length = len(pattern)
+
+    def end_run():
+        if current:
+            runs.append(''.join(current))
+            current.clear()
+
+    while index < length:
+        char = pattern[index]
+
+        if char == '|':
+            # Top-level alternation: no single literal is required
+            return None
+
+        if char == '\\' and index + 1 < length:
+            escaped = pattern[index + 1]
+            index += 2
+            if escaped.isalnum():
+                # Character class escapes like \s, \d, \w, or backreferences
+                end_run()
+                continue
+            literal = escaped
+        elif char in '([':
+            # Skip the whole group or class
+            end_run()
+            index = _skip_bracket(pattern, index)
+            if index is None:
+                return None
+            if index < length and pattern[index] in '*+?{':
+                index = _skip_quantifier(pattern, index)
+            continue
+        elif char in _METACHARACTERS:
+            end_run()
+            index += 1
+            continue
+        else:
+            literal = char
+            index += 1
+
+        # A following quantifier decides whether this character is required
+        if index < length and pattern[index] in _OPTIONAL_QUANTIFIERS:
+            end_run()
+            index = _skip_quantifier(pattern, index)
+            continue
+
+        current.append(literal)
+
+        if index < length and pattern[index] == '+':
+            end_run()
+            index = _skip_quantifier(pattern, index)
+
+    end_run()
+    if not runs:
+        return None
+    return max(runs, key=len)
+
+
+def _skip_bracket(pattern: str, index: int) -> Optional[int]:
+    """Return the index just past the group or class starting at index"""
+    opening = pattern[index]
+    closing = ')' if opening == '(' else ']'
+    depth = 0
+    length = len(pattern)
+
+    while index < length:
+        char = pattern[index]
+        if char == '\\':
+            index += 2
+            continue
+        if char == opening and (opening == '(' or depth == 0):
+            depth += 1
+        elif char == closing:
+            depth -= 1
+            if depth == 0:
+                return index + 1
+        index += 1
+
+    return None
+
+
+def _skip_quantifier(pattern: str, index: int) -> int:
+    """Return the index just past a quantifier (including a lazy/possessive suffix)"""
+    if pattern[index] == '{':
+        end = pattern.find('}', index)
+        index = end + 1 if end != -1 else index + 1
+    else:
+        index += 1
+
+    if index < len(pattern) and pattern[index] in '?+':
+        index += 1
+    return index
+
+
+class PatternSet:
+    """A set of regular expressions matched as one compiled alternation"""
+
+    def __init__(self, patterns: Iterable[str], flags: int = 0, prefilter: bool = True):
+        """Compile the pattern set
+
+        Args:
+            patterns: The regular expressions, in priority order
+            flags: Flags for the combined expression (re.IGNORECASE lowercases the prefilter)
+            prefilter: Use required literals to skip the regex engine on clean text
+        """
+        self.patterns: List[str] = list(patterns)
+        self._groups = {f"p{index}": pattern for index, pattern in enumerate(self.patterns)}
+        self._regex = None
+        if self.patterns:
+            self._regex = re.compile(
+                '|'.join(f"(?P<p{index}>{pattern})" for index, pattern in enumerate(self.patterns)),
+                flags
+            )
+
+        # Every pattern needs a provable literal, otherwise the prefilter could miss a match
+        self.literals: Optional[Tuple[str, ...]] = None
+        if prefilter and self.patterns:
+            literals = [required_literal(pattern) for pattern in self.patterns]
+            if all(literals):
+                if flags & re.IGNORECASE:
+                    literals = [literal.lower() for literal in literals]
+                self.literals = tuple(sorted(set(literals), key=len))
+        self._fold_case = bool(flags & re.IGNORECASE)
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def might_match(self, text: str) -> bool:
+        """Cheap check that rules out text containing none of the required literals"""
+        if self.literals is None:
+            return True
+        if self._fold_case:
+            text = text.lower()
+        for literal in self.literals:
+            if literal in text:
+                return True
+        return False
+
+    def search(self, text: str) -> Optional[str]:
+        """Find the first pattern that matches the text
+
+        Args:
+            text: The text to search
+
+        Returns:
+            The source pattern that fired, or None
+        """
+        if self._regex is None or not self.might_match(text):
+            return None
+
+        match = self._regex.search(text)
+        if match is None:
+            return None
+        return self._groups[match.lastgroup]
+
+
+@lru_cache(maxsize=64)
+def compile_pattern_set(patterns: Tuple[str, ...], flags: int = 0) -> PatternSet:
+    """Compile a pattern set, sharing the result between guilds with identical lists"""
+    return PatternSet(patterns, flags)
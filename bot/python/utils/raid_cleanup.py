@@ -0,0 +1,242 @@
+"""
+Guard-shin Discord Bot - Bulk Raid Cleanup
+This module removes a raid cohort from a guild. Bans use Discord's bulk-ban
+endpoint (up to 200 users per call) when the library supports it; kicks, and
+bans on older libraries, fan out with bounded concurrency through the REST
+scheduler at its highest priority. Jobs report progress as they go, can be
+cancelled mid-way, and a ban cleanup can be undone.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import discord
+
+from bot.python.utils.rest_scheduler import CRITICAL, HIGH, RestScheduler
+
+logger = logging.getLogger('guard-shin.raid_cleanup')
+
+# Cleanup actions
+CLEANUP_ACTIONS = ('kick', 'ban')
+
+# Users per bulk-ban call (Discord's limit)
+BULK_BAN_LIMIT = 200
+
+# Single kicks/bans/unbans in flight at once
+CLEANUP_CONCURRENCY = 10
+
+# Seconds without new members after which a job's accept window has passed and it stops
+CLEANUP_IDLE_TIMEOUT = 2
+
+
+class RaidCleanup:
+    """One kick or ban pass over a raid cohort
+
+    Members can be added while the job runs (late raid joins); the job keeps
+    waiting for them until its accept window has passed, even through a lull.
+    Progress is kept in counters the caller can read at any time.
+    """
+
+    def __init__(self, rest: RestScheduler, guild, action: str, reason: str,
+                 concurrency: int = CLEANUP_CONCURRENCY, accept_for: float = 0):
+        """Create a job (call start() to run it)
+
+        Args:
+            rest: REST scheduler the calls are sent through
+            guild: The guild being cleaned up
+            action: "kick" or "ban"
+            reason: Audit log reason
+            concurrency: Single calls in flight at once
+            accept_for: Seconds from the start during which the job waits for late members
+        """
+        if action not in CLEANUP_ACTIONS:
+            raise ValueError(f"Unknown cleanup action: {action}")
+
+        self.rest = rest
+        self.guild = guild
+        self.action = action
+        self.reason = reason
+        self.concurrency = concurrency
+
+        self._queue: List[int] = []
+        self._seen: Set[int] = set()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        self.removed: List[int] = []  # user ids kicked or banned, in order
+        self.failed = 0
+        self.skipped = 0  # staff, bots and members already gone
+        self.undone = 0
+        self.cancelled = False
+        self.started_at = time.time()
+        self.accept_until = self.started_at + accept_for
+        self.finished_at: Optional[float] = None
+
+    @property
+    def total(self) -> int:
+        return len(self._seen)
+
+    @property
+    def done(self) -> bool:
+        return self._task is not None and self._task.done()
+
+    def add(self, user_ids: Iterable[int]) -> int:
+        """Queue more users (duplicates are ignored)
+
+        Returns:
+            Number of users added
+        """
+        added = 0
+        for user_id in user_ids:
+            if user_id not in self._seen:
+                self._seen.add(user_id)
+                self._queue.append(user_id)
+                added += 1
+        if added:
+            self._wakeup.set()
+        return added
+
+    def start(self):
+        """Start the job (needs a running event loop)"""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    def cancel(self):
+        """Stop after the calls already in flight"""
+        self.cancelled = True
+        self._wakeup.set()
+
+    async def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the job to finish (without cancelling it on timeout)
+
+        Returns:
+            Whether the job has finished
+        """
+        if self._task is not None:
+            await asyncio.wait((self._task,), timeout=timeout)
+        return self.done
+
+    def progress(self) -> Dict[str, Any]:
+        """Counters for progress messages"""
+        return {
+            'action': self.action,
+            'total': self.total,
+            'removed': len(self.removed),
+            'failed': self.failed,
+            'skipped': self.skipped,
+            'pending': len(self._queue),
+            'undone': self.undone,
+            'cancelled': self.cancelled,
+            'finished': self.finished_at is not None,
+            'elapsed': (self.finished_at or time.time()) - self.started_at
+        }
+
+    def _removable(self, user_id: int) -> bool:
+        """Whether a queued user should be removed (members that outrank the bot or are staff are skipped)"""
+        member = self.guild.get_member(user_id)
+        if member is None:
+            return self.action == 'ban'  # Bans also cover raiders who already left
+        if member.bot or member.guild_permissions.manage_messages:
+            return False
+        return member.top_role < self.guild.me.top_role
+
+    async def _run(self):
+        """Drain the queue in batches until it stays empty"""
+        try:
+            while not self.cancelled:
+                batch, self._queue = self._queue, []
+                if not batch:
+                    # Late joins can still arrive; stop once the accept window has passed
+                    # and nothing came in for a moment
+                    self._wakeup.clear()
+                    timeout = max(self.accept_until - time.time(), CLEANUP_IDLE_TIMEOUT)
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                    except asyncio.TimeoutError:
+                        break
+                    continue
+
+                targets = []
+                for user_id in batch:
+                    if self._removable(user_id):
+                        targets.append(user_id)
+                    else:
+                        self.skipped += 1
+
+                if self.action == 'ban' and hasattr(self.guild, 'bulk_ban'):
+                    await self._bulk_ban(targets)
+                else:
+                    await self._each(targets, self._remove_one)
+        finally:
+            self.finished_at = time.time()
+            logger.info(f"Raid cleanup in {self.guild.name}: {len(self.removed)} {self.action}s, "
+                        f"{self.failed} failed, {self.skipped} skipped in {self.finished_at - self.started_at:.1f}s")
+
+    async def _bulk_ban(self, user_ids: List[int]):
+        """Ban users with Discord's bulk-ban endpoint, BULK_BAN_LIMIT at a time"""
+        for start in range(0, len(user_ids), BULK_BAN_LIMIT):
+            if self.cancelled:
+                return
+            chunk = user_ids[start:start + BULK_BAN_LIMIT]
+            try:
+                result = await self.rest.run(CRITICAL, f"guild:{self.guild.id}:bans", self.guild.bulk_ban,
+                                             [discord.Object(id=user_id) for user_id in chunk], reason=self.reason)
+            except discord.HTTPException as e:
+                # Fall back to single bans for this chunk
+                logger.warning(f"Bulk ban failed in {self.guild.name}, banning one by one: {e}")
+                await self._each(chunk, self._remove_one)
+                continue
+            self.removed.extend(user.id for user in result.banned)
+            self.failed += len(result.failed)
+
+    async def _each(self, user_ids: List[int], call, stop_on_cancel: bool = True):
+        """Run a single-user call for each user with bounded concurrency"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run(user_id):
+            async with semaphore:
+                if not (stop_on_cancel and self.cancelled):
+                    await call(user_id)
+
+        await asyncio.gather(*(run(user_id) for user_id in user_ids))
+
+    async def _remove_one(self, user_id: int):
+        """Kick or ban one user"""
+        target = self.guild.get_member(user_id) or discord.Object(id=user_id)
+        func = self.guild.ban if self.action == 'ban' else self.guild.kick
+        try:
+            await self.rest.run(CRITICAL, f"member:{self.guild.id}:{user_id}", func, target, reason=self.reason)
+            self.removed.append(user_id)
+        except discord.NotFound:
+            self.skipped += 1  # Already gone
+        except discord.HTTPException as e:
+            self.failed += 1
+            logger.warning(f"Failed to {self.action} {user_id} in {self.guild.name}: {e}")
+
+    async def undo(self, reason: str) -> int:
+        """Cancel the job and unban everyone it banned (kicks cannot be undone)
+
+        Returns:
+            Number of users unbanned
+        """
+        self.cancel()
+        await self.wait()
+        if self.action != 'ban':
+            return 0
+
+        banned, self.removed = self.removed, []
+
+        async def unban(user_id):
+            try:
+                await self.rest.run(HIGH, f"member:{self.guild.id}:{user_id}", self.guild.unban,
+                                    discord.Object(id=user_id), reason=reason)
+                self.undone += 1
+            except discord.NotFound:
+                pass  # Already unbanned
+            except discord.HTTPException as e:
+                logger.warning(f"Failed to unban {user_id} in {self.guild.name}: {e}")
+
+        await self._each(banned, unban, stop_on_cancel=False)
+        return self.undone
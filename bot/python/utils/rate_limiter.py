@@ -0,0 +1,128 @@
+"""
+Guard-shin Discord Bot - Sliding-Window Rate Limiter
+This module tracks "N events in T seconds" per key with a fixed-size ring of
+monotonic timestamps, so every event is O(1) and idle keys can be swept
+without scanning the active ones.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Hashable, List, Optional
+
+
+class _Window:
+    """Ring buffer holding the timestamps of a key's most recent events"""
+
+    __slots__ = ('times', 'index', 'last')
+
+    def __init__(self, size: int):
+        self.times: List[float] = [float('-inf')] * size
+        self.index = 0
+        self.last = float('-inf')
+
+
+class SlidingWindowLimiter:
+    """Per-key sliding-window limiter ("limit" events within "window" seconds)
+
+    Only the last ``limit`` timestamps are kept per key: the limit is reached
+    when the oldest of them is still inside the window. Keys are kept in
+    least-recently-used order, which makes idle keys cheap to sweep and lets
+    the limiter enforce a memory ceiling by evicting the least active key.
+    """
+
+    def __init__(self, limit: int, window: float, max_keys: int = 5000):
+        """Create the limiter
+
+        Args:
+            limit: Number of events that trips the limiter
+            window: Window length in seconds
+            max_keys: Maximum number of tracked keys
+        """
+        self.limit = max(1, int(limit))
+        self.window = float(window)
+        self.max_keys = max_keys
+        self.evictions = 0
+        self._windows: 'OrderedDict[Hashable, _Window]' = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._windows)
+
+    def configure(self, limit: int, window: float):
+        """Change the limits; history is dropped if the limit changes"""
+        limit = max(1, int(limit))
+        if limit != self.limit:
+            self.limit = limit
+            self._windows.clear()
+        self.window = float(window)
+
+    def hit(self, key: Hashable, now: Optional[float] = None) -> bool:
+        """Record an event for a key
+
+        Args:
+            key: The key (e.g. a user ID)
+            now: Monotonic timestamp of the event (defaults to time.monotonic())
+
+        Returns:
+            True if this event is the ``limit``-th (or later) within the window
+        """
+        if now is None:
+            now = time.monotonic()
+
+        windows = self._windows
+        entry = windows.get(key)
+        if entry is None:
+            entry = windows[key] = _Window(self.limit)
+            if len(windows) > self.max_keys:
+                windows.popitem(last=False)
+                self.evictions += 1
+        else:
+            windows.move_to_end(key)
+
+        times = entry.times
+        times[entry.index] = now
+        entry.index = (entry.index + 1) % self.limit
+        entry.last = now
+
+        # After advancing, the index points at the oldest of the last "limit" events
+        return now - times[entry.index] <= self.window
+
+    def retry_after(self, key: Hashable, now: Optional[float] = None) -> float:
+        """Seconds until the key drops back under the limit (0 if it already is)"""
+        entry = self._windows.get(key)
+        if entry is None:
+            return 0.0
+        if now is None:
+            now = time.monotonic()
+
+        if self.limit == 1:
+            return 0.0
+
+        # The next event trips the limiter while the second-oldest timestamp is inside the window
+        oldest = entry.times[(entry.index + 1) % self.limit]
+        return max(0.0, self.window - (now - oldest))
+
+    def reset(self, key: Hashable):
+        """Forget a key's history"""
+        self._windows.pop(key, None)
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Drop keys with no events inside the window
+
+        Returns:
+            The number of keys removed
+        """
+        if now is None:
+            now = time.monotonic()
+        cutoff = now - self.window
+
+        # Least recently active keys come first, so stop at the first active one
+        windows = self._windows
+        removed = 0
+        while windows:
+            key, entry = next(iter(windows.items()))
+            if entry.last > cutoff:
+                break
+            del windows[key]
+            removed += 1
+
+        return removed
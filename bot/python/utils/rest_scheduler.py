@@ -0,0 +1,356 @@
+"""
+Guard-shin Discord Bot - Prioritized REST Scheduler
+This module runs Discord REST calls from every cog through one shared set of
+workers. Calls are ordered by priority class, so bans, timeouts and deletes
+are sent before log embeds and status changes; each route gets a bounded
+share of the workers and backs off on its own when it is rate limited.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+import discord
+
+logger = logging.getLogger('guard-shin.rest_scheduler')
+
+# Priority classes (lower runs first)
+CRITICAL = 0  # bans, kicks, timeouts, deletes, lockdown
+HIGH = 1  # unlocks, verification roles, DMs that must precede an action
+NORMAL = 2  # lookups and notifications
+LOW = 3  # cosmetic work: status rotation, welcome messages, log embeds
+PRIORITY_NAMES = ('critical', 'high', 'normal', 'low')
+
+# Queued calls allowed per class before new ones wait (run) or are dropped (spawn);
+# None means unbounded
+MAX_PENDING = (None, 2000, 1000, 200)
+
+# Worker tasks shared by every route
+WORKERS = 8
+
+# Calls allowed in flight on one route at a time
+ROUTE_CONCURRENCY = 2
+
+# Times a rate limited call is retried before its error is raised to the caller
+MAX_RETRIES = 3
+
+
+class _Job:
+    """A queued REST call"""
+
+    __slots__ = ('priority', 'seq', 'route', 'call', 'future', 'queued_at', 'attempts', 'reserved')
+
+    def __init__(self, priority: int, seq: int, route: str, call: Callable[[], Awaitable[Any]],
+                 future: asyncio.Future):
+        self.priority = priority
+        self.seq = seq
+        self.route = route
+        self.call = call
+        self.future = future
+        self.queued_at = time.monotonic()
+        self.attempts = 0
+        self.reserved = False  # holds one of its route's slots while back in the queue
+
+    def __lt__(self, other: '_Job') -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class _Route:
+    """In-flight count, parked calls and rate limit state for one route"""
+
+    __slots__ = ('active', 'waiting', 'blocked_until')
+
+    def __init__(self):
+        self.active = 0
+        self.waiting: List[_Job] = []  # heap, in priority order
+        self.blocked_until = 0.0
+
+
+class _ClassStats:
+    """Counters for one priority class"""
+
+    __slots__ = ('pending', 'submitted', 'completed', 'failed', 'dropped', 'wait_total', 'wait_max')
+
+    def __init__(self):
+        self.pending = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+
+class RestScheduler:
+    """Priority queue of REST calls drained by a fixed pool of workers
+
+    Calls name the route they hit (e.g. ``channel:<id>`` or ``guild:<id>``).
+    discord.py still enforces Discord's real buckets; the scheduler keeps one
+    hot route from taking every worker, parks calls for a route that was
+    rate limited until its retry time, and applies backpressure per priority
+    class so cosmetic work cannot pile up in front of moderation.
+    """
+
+    def __init__(self, workers: int = WORKERS, route_concurrency: int = ROUTE_CONCURRENCY,
+                 max_pending: Tuple[Optional[int], ...] = MAX_PENDING, max_retries: int = MAX_RETRIES):
+        """Create the scheduler (workers start on first use)
+
+        Args:
+            workers: Number of worker tasks
+            route_concurrency: Calls allowed in flight on one route
+            max_pending: Queue bound per priority class (None = unbounded)
+            max_retries: Retries for a rate limited call
+        """
+        self.workers = workers
+        self.route_concurrency = route_concurrency
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+
+        self._queue: List[_Job] = []  # heap of runnable calls
+        self._ready: Optional[asyncio.Event] = None
+        self._routes: Dict[str, _Route] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._seq = itertools.count()
+        self._space_waiters: Tuple[Deque[asyncio.Future], ...] = tuple(deque() for _ in PRIORITY_NAMES)
+        self._classes = tuple(_ClassStats() for _ in PRIORITY_NAMES)
+
+        # Counters
+        self.in_flight = 0
+        self.rate_limited = 0
+
+    def _start(self):
+        """Start the workers (needs a running event loop)"""
+        if self._tasks:
+            return
+        self._ready = asyncio.Event()
+        self._tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+
+    def _has_room(self, priority: int) -> bool:
+        """Whether a priority class can take another call"""
+        limit = self.max_pending[priority]
+        return limit is None or self._classes[priority].pending < limit
+
+    def _enqueue(self, priority: int, route: str, call: Callable[[], Awaitable[Any]]) -> asyncio.Future:
+        """Queue a call and return the future for its result"""
+        self._start()
+        future = asyncio.get_running_loop().create_future()
+        job = _Job(priority, next(self._seq), route, call, future)
+        stats = self._classes[priority]
+        stats.pending += 1
+        stats.submitted += 1
+        self._push(job)
+        return future
+
+    def _push(self, job: _Job):
+        """Make a call runnable"""
+        heapq.heappush(self._queue, job)
+        self._ready.set()
+
+    async def run(self, priority: int, route: str, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """Run a REST call through the scheduler and return its result
+
+        Waits for room if the priority class is full. Errors from the call
+        are raised here.
+
+        Args:
+            priority: CRITICAL, HIGH, NORMAL or LOW
+            route: Route key the call is limited on
+            func: Coroutine function making the call (e.g. channel.set_permissions)
+        """
+        while not self._has_room(priority):
+            waiter = asyncio.get_running_loop().create_future()
+            self._space_waiters[priority].append(waiter)
+            try:
+                await waiter
+            finally:
+                if not waiter.done():
+                    waiter.cancel()
+
+        future = self._enqueue(priority, route, lambda: func(*args, **kwargs))
+        try:
+            return await future
+        except asyncio.CancelledError:
+            future.cancel()  # The worker skips calls nobody is waiting for
+            raise
+
+    def spawn(self, priority: int, route: str, func: Callable[..., Awaitable[Any]], *args,
+              **kwargs) -> Optional[asyncio.Future]:
+        """Queue a call without waiting for it
+
+        Errors are logged instead of raised.
+
+        Returns:
+            The call's future, or None if the priority class was full and the call was dropped
+        """
+        if not self._has_room(priority):
+            self._classes[priority].dropped += 1
+            return None
+
+        future = self._enqueue(priority, route, lambda: func(*args, **kwargs))
+        future.add_done_callback(self._log_failure)
+        return future
+
+    @staticmethod
+    def _log_failure(future: asyncio.Future):
+        """Done callback for spawned calls"""
+        if not future.cancelled() and future.exception() is not None:
+            logger.warning(f"Scheduled REST call failed: {future.exception()}")
+
+    def _started(self, job: _Job):
+        """Book-keeping for a call leaving the queue"""
+        stats = self._classes[job.priority]
+        stats.pending -= 1
+
+        # Wake one caller waiting for room in this class
+        waiters = self._space_waiters[job.priority]
+        while waiters:
+            waiter = waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                break
+
+    def _route(self, key: str) -> _Route:
+        route = self._routes.get(key)
+        if route is None:
+            route = self._routes[key] = _Route()
+        return route
+
+    def _release(self, key: str):
+        """Move a route's parked calls back to the queue while it has capacity"""
+        route = self._routes.get(key)
+        if route is None:
+            return
+
+        if route.blocked_until <= time.monotonic():
+            while route.waiting and route.active < self.route_concurrency:
+                job = heapq.heappop(route.waiting)
+                job.reserved = True
+                route.active += 1
+                self._push(job)
+
+        if not route.active and not route.waiting:
+            del self._routes[key]
+
+    async def _worker(self):
+        """Worker loop: run the highest-priority runnable call"""
+        while True:
+            while not self._queue:
+                self._ready.clear()
+                await self._ready.wait()
+
+            job = heapq.heappop(self._queue)
+            route = self._route(job.route)
+            if job.reserved:
+                job.reserved = False
+            elif route.blocked_until > time.monotonic() or route.active >= self.route_concurrency:
+                # Park the call until the route has capacity again
+                heapq.heappush(route.waiting, job)
+                continue
+            else:
+                route.active += 1
+
+            if job.future.done():
+                # The caller gave up before the call started
+                if job.attempts == 0:
+                    self._started(job)
+                route.active -= 1
+                self._release(job.route)
+                continue
+
+            await self._execute(job)
+
+    async def _execute(self, job: _Job):
+        """Run one call and settle its future"""
+        key = job.route
+        if job.attempts == 0:
+            self._started(job)
+            wait = time.monotonic() - job.queued_at
+            stats = self._classes[job.priority]
+            stats.wait_total += wait
+            stats.wait_max = max(stats.wait_max, wait)
+
+        self.in_flight += 1
+        try:
+            result = await job.call()
+        except Exception as e:
+            retry_after = self._retry_after(e)
+            if retry_after is not None and job.attempts < self.max_retries and not job.future.done():
+                # Back the whole route off and retry the call when it reopens
+                self.rate_limited += 1
+                job.attempts += 1
+                route = self._route(key)
+                route.blocked_until = max(route.blocked_until, time.monotonic() + retry_after)
+                heapq.heappush(route.waiting, job)
+                asyncio.get_running_loop().call_later(retry_after, self._release, key)
+                logger.warning(f"Route {key} rate limited, retrying in {retry_after:.1f}s")
+            else:
+                self._classes[job.priority].failed += 1
+                if not job.future.done():
+                    job.future.set_exception(e)
+        else:
+            self._classes[job.priority].completed += 1
+            if not job.future.done():
+                job.future.set_result(result)
+        finally:
+            self.in_flight -= 1
+            route = self._route(key)
+            route.active -= 1
+            self._release(key)
+
+    @staticmethod
+    def _retry_after(error: Exception) -> Optional[float]:
+        """Seconds to wait if an error is a rate limit, else None"""
+        if isinstance(error, discord.RateLimited):
+            return error.retry_after
+        if isinstance(error, discord.HTTPException) and error.status == 429:
+            return float(getattr(error, 'retry_after', None) or 1.0)
+        return None
+
+    async def close(self):
+        """Stop the workers and cancel calls that have not started"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        for job in self._queue:
+            job.future.cancel()
+        for route in self._routes.values():
+            for job in route.waiting:
+                job.future.cancel()
+        self._queue.clear()
+        self._routes.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, wait times and outcome counters per priority class"""
+        classes = {}
+        for name, stats in zip(PRIORITY_NAMES, self._classes):
+            started = stats.submitted - stats.pending
+            classes[name] = {
+                'pending': stats.pending,
+                'submitted': stats.submitted,
+                'completed': stats.completed,
+                'failed': stats.failed,
+                'dropped': stats.dropped,
+                'avg_wait': stats.wait_total / started if started else 0.0,
+                'max_wait': stats.wait_max
+            }
+        return {
+            'in_flight': self.in_flight,
+            'routes': len(self._routes),
+            'parked': sum(len(route.waiting) for route in self._routes.values()),
+            'rate_limited': self.rate_limited,
+            'classes': classes
+        }
+
+
+def get_rest_scheduler(bot) -> RestScheduler:
+    """Get the REST scheduler shared by every cog, creating it on first use"""
+    scheduler = getattr(bot, 'rest_scheduler', None)
+    if scheduler is None:
+        scheduler = bot.rest_scheduler = RestScheduler()
+    return scheduler
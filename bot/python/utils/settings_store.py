@@ -0,0 +1,232 @@
+"""
+Guard-shin Discord Bot - Persistent Settings Store
+This module keeps per-guild settings for the moderation cogs in a local SQLite
+database (WAL mode). Guilds are loaded lazily on first use, reads are served
+from a write-through cache, and changes are written back in debounced batches
+on a dedicated database thread so the event loop never waits on disk I/O.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger('guard-shin.settings_store')
+
+# Database file shared by every cog that stores settings
+SETTINGS_DB_PATH = os.environ.get('SETTINGS_DB_PATH', 'guard_shin.db')
+
+# Seconds to wait after the first change before writing the batch
+FLUSH_DELAY = 2.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS guild_settings (
+    namespace TEXT NOT NULL,
+    guild_id INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (namespace, guild_id)
+)
+"""
+
+
+class SettingsStore:
+    """Async repository of per-guild JSON settings, grouped by namespace"""
+
+    def __init__(self, path: str = SETTINGS_DB_PATH, flush_delay: float = FLUSH_DELAY):
+        """Create the store (the database is opened on first use)
+
+        Args:
+            path: SQLite database file
+            flush_delay: Seconds to batch changes before writing them
+        """
+        self.path = path
+        self.flush_delay = flush_delay
+
+        # Every database call runs on this one thread, which owns the connection
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='settings-store')
+        self._connection: Optional[sqlite3.Connection] = None
+
+        self._cache: Dict[Tuple[str, int], Optional[Dict[str, Any]]] = {}
+        self._dirty = set()
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_lock = asyncio.Lock()
+
+        # Counters
+        self.loads = 0
+        self.writes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database (database thread only)"""
+        if self._connection is None:
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(_SCHEMA)
+            connection.commit()
+            self._connection = connection
+        return self._connection
+
+    def _read(self, namespace: str, guild_id: int) -> Optional[str]:
+        """Read one guild's settings (database thread only)"""
+        row = self._connect().execute(
+            "SELECT data FROM guild_settings WHERE namespace = ? AND guild_id = ?",
+            (namespace, guild_id)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _read_namespace(self, namespace: str) -> List[Tuple[int, str]]:
+        """Read every guild's settings in a namespace (database thread only)"""
+        return self._connect().execute(
+            "SELECT guild_id, data FROM guild_settings WHERE namespace = ?",
+            (namespace,)
+        ).fetchall()
+
+    def _write(self, rows: List[Tuple[str, int, str, float]], deletes: List[Tuple[str, int]]):
+        """Write a batch of settings in one transaction (database thread only)"""
+        connection = self._connect()
+        with connection:
+            connection.executemany(
+                "INSERT INTO guild_settings (namespace, guild_id, data, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(namespace, guild_id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at",
+                rows
+            )
+            connection.executemany(
+                "DELETE FROM guild_settings WHERE namespace = ? AND guild_id = ?",
+                deletes
+            )
+
+    async def _run(self, function, *args):
+        """Run a database call on the database thread"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, function, *args)
+
+    async def load(self, namespace: str, guild_id: int) -> Optional[Dict[str, Any]]:
+        """Get a guild's stored settings
+
+        Returns:
+            The stored settings, or None if the guild has never saved any
+        """
+        key = (namespace, guild_id)
+        if key in self._cache:
+            return self._cache[key]
+
+        data = await self._run(self._read, namespace, guild_id)
+        self.loads += 1
+
+        # Another caller may have loaded or saved the guild while we waited
+        if key in self._cache:
+            return self._cache[key]
+
+        settings = None
+        if data is not None:
+            try:
+                settings = json.loads(data)
+            except ValueError as e:
+                logger.error(f"Discarding unreadable {namespace} settings for guild {guild_id}: {e}")
+
+        self._cache[key] = settings
+        return settings
+
+    async def load_namespace(self, namespace: str) -> Dict[int, Dict[str, Any]]:
+        """Get the stored settings of every guild in a namespace
+
+        Used for state that has to be picked up again at startup (e.g. active
+        lockdowns). Guilds already in the cache keep their cached copy.
+        """
+        rows = await self._run(self._read_namespace, namespace)
+        self.loads += 1
+
+        result = {}
+        for guild_id, data in rows:
+            key = (namespace, guild_id)
+            if key not in self._cache:
+                try:
+                    self._cache[key] = json.loads(data)
+                except ValueError as e:
+                    logger.error(f"Discarding unreadable {namespace} settings for guild {guild_id}: {e}")
+                    continue
+            if self._cache[key] is not None:
+                result[guild_id] = self._cache[key]
+        return result
+
+    def save(self, namespace: str, guild_id: int, settings: Optional[Dict[str, Any]]):
+        """Store a guild's settings
+
+        The cache is updated immediately; the database write is batched with
+        other changes and happens shortly afterwards. Saving None deletes the
+        guild's row.
+        """
+        key = (namespace, guild_id)
+        self._cache[key] = settings
+        self._dirty.add(key)
+
+        if self._flush_handle is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return  # No loop yet; the next flush picks the change up
+            self._flush_handle = loop.call_later(self.flush_delay, self._schedule_flush)
+
+    def delete(self, namespace: str, guild_id: int):
+        """Delete a guild's stored settings"""
+        self.save(namespace, guild_id, None)
+
+    def evict(self, namespace: str, guild_id: int):
+        """Drop a guild from the cache (pending changes are still written)"""
+        key = (namespace, guild_id)
+        if key not in self._dirty:
+            self._cache.pop(key, None)
+
+    def _schedule_flush(self):
+        """Timer callback that starts a batched write"""
+        self._flush_handle = None
+        asyncio.ensure_future(self.flush())
+
+    async def flush(self):
+        """Write every pending change now"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        async with self._flush_lock:
+            if not self._dirty:
+                return
+
+            # Serialize on the event loop so the snapshot is consistent
+            keys = list(self._dirty)
+            self._dirty.clear()
+            now = time.time()
+            rows = [
+                (namespace, guild_id, json.dumps(self._cache[(namespace, guild_id)]), now)
+                for namespace, guild_id in keys
+                if self._cache.get((namespace, guild_id)) is not None
+            ]
+            deletes = [key for key in keys if self._cache.get(key) is None]
+
+            try:
+                await self._run(self._write, rows, deletes)
+                self.writes += len(rows) + len(deletes)
+            except sqlite3.Error as e:
+                logger.error(f"Failed to write {len(rows) + len(deletes)} guild settings: {e}")
+                self._dirty.update(keys)
+
+    async def close(self):
+        """Write pending changes and close the database"""
+        await self.flush()
+        if self._connection is not None:
+            await self._run(self._connection.close)
+            self._connection = None
+        self._executor.shutdown(wait=False)
+
+
+def get_settings_store(bot) -> SettingsStore:
+    """Get the settings store shared by every cog, creating it on first use"""
+    store = getattr(bot, 'settings_store', None)
+    if store is None:
+        store = bot.settings_store = SettingsStore()
+    return store
@@ -0,0 +1,220 @@
+"""
+Guard-shin Discord Bot - Shard Ownership and Health Metrics
+This module tells background tasks which guilds belong to the shards this
+process runs, and tracks per-shard health: gateway latency, event rate and
+connect/disconnect/resume counts. Metrics are sampled on an interval and
+written to a JSON file that the web process reads for its health endpoint.
+"""
+
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger('guard-shin.shard_metrics')
+
+# Seconds between metric samples / file writes
+SAMPLE_INTERVAL = 30
+
+# Where the metrics are written (override with SHARD_METRICS_PATH)
+DEFAULT_METRICS_PATH = 'shard_metrics.json'
+
+
+def parse_shard_config(shard_count: Optional[str], shard_ids: Optional[str]) -> Tuple[Optional[int], Optional[List[int]]]:
+    """Parse SHARD_COUNT / SHARD_IDS style settings
+
+    Args:
+        shard_count: Total shards across every process ("" or None lets Discord recommend one)
+        shard_ids: Comma-separated shards this process runs ("" or None for all of them)
+
+    Returns:
+        (shard_count, shard_ids) for AutoShardedBot
+
+    Raises:
+        ValueError: If the values are malformed, or shard ids are given without a count
+    """
+    count = int(shard_count) if shard_count and shard_count.strip() else None
+    if count is not None and count < 1:
+        raise ValueError(f"Shard count must be at least 1, got {count}")
+
+    ids = None
+    if shard_ids and shard_ids.strip():
+        ids = sorted({int(part) for part in shard_ids.split(',') if part.strip()})
+        if count is None:
+            raise ValueError("SHARD_IDS needs SHARD_COUNT (the total across every process)")
+        if ids[0] < 0 or ids[-1] >= count:
+            raise ValueError(f"Shard ids must be between 0 and {count - 1}, got {ids}")
+    return count, ids
+
+
+def shard_for_guild(guild_id: int, shard_count: int) -> int:
+    """The shard a guild's events arrive on (Discord's sharding formula)"""
+    return (int(guild_id) >> 22) % shard_count
+
+
+def owns_guild(bot, guild_id: int) -> bool:
+    """Whether a guild belongs to one of the shards this process runs
+
+    Tasks that work from a global list (e.g. premium expiry) use this so that,
+    with shards split across processes, exactly one process handles each guild.
+    """
+    shard_count = getattr(bot, 'shard_count', None)
+    if not shard_count:
+        return True
+    shard_ids = getattr(bot, 'shard_ids', None)
+    return shard_ids is None or shard_for_guild(guild_id, shard_count) in shard_ids
+
+
+def owned_shards(bot) -> Optional[Tuple[int, List[int]]]:
+    """The shards this process runs, for filtering stored rows by guild in a query
+
+    Returns:
+        (shard_count, shard_ids), or None if this process owns every guild
+    """
+    shard_count = getattr(bot, 'shard_count', None)
+    shard_ids = getattr(bot, 'shard_ids', None)
+    if not shard_count or shard_ids is None:
+        return None
+    return shard_count, sorted(shard_ids)
+
+
+def _gateway_sequence(shard) -> Optional[int]:
+    """The shard's last gateway sequence number (counts every dispatched event)
+
+    discord.py does not expose a per-shard event counter, and the debug socket
+    events carry no shard id, so the sequence number of the shard's websocket
+    is read instead.
+    """
+    websocket = getattr(getattr(shard, '_parent', None), 'ws', None)
+    return getattr(websocket, 'sequence', None)
+
+
+class _ShardStats:
+    """Counters for one shard"""
+
+    __slots__ = ('connects', 'disconnects', 'resumes', 'events', 'event_rate', 'sequence', 'last_connect')
+
+    def __init__(self):
+        self.connects = 0
+        self.disconnects = 0
+        self.resumes = 0
+        self.events = 0  # gateway events seen since start
+        self.event_rate = 0.0  # events per second over the last sample
+        self.sequence: Optional[int] = None
+        self.last_connect: Optional[float] = None
+
+
+class ShardMetrics:
+    """Per-shard latency, event rate and reconnect counters for this process"""
+
+    def __init__(self, bot):
+        """Create the metrics and subscribe to shard events
+
+        Args:
+            bot: The (auto-sharded) bot
+        """
+        self.bot = bot
+        self.started_at = time.time()
+        self._stats: Dict[int, _ShardStats] = {}
+        self._sampled_at = time.monotonic()
+
+        bot.add_listener(self._on_shard_connect, 'on_shard_connect')
+        bot.add_listener(self._on_shard_disconnect, 'on_shard_disconnect')
+        bot.add_listener(self._on_shard_resumed, 'on_shard_resumed')
+
+    def _shard(self, shard_id: int) -> _ShardStats:
+        stats = self._stats.get(shard_id)
+        if stats is None:
+            stats = self._stats[shard_id] = _ShardStats()
+        return stats
+
+    async def _on_shard_connect(self, shard_id: int):
+        stats = self._shard(shard_id)
+        stats.connects += 1
+        stats.last_connect = time.time()
+        if stats.connects > 1:
+            logger.info(f"Shard {shard_id} reconnected ({stats.connects - 1} reconnects)")
+
+    async def _on_shard_disconnect(self, shard_id: int):
+        stats = self._shard(shard_id)
+        stats.disconnects += 1
+        logger.warning(f"Shard {shard_id} disconnected from the gateway")
+
+    async def _on_shard_resumed(self, shard_id: int):
+        stats = self._shard(shard_id)
+        stats.resumes += 1
+
+    def sample(self):
+        """Update event counts and rates from each shard's gateway sequence"""
+        now = time.monotonic()
+        elapsed = max(now - self._sampled_at, 1e-6)
+        self._sampled_at = now
+
+        for shard_id, shard in getattr(self.bot, 'shards', {}).items():
+            stats = self._shard(shard_id)
+            sequence = _gateway_sequence(shard)
+            if sequence is None:
+                stats.event_rate = 0.0
+                continue
+            # A new session restarts the sequence at 1
+            new_events = sequence - stats.sequence if stats.sequence is not None and sequence >= stats.sequence else sequence
+            stats.events += new_events
+            stats.event_rate = new_events / elapsed
+            stats.sequence = sequence
+
+    def _guild_counts(self) -> Dict[int, int]:
+        """Guilds per shard"""
+        counts: Dict[int, int] = {}
+        for guild in self.bot.guilds:
+            counts[guild.shard_id] = counts.get(guild.shard_id, 0) + 1
+        return counts
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current metrics for this process, JSON-serializable"""
+        latencies = dict(getattr(self.bot, 'latencies', []))
+        guilds = self._guild_counts()
+        shards = {}
+        for shard_id, shard in getattr(self.bot, 'shards', {}).items():
+            stats = self._shard(shard_id)
+            latency = latencies.get(shard_id)
+            shards[str(shard_id)] = {
+                'connected': not shard.is_closed(),
+                'latency_ms': round(latency * 1000, 1) if latency is not None and latency != float('inf') else None,
+                'ratelimited': shard.is_ws_ratelimited(),
+                'guilds': guilds.get(shard_id, 0),
+                'events': stats.events,
+                'events_per_second': round(stats.event_rate, 2),
+                'connects': stats.connects,
+                'reconnects': max(stats.connects - 1, 0),
+                'disconnects': stats.disconnects,
+                'resumes': stats.resumes,
+                'last_connect': stats.last_connect
+            }
+
+        return {
+            'pid': os.getpid(),
+            'shard_count': getattr(self.bot, 'shard_count', None),
+            'shard_ids': sorted(int(shard_id) for shard_id in shards),
+            'ready': self.bot.is_ready(),
+            'guilds': len(self.bot.guilds),
+            'started_at': self.started_at,
+            'updated_at': time.time(),
+            'shards': shards
+        }
+
+    def write(self, path: str):
+        """Sample and write the metrics file (atomically, so readers never see a partial file)"""
+        self.sample()
+        temporary = f"{path}.tmp"
+        with open(temporary, 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(temporary, path)
+
+
+def get_shard_metrics(bot) -> ShardMetrics:
+    """Get the bot's shard metrics, creating them on first use"""
+    metrics = getattr(bot, 'shard_metrics', None)
+    if metrics is None:
+        metrics = bot.shard_metrics = ShardMetrics(bot)
+    return metrics
@@ -0,0 +1,408 @@
+"""
+Guard-shin Discord Bot - Persistent Timer Scheduler
+This module runs every delayed action (reminders, tempban/tempmute expiry,
+lockdown expiry) from one SQLite table and one dispatcher task. Only timers
+due within the next horizon are held in memory, so millions of pending timers
+cost a table row each; timers that came due while the bot was offline fire
+in a catch-up batch when it starts again. Timers carry the guild they belong
+to, and with shards split across processes sharing the database, each
+process only loads and fires the timers of guilds on its own shards.
+"""
+
+import asyncio
+import heapq
+import json
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from bot.python.utils.settings_store import SETTINGS_DB_PATH
+from bot.python.utils.shard_metrics import owned_shards
+
+logger = logging.getLogger('guard-shin.timer_scheduler')
+
+# Seconds ahead of now that timers are loaded into memory
+HORIZON = 3600
+
+# Timers fired (and payloads read) per batch
+BATCH_SIZE = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS timers (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    key TEXT,
+    guild_id INTEGER,
+    due REAL NOT NULL,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    UNIQUE (kind, key)
+);
+CREATE INDEX IF NOT EXISTS timers_due ON timers (due);
+"""
+
+# Shard filter for timer queries; timers without a guild (e.g. DM reminders) belong to
+# shard 0, which is where Discord delivers direct messages
+_SHARD_FILTER = "(COALESCE(guild_id, 0) >> 22) % ? IN ({})"
+
+# (shard_count, shard_ids) of the shards this process runs, or None for every guild
+Shards = Optional[Tuple[int, Sequence[int]]]
+
+
+class Timer(NamedTuple):
+    """A timer handed to its handler when it fires"""
+    id: int
+    kind: str
+    key: Optional[str]
+    due: float
+    payload: Dict[str, Any]
+    guild_id: Optional[int] = None
+
+
+class TimerScheduler:
+    """Durable timers dispatched by a single task
+
+    Handlers are registered per kind. A timer is deleted once its handler
+    has run (errors are logged, not retried), and scheduling a timer with
+    the same kind and key as an existing one replaces it. Timers of guilds on
+    other processes' shards are never loaded, so a handler only runs in the
+    process that has the timer's guild.
+    """
+
+    def __init__(self, path: str = SETTINGS_DB_PATH, horizon: float = HORIZON,
+                 wait_until: Optional[Callable[[], Awaitable[Any]]] = None,
+                 shards: Optional[Callable[[], Shards]] = None):
+        """Create the scheduler (the database is opened on first use)
+
+        Args:
+            path: SQLite database file
+            horizon: Seconds ahead of now that timers are held in memory
+            wait_until: Coroutine function awaited before the first dispatch (e.g. bot.wait_until_ready)
+            shards: Function returning the shards whose timers this process fires (None for all)
+        """
+        self.path = path
+        self.horizon = horizon
+        self._wait_until = wait_until
+        self._shards = shards
+
+        # Every database call runs on this one thread, which owns the connection
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='timer-scheduler')
+        self._connection: Optional[sqlite3.Connection] = None
+
+        self._handlers: Dict[str, Callable[[Timer], Awaitable[Any]]] = {}
+        self._heap: List[Tuple[float, int]] = []  # (due, id) for timers due before _loaded_until
+        self._cancelled: Set[int] = set()  # ids still in the heap whose row was deleted
+        self._loaded_until: Optional[float] = 0.0  # None until the first load
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # Counters
+        self.fired = 0
+        self.failed = 0
+        self.caught_up = 0
+
+    # Database thread
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database (database thread only)"""
+        if self._connection is None:
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(_SCHEMA)
+            connection.commit()
+            self._migrate(connection)
+            self._connection = connection
+        return self._connection
+
+    @staticmethod
+    def _migrate(connection: sqlite3.Connection):
+        """Add the guild column to a table created before it existed (database thread only)"""
+        columns = {row[1] for row in connection.execute("PRAGMA table_info(timers)")}
+        if 'guild_id' in columns:
+            return
+        try:
+            with connection:
+                connection.execute("ALTER TABLE timers ADD COLUMN guild_id INTEGER")
+        except sqlite3.OperationalError:
+            return  # Another process added it first
+
+        # Existing guild timers keep their guild in the payload
+        with connection:
+            for timer_id, payload in connection.execute("SELECT id, payload FROM timers").fetchall():
+                try:
+                    guild_id = json.loads(payload).get('guild_id')
+                except (ValueError, AttributeError):
+                    continue
+                if guild_id is not None:
+                    connection.execute("UPDATE timers SET guild_id = ? WHERE id = ?", (int(guild_id), timer_id))
+
+    def _insert(self, kind: str, key: Optional[str], guild_id: Optional[int], due: float,
+                payload: str) -> Tuple[int, Optional[Tuple[float, int]]]:
+        """Insert or replace a timer (database thread only)
+
+        Returns:
+            (new id, (due, id) of the timer it replaced or None)
+        """
+        connection = self._connect()
+        with connection:
+            replaced = None
+            if key is not None:
+                replaced = connection.execute(
+                    "SELECT due, id FROM timers WHERE kind = ? AND key = ?", (kind, key)
+                ).fetchone()
+                if replaced:
+                    connection.execute("DELETE FROM timers WHERE id = ?", (replaced[1],))
+            cursor = connection.execute(
+                "INSERT INTO timers (kind, key, guild_id, due, payload, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (kind, key, guild_id, due, payload, time.time())
+            )
+            return cursor.lastrowid, replaced
+
+    def _delete_key(self, kind: str, key: str) -> Optional[Tuple[float, int]]:
+        """Delete a timer by kind and key, returning its (due, id) (database thread only)"""
+        connection = self._connect()
+        with connection:
+            row = connection.execute("SELECT due, id FROM timers WHERE kind = ? AND key = ?", (kind, key)).fetchone()
+            if row:
+                connection.execute("DELETE FROM timers WHERE id = ?", (row[1],))
+        return row
+
+    def _delete_ids(self, ids: List[int]):
+        """Delete fired timers (database thread only)"""
+        connection = self._connect()
+        with connection:
+            connection.executemany("DELETE FROM timers WHERE id = ?", [(timer_id,) for timer_id in ids])
+
+    def _load_range(self, start: Optional[float], end: float, shards: Shards) -> List[Tuple[float, int]]:
+        """(due, id) of timers due in (start, end], or everything up to end if start is None,
+        for guilds on the given shards (database thread only)"""
+        query = "SELECT due, id FROM timers WHERE due <= ?"
+        params: List[Any] = [end]
+        if start is not None:
+            query += " AND due > ?"
+            params.append(start)
+        if shards is not None:
+            shard_count, shard_ids = shards
+            query += " AND " + _SHARD_FILTER.format(",".join("?" * len(shard_ids)))
+            params += [shard_count, *shard_ids]
+        return self._connect().execute(query, params).fetchall()
+
+    def _load_timers(self, ids: List[int]) -> List[Tuple[int, str, Optional[str], Optional[int], float, str]]:
+        """Full rows for a batch of timers (database thread only)"""
+        placeholders = ",".join("?" * len(ids))
+        return self._connect().execute(
+            f"SELECT id, kind, key, guild_id, due, payload FROM timers WHERE id IN ({placeholders})", ids
+        ).fetchall()
+
+    def _count(self) -> int:
+        """Number of pending timers (database thread only)"""
+        return self._connect().execute("SELECT COUNT(*) FROM timers").fetchone()[0]
+
+    async def _run_db(self, function, *args):
+        """Run a database call on the database thread"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, function, *args)
+
+    # Public API
+
+    def register(self, kind: str, handler: Callable[[Timer], Awaitable[Any]]):
+        """Set the coroutine function that runs when a timer of this kind fires"""
+        self._handlers[kind] = handler
+
+    def start(self):
+        """Start the dispatcher (needs a running event loop; safe to call more than once)"""
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.ensure_future(self._dispatch())
+
+    async def schedule(self, kind: str, due: float, payload: Dict[str, Any], key: Optional[str] = None,
+                       guild_id: Optional[int] = None) -> int:
+        """Schedule a timer
+
+        Args:
+            kind: Handler kind
+            due: Unix timestamp to fire at
+            payload: JSON-serializable data for the handler
+            key: Optional identity; an existing timer with the same kind and key is replaced
+            guild_id: Guild the timer belongs to; only the process running its shard fires it
+                (None for timers outside a guild, which shard 0's process fires)
+
+        Returns:
+            The timer's id
+        """
+        timer_id, replaced = await self._run_db(self._insert, kind, key, guild_id, due, json.dumps(payload))
+        if replaced is not None:
+            self._forget(*replaced)
+
+        # Timers inside the loaded window go straight into memory
+        if self._loaded_until is not None and due <= self._loaded_until and self._owns(guild_id):
+            heapq.heappush(self._heap, (due, timer_id))
+            if self._wakeup is not None and self._heap[0][1] == timer_id:
+                self._wakeup.set()
+        return timer_id
+
+    async def cancel(self, kind: str, key: str) -> bool:
+        """Cancel a timer by kind and key
+
+        Returns:
+            True if a timer was cancelled
+        """
+        deleted = await self._run_db(self._delete_key, kind, key)
+        if deleted is None:
+            return False
+        self._forget(*deleted)
+        return True
+
+    def _owns(self, guild_id: Optional[int]) -> bool:
+        """Whether this process fires a guild's timers"""
+        shards = self._shards() if self._shards is not None else None
+        if shards is None:
+            return True
+        shard_count, shard_ids = shards
+        return ((guild_id or 0) >> 22) % shard_count in shard_ids
+
+    def _forget(self, due: float, timer_id: int):
+        """Mark a deleted timer so the dispatcher skips it if it is already in memory"""
+        if self._loaded_until is not None and due <= self._loaded_until:
+            self._cancelled.add(timer_id)
+
+    # Dispatcher
+
+    async def _refresh(self, now: float):
+        """Load timers due before now + horizon into memory"""
+        until = now + self.horizon
+        shards = self._shards() if self._shards is not None else None
+        rows = await self._run_db(self._load_range, self._loaded_until, until, shards)
+        for due, timer_id in rows:
+            heapq.heappush(self._heap, (due, timer_id))
+        self._loaded_until = until
+
+    async def _dispatch(self):
+        """Dispatcher task: fire due timers, sleeping until the next one"""
+        if self._wait_until is not None:
+            await self._wait_until()
+
+        # The first load also picks up everything that came due while offline
+        self._loaded_until = None
+        now = time.time()
+        await self._refresh(now)
+        overdue = sum(1 for due, _ in self._heap if due <= now)
+        if overdue:
+            logger.info(f"Catching up on {overdue} overdue timers")
+            self.caught_up += overdue
+
+        while True:
+            try:
+                now = time.time()
+                if now + self.horizon / 2 >= self._loaded_until:
+                    await self._refresh(now)
+
+                batch = []
+                while self._heap and self._heap[0][0] <= now and len(batch) < BATCH_SIZE:
+                    _, timer_id = heapq.heappop(self._heap)
+                    if timer_id in self._cancelled:
+                        self._cancelled.discard(timer_id)
+                        continue
+                    batch.append(timer_id)
+
+                if batch:
+                    await self._fire(batch)
+                    continue
+
+                # Sleep until the next timer, the next refresh, or a new earlier timer
+                next_due = self._heap[0][0] if self._heap else self._loaded_until
+                delay = min(next_due, self._loaded_until - self.horizon / 2) - time.time()
+                self._wakeup.clear()
+                waiter = asyncio.ensure_future(self._wakeup.wait())
+                try:
+                    # asyncio.wait, unlike wait_for, never swallows a cancellation from close()
+                    await asyncio.wait((waiter,), timeout=max(0.0, delay))
+                finally:
+                    waiter.cancel()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in timer dispatcher: {e}")
+                await asyncio.sleep(5)
+
+    async def _fire(self, ids: List[int]):
+        """Run the handlers for a batch of due timers, then delete them"""
+        rows = await self._run_db(self._load_timers, ids)
+
+        timers = []
+        kept = set()
+        for timer_id, kind, key, guild_id, due, payload in rows:
+            if timer_id in self._cancelled:
+                self._cancelled.discard(timer_id)
+                continue
+            if not self._owns(guild_id):
+                kept.add(timer_id)  # Another process's timer; it stays stored for that process
+                continue
+            try:
+                timers.append(Timer(timer_id, kind, key, due, json.loads(payload), guild_id))
+            except ValueError as e:
+                logger.error(f"Discarding timer {timer_id} with an unreadable payload: {e}")
+
+        results = await asyncio.gather(*(self._call(timer) for timer in timers))
+        kept.update(timer.id for timer, handled in zip(timers, results) if not handled)
+        done = [row[0] for row in rows if row[0] not in kept]
+        if done:
+            await self._run_db(self._delete_ids, done)
+
+        # Handlers that cancel their own timer leave its id behind
+        self._cancelled.difference_update(ids)
+
+    async def _call(self, timer: Timer) -> bool:
+        """Run one timer's handler
+
+        Returns:
+            False if no handler is registered for its kind (the timer is kept)
+        """
+        handler = self._handlers.get(timer.kind)
+        if handler is None:
+            logger.warning(f"No handler for {timer.kind} timer {timer.id}; keeping it until the next start")
+            return False
+
+        try:
+            await handler(timer)
+            self.fired += 1
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Error running {timer.kind} timer {timer.id}: {e}")
+        return True
+
+    async def close(self):
+        """Stop the dispatcher and close the database"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._connection is not None:
+            await self._run_db(self._connection.close)
+            self._connection = None
+        self._executor.shutdown(wait=False)
+
+    async def stats(self) -> Dict[str, Any]:
+        """Pending and in-memory timer counts and dispatch counters"""
+        return {
+            'pending': await self._run_db(self._count),
+            'in_memory': len(self._heap),
+            'fired': self.fired,
+            'failed': self.failed,
+            'caught_up': self.caught_up
+        }
+
+
+def get_timer_scheduler(bot) -> TimerScheduler:
+    """Get the timer scheduler shared by every cog, creating it on first use"""
+    scheduler = getattr(bot, 'timer_scheduler', None)
+    if scheduler is None:
+        scheduler = bot.timer_scheduler = TimerScheduler(wait_until=bot.wait_until_ready,
+                                                         shards=lambda: owned_shards(bot))
+    return scheduler
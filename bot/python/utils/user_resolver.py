@@ -0,0 +1,196 @@
+"""
+Guard-shin Discord Bot - User Resolution
+This module turns user ids into display snapshots for embeds. Lookups check
+the gateway cache first, then a TTL'd LRU of name/avatar snapshots, and only
+then fetch over REST - every missing id at once, with duplicate and
+concurrent lookups of the same id collapsed into a single request.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, NamedTuple, Optional, Tuple
+
+import discord
+
+from bot.python.utils.rest_scheduler import NORMAL, get_rest_scheduler
+
+logger = logging.getLogger('guard-shin.user_resolver')
+
+
+class UserSnapshot(NamedTuple):
+    """The parts of a user an embed shows"""
+    id: int
+    name: str
+    display_name: str
+    avatar_url: Optional[str]
+
+    @property
+    def mention(self) -> str:
+        return f"<@{self.id}>"
+
+    def __str__(self) -> str:
+        return self.name
+
+    @classmethod
+    def from_user(cls, user) -> 'UserSnapshot':
+        """Snapshot a discord.User or discord.Member"""
+        avatar = getattr(user, 'display_avatar', None)
+        return cls(user.id, str(user), getattr(user, 'display_name', user.name), avatar.url if avatar else None)
+
+
+class UserResolver:
+    """Resolves user ids to UserSnapshots: gateway cache, then TTL cache, then REST
+
+    Users that do not exist are cached as None (negative entries) with their
+    own, usually shorter, TTL. REST errors other than NotFound are logged and
+    resolve to None without being cached.
+    """
+
+    def __init__(self, bot, max_size: int = 10000, ttl: float = 3600, negative_ttl: float = 300):
+        """Create the resolver
+
+        Args:
+            bot: The bot (its user cache is the first tier)
+            max_size: Maximum number of cached snapshots (least recently used are evicted)
+            ttl: Seconds to keep a fetched snapshot
+            negative_ttl: Seconds to remember an id that does not exist
+        """
+        self.bot = bot
+        self.rest = get_rest_scheduler(bot)
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+
+        self._entries: 'OrderedDict[int, Tuple[float, Optional[UserSnapshot]]]' = OrderedDict()
+        self._pending: Dict[int, asyncio.Future] = {}
+
+        # Counters for sizing the cache
+        self.gateway_hits = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.errors = 0
+
+    def _cached(self, user_id: int) -> Tuple[bool, Optional[UserSnapshot]]:
+        """Look up an id in the gateway cache, then the TTL cache, without fetching
+
+        Returns:
+            (found, snapshot) - snapshot is None for a cached negative entry
+        """
+        user = self.bot.get_user(user_id)
+        if user is not None:
+            self.gateway_hits += 1
+            return True, UserSnapshot.from_user(user)
+
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return False, None
+
+        expires_at, snapshot = entry
+        if expires_at <= time.monotonic():
+            del self._entries[user_id]
+            return False, None
+
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return True, snapshot
+
+    def _put(self, user_id: int, snapshot: Optional[UserSnapshot]):
+        """Cache a fetched snapshot (or None for an id that does not exist)"""
+        ttl = self.ttl if snapshot is not None else self.negative_ttl
+        self._entries[user_id] = (time.monotonic() + ttl, snapshot)
+        self._entries.move_to_end(user_id)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, user_id: Optional[int] = None):
+        """Drop one id, or the whole cache"""
+        if user_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(user_id, None)
+
+    async def resolve(self, user_id: int) -> Optional[UserSnapshot]:
+        """Resolve one user id (None if the user does not exist or could not be fetched)"""
+        return (await self.resolve_many([user_id])).get(int(user_id))
+
+    async def resolve_many(self, user_ids: Iterable[Any]) -> Dict[int, Optional[UserSnapshot]]:
+        """Resolve a batch of user ids, fetching every cache miss concurrently
+
+        Args:
+            user_ids: User ids (ints or numeric strings; duplicates and None are ignored)
+
+        Returns:
+            Dict of user id -> snapshot (None if the user could not be resolved)
+        """
+        resolved: Dict[int, Optional[UserSnapshot]] = {}
+        waits: Dict[int, asyncio.Future] = {}
+
+        for user_id in {int(user_id) for user_id in user_ids if user_id is not None}:
+            found, snapshot = self._cached(user_id)
+            if found:
+                resolved[user_id] = snapshot
+                continue
+
+            # Join a lookup that is already in flight
+            pending = self._pending.get(user_id)
+            if pending is not None:
+                self.coalesced += 1
+            else:
+                self.misses += 1
+                pending = self._pending[user_id] = asyncio.ensure_future(self._fetch_and_store(user_id))
+            waits[user_id] = pending
+
+        if waits:
+            # Waiters being cancelled must not cancel the shared requests
+            results = await asyncio.shield(asyncio.gather(*waits.values()))
+            resolved.update(zip(waits, results))
+        return resolved
+
+    async def _fetch_and_store(self, user_id: int) -> Optional[UserSnapshot]:
+        """Fetch one user on behalf of every waiter"""
+        try:
+            try:
+                user = await self.rest.run(NORMAL, "users", self.bot.fetch_user, user_id)
+            except discord.NotFound:
+                snapshot = None
+            except discord.HTTPException as e:
+                self.errors += 1
+                logger.warning(f"Failed to fetch user {user_id}: {e}")
+                return None
+            else:
+                snapshot = UserSnapshot.from_user(user)
+
+            self._put(user_id, snapshot)
+            return snapshot
+        finally:
+            self._pending.pop(user_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache counters and hit rate"""
+        lookups = self.gateway_hits + self.hits + self.misses + self.coalesced
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'gateway_hits': self.gateway_hits,
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'evictions': self.evictions,
+            'errors': self.errors,
+            'in_flight': len(self._pending),
+            'hit_rate': (self.gateway_hits + self.hits + self.coalesced) / lookups if lookups else 0.0
+        }
+
+
+def get_user_resolver(bot) -> UserResolver:
+    """Get the user resolver shared by every cog, creating it on first use"""
+    resolver = getattr(bot, 'user_resolver', None)
+    if resolver is None:
+        resolver = bot.user_resolver = UserResolver(bot)
+    return resolver
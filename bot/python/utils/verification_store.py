@@ -0,0 +1,213 @@
+"""
+Guard-shin Discord Bot - Pending Verification Store
+This module keeps members who have joined but not yet verified in the shared
+SQLite database, keyed by guild and member. Every entry carries an expiry
+time that is indexed, so a single sweeper can pull the next batch of overdue
+members without scanning the table, pending state survives restarts, and a
+join flood grows a table on disk instead of dictionaries in memory.
+"""
+
+import asyncio
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from bot.python.utils.settings_store import SETTINGS_DB_PATH
+
+logger = logging.getLogger('guard-shin.verification_store')
+
+# Overdue entries handled per sweep batch
+SWEEP_BATCH = 100
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pending_verifications (
+    guild_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    method TEXT NOT NULL,
+    code TEXT,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (guild_id, user_id)
+);
+CREATE INDEX IF NOT EXISTS pending_verifications_expiry ON pending_verifications (expires_at);
+"""
+
+_COLUMNS = "guild_id, user_id, method, code, created_at, expires_at"
+
+
+class PendingVerification(NamedTuple):
+    """A member who has joined and not verified yet"""
+    guild_id: int
+    user_id: int
+    method: str  # verification type at the time of joining
+    code: Optional[str]  # captcha code or verification phrase, if the method uses one
+    created_at: float
+    expires_at: float  # when the member is auto-kicked (if enabled) or the entry dropped
+
+
+class VerificationStore:
+    """Async repository of pending verifications, indexed by expiry"""
+
+    def __init__(self, path: str = SETTINGS_DB_PATH):
+        """Create the store (the database is opened on first use)
+
+        Args:
+            path: SQLite database file
+        """
+        self.path = path
+
+        # Every database call runs on this one thread, which owns the connection
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='verification-store')
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database (database thread only)"""
+        if self._connection is None:
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(_SCHEMA)
+            connection.commit()
+            self._connection = connection
+        return self._connection
+
+    def _upsert(self, row: Tuple):
+        """Insert or replace an entry (database thread only)"""
+        connection = self._connect()
+        with connection:
+            connection.execute(f"INSERT OR REPLACE INTO pending_verifications ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)",
+                               row)
+
+    def _select_one(self, guild_id: int, user_id: int) -> Optional[Tuple]:
+        """One entry (database thread only)"""
+        return self._connect().execute(
+            f"SELECT {_COLUMNS} FROM pending_verifications WHERE guild_id = ? AND user_id = ?", (guild_id, user_id)
+        ).fetchone()
+
+    def _select_due(self, now: float, limit: int,
+                    shards: Optional[Tuple[int, Sequence[int]]]) -> List[Tuple]:
+        """Entries that expired at or before now, soonest first (database thread only)"""
+        if shards is None:
+            return self._connect().execute(
+                f"SELECT {_COLUMNS} FROM pending_verifications WHERE expires_at <= ? ORDER BY expires_at LIMIT ?",
+                (now, limit)
+            ).fetchall()
+
+        # Only guilds on the given shards (Discord's sharding formula)
+        shard_count, shard_ids = shards
+        placeholders = ",".join("?" * len(shard_ids))
+        return self._connect().execute(
+            f"SELECT {_COLUMNS} FROM pending_verifications WHERE expires_at <= ? "
+            f"AND (guild_id >> 22) % ? IN ({placeholders}) ORDER BY expires_at LIMIT ?",
+            (now, shard_count, *shard_ids, limit)
+        ).fetchall()
+
+    def _delete(self, keys: List[Tuple[int, int]]) -> int:
+        """Delete entries by (guild_id, user_id) (database thread only)"""
+        connection = self._connect()
+        with connection:
+            cursor = connection.executemany(
+                "DELETE FROM pending_verifications WHERE guild_id = ? AND user_id = ?", keys
+            )
+        return cursor.rowcount
+
+    def _delete_guild(self, guild_id: int) -> int:
+        """Delete a guild's entries (database thread only)"""
+        connection = self._connect()
+        with connection:
+            cursor = connection.execute("DELETE FROM pending_verifications WHERE guild_id = ?", (guild_id,))
+        return cursor.rowcount
+
+    def _count(self, guild_id: Optional[int]) -> int:
+        """Number of entries (database thread only)"""
+        if guild_id is None:
+            return self._connect().execute("SELECT COUNT(*) FROM pending_verifications").fetchone()[0]
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM pending_verifications WHERE guild_id = ?", (guild_id,)
+        ).fetchone()[0]
+
+    async def _run(self, function, *args):
+        """Run a database call on the database thread"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, function, *args)
+
+    async def add(self, guild_id: int, user_id: int, method: str, ttl: float,
+                  code: Optional[str] = None) -> PendingVerification:
+        """Record a member as pending (replacing any earlier entry for them)
+
+        Args:
+            guild_id: Guild ID
+            user_id: Member who has to verify
+            method: Verification type the member was given
+            ttl: Seconds until the entry expires
+            code: Captcha code or verification phrase the member has to send
+
+        Returns:
+            The new entry
+        """
+        now = time.time()
+        entry = PendingVerification(guild_id, user_id, method, code, now, now + ttl)
+        await self._run(self._upsert, tuple(entry))
+        return entry
+
+    async def get(self, guild_id: int, user_id: int) -> Optional[PendingVerification]:
+        """Get a member's pending entry, or None"""
+        row = await self._run(self._select_one, guild_id, user_id)
+        return PendingVerification(*row) if row else None
+
+    async def due(self, now: Optional[float] = None, limit: int = SWEEP_BATCH,
+                  shards: Optional[Tuple[int, Sequence[int]]] = None) -> List[PendingVerification]:
+        """Get the next batch of expired entries, soonest first (they stay stored until removed)
+
+        Args:
+            now: Unix time entries must have expired by (defaults to now)
+            limit: Maximum entries returned
+            shards: (shard_count, shard_ids) to only return guilds on those shards, or None for every guild
+        """
+        now = time.time() if now is None else now
+        rows = await self._run(self._select_due, now, limit, shards)
+        return [PendingVerification(*row) for row in rows]
+
+    async def remove(self, guild_id: int, user_id: int) -> bool:
+        """Remove a member's entry
+
+        Returns:
+            True if the member was pending
+        """
+        return await self._run(self._delete, [(guild_id, user_id)]) > 0
+
+    async def remove_many(self, keys: Iterable[Tuple[int, int]]) -> int:
+        """Remove entries by (guild_id, user_id) in one transaction
+
+        Returns:
+            Number of entries removed
+        """
+        keys = list(keys)
+        if not keys:
+            return 0
+        return await self._run(self._delete, keys)
+
+    async def clear_guild(self, guild_id: int) -> int:
+        """Remove every entry for a guild"""
+        return await self._run(self._delete_guild, guild_id)
+
+    async def count(self, guild_id: Optional[int] = None) -> int:
+        """Number of pending members for a guild, or overall"""
+        return await self._run(self._count, guild_id)
+
+    async def close(self):
+        """Close the database"""
+        if self._connection is not None:
+            await self._run(self._connection.close)
+            self._connection = None
+        self._executor.shutdown(wait=False)
+
+
+def get_verification_store(bot) -> VerificationStore:
+    """Get the verification store shared by every cog, creating it on first use"""
+    store = getattr(bot, 'verification_store', None)
+    if store is None:
+        store = bot.verification_store = VerificationStore()
+    return store
@@ -0,0 +1,141 @@
+"""
+Guard-shin Discord Bot - Expiring Warning Counters
+This module keeps auto-moderation warning counts in one bounded table of
+slotted records. Warnings decay over time, fully decayed records are swept,
+and the least recently warned users are evicted under a global entry budget.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+class _WarnRecord:
+    """Warning count for one member"""
+
+    __slots__ = ('count', 'updated', 'decay')
+
+    def __init__(self, decay: float, now: float):
+        self.count = 0
+        self.updated = now  # when the count last changed (or last decayed)
+        self.decay = decay  # seconds for one warning to expire
+
+
+class WarnTracker:
+    """Bounded (guild_id, user_id) -> warning count table with decay
+
+    One warning is forgiven for every ``decay`` seconds without a new one.
+    Records are kept in least-recently-warned order, so once ``max_entries``
+    is reached the member whose last warning is the oldest is dropped first.
+    """
+
+    def __init__(self, max_entries: int = 100000, default_decay: float = 3600):
+        """Create the tracker
+
+        Args:
+            max_entries: Global budget of resident records across all guilds
+            default_decay: Seconds for one warning to expire when add() is not given one
+        """
+        self.max_entries = max_entries
+        self.default_decay = default_decay
+        self.evictions = 0
+        self.expirations = 0
+        self._records: 'OrderedDict[Tuple[int, int], _WarnRecord]' = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    @staticmethod
+    def _apply_decay(record: _WarnRecord, now: float):
+        """Forget the warnings whose decay period has passed"""
+        if record.decay <= 0:
+            return
+        expired = int((now - record.updated) // record.decay)
+        if expired > 0:
+            record.count = max(0, record.count - expired)
+            record.updated += expired * record.decay
+
+    def add(self, guild_id: int, user_id: int, decay: Optional[float] = None,
+            now: Optional[float] = None) -> int:
+        """Record a warning
+
+        Args:
+            guild_id: The guild
+            user_id: The warned member
+            decay: Seconds for one warning to expire (0 disables decay)
+            now: Monotonic timestamp (defaults to time.monotonic())
+
+        Returns:
+            The member's current warning count
+        """
+        if now is None:
+            now = time.monotonic()
+        if decay is None:
+            decay = self.default_decay
+
+        key = (guild_id, user_id)
+        records = self._records
+        record = records.get(key)
+        if record is None:
+            record = records[key] = _WarnRecord(decay, now)
+            if len(records) > self.max_entries:
+                records.popitem(last=False)
+                self.evictions += 1
+        else:
+            self._apply_decay(record, now)
+            records.move_to_end(key)
+            if record.count == 0:
+                record.updated = now
+            record.decay = decay
+
+        record.count += 1
+        return record.count
+
+    def get(self, guild_id: int, user_id: int, now: Optional[float] = None) -> int:
+        """Current warning count for a member"""
+        record = self._records.get((guild_id, user_id))
+        if record is None:
+            return 0
+        self._apply_decay(record, time.monotonic() if now is None else now)
+        return record.count
+
+    def reset(self, guild_id: int, user_id: int):
+        """Clear a member's warnings"""
+        self._records.pop((guild_id, user_id), None)
+
+    def clear_guild(self, guild_id: int) -> int:
+        """Clear every record for a guild (e.g. when the bot leaves it)"""
+        keys = [key for key in self._records if key[0] == guild_id]
+        for key in keys:
+            del self._records[key]
+        return len(keys)
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Drop records whose warnings have all decayed
+
+        Returns:
+            The number of records removed
+        """
+        if now is None:
+            now = time.monotonic()
+
+        expired = []
+        for key, record in self._records.items():
+            self._apply_decay(record, now)
+            if record.count == 0:
+                expired.append(key)
+
+        for key in expired:
+            del self._records[key]
+
+        self.expirations += len(expired)
+        return len(expired)
+
+    def stats(self) -> Dict[str, Any]:
+        """Resident entry count and eviction counters"""
+        return {
+            'entries': len(self._records),
+            'max_entries': self.max_entries,
+            'evictions': self.evictions,
+            'expirations': self.expirations
+        }
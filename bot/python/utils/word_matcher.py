@@ -0,0 +1,224 @@
+"""
+Guard-shin Discord Bot - Multi-Pattern Word Matcher
+This module compiles a filter word list into an Aho-Corasick automaton so a
+message can be checked against every word in one linear pass.
+"""
+
+from collections import deque
+from typing import Dict, Iterable, List, Optional
+
+# Common character substitutions, mapped one-to-one so match positions
+# in the normalized text line up with the original text
+LEETSPEAK_TABLE = str.maketrans({
+    '0': 'o',
+    '1': 'i',
+    '3': 'e',
+    '4': 'a',
+    '5': 's',
+    '7': 't',
+    '@': 'a',
+    '$': 's',
+    '!': 'i',
+    '|': 'l',
+    '+': 't'
+})
+
+
+class WordMatcher:
+    """Aho-Corasick automaton over a guild's filtered words
+
+    Adding or removing a word only touches that word's path in the trie.
+    Failure links are recomputed lazily on the next scan after a change, so a
+    batch of edits costs a single relink.
+    """
+
+    def __init__(self, words: Iterable[str] = (), whole_words: bool = False,
+                 normalize_leetspeak: bool = False):
+        """Build the automaton
+
+        Args:
+            words: The filtered words
+            whole_words: Only match words surrounded by non-alphanumeric characters
+            normalize_leetspeak: Fold common substitutions (e.g. "$" -> "s") before matching
+        """
+        self.whole_words = whole_words
+        self.normalize_leetspeak = normalize_leetspeak
+        self._reset()
+
+        for word in words:
+            self.add(word)
+
+    def _reset(self):
+        """Clear the automaton"""
+        self._goto: List[Dict[str, int]] = [{}]  # node -> char -> node
+        self._fail: List[int] = [0]  # node -> failure node
+        self._output: List[Optional[str]] = [None]  # node -> normalized word ending here
+        self._dict_link: List[int] = [0]  # node -> nearest terminal node on the failure chain
+        self._words: Dict[str, List[str]] = {}  # normalized word -> original words
+        self._dirty = False
+
+    def normalize(self, text: str) -> str:
+        """Normalize text the same way for words and messages"""
+        text = text.lower()
+        if self.normalize_leetspeak:
+            text = text.translate(LEETSPEAK_TABLE)
+        return text
+
+    def configure(self, whole_words: bool, normalize_leetspeak: bool):
+        """Update matching options, rebuilding only if normalization changed"""
+        self.whole_words = whole_words
+
+        if normalize_leetspeak != self.normalize_leetspeak:
+            words = self.words()
+            self.normalize_leetspeak = normalize_leetspeak
+            self._reset()
+            for word in words:
+                self.add(word)
+
+    def add(self, word: str) -> bool:
+        """Add a word to the automaton
+
+        Returns:
+            True if the word was not already present
+        """
+        key = self.normalize(word.strip())
+        if not key:
+            return False
+
+        originals = self._words.get(key)
+        if originals is not None:
+            if word in originals:
+                return False
+            originals.append(word)
+            return True
+
+        node = 0
+        for char in key:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(None)
+                self._dict_link.append(0)
+            node = next_node
+
+        self._output[node] = key
+        self._words[key] = [word]
+        self._dirty = True
+        return True
+
+    def remove(self, word: str) -> bool:
+        """Remove a word from the automaton
+
+        Returns:
+            True if the word was present
+        """
+        key = self.normalize(word.strip())
+        originals = self._words.get(key)
+        if not originals or word not in originals:
+            return False
+
+        originals.remove(word)
+        if originals:
+            return True
+
+        del self._words[key]
+
+        # Unmark the terminal node; the path stays in the trie and is reused if re-added
+        node = 0
+        for char in key:
+            node = self._goto[node][char]
+        self._output[node] = None
+        self._dirty = True
+        return True
+
+    def words(self) -> List[str]:
+        """All original words in the automaton"""
+        return [word for originals in self._words.values() for word in originals]
+
+    def __len__(self) -> int:
+        return sum(len(originals) for originals in self._words.values())
+
+    def _link(self):
+        """Recompute failure and dictionary links with a breadth-first walk"""
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        dict_link = self._dict_link
+
+        queue = deque()
+        for child in goto[0].values():
+            fail[child] = 0
+            dict_link[child] = 0
+            queue.append(child)
+
+        while queue:
+            node = queue.popleft()
+            for char, child in goto[node].items():
+                state = fail[node]
+                while state and char not in goto[state]:
+                    state = fail[state]
+                target = goto[state].get(char, 0)
+                fail[child] = target if target != child else 0
+                dict_link[child] = target if output[target] is not None else dict_link[target]
+                queue.append(child)
+
+        self._dirty = False
+
+    def find_all(self, text: str) -> List[str]:
+        """Find every filtered word in the text in a single pass
+
+        Args:
+            text: The message content
+
+        Returns:
+            The matched words (original spelling, first-added per normalized form),
+            in order of first occurrence
+        """
+        if not self._words:
+            return []
+        if self._dirty:
+            self._link()
+
+        # Word boundaries are checked on the text before leetspeak folding, so
+        # punctuation such as the "!" in "word!" is not read as a letter
+        lowered = text.lower()
+        normalized = lowered.translate(LEETSPEAK_TABLE) if self.normalize_leetspeak else lowered
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        dict_link = self._dict_link
+        whole_words = self.whole_words
+        length = len(normalized)
+
+        found = []
+        seen = set()
+        node = 0
+
+        for index, char in enumerate(normalized):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+
+            # Walk the terminal nodes reachable from this state
+            match = node if output[node] is not None else dict_link[node]
+            while match:
+                key = output[match]
+                if key not in seen:
+                    if not whole_words or self._is_whole_word(lowered, index - len(key) + 1, index + 1, length):
+                        seen.add(key)
+                        found.append(self._words[key][0])
+                match = dict_link[match]
+
+        return found
+
+    @staticmethod
+    def _is_whole_word(text: str, start: int, end: int, length: int) -> bool:
+        """Check that a match is not part of a larger word"""
+        if start > 0 and text[start - 1].isalnum():
+            return False
+        if end < length and text[end].isalnum():
+            return False
+        return True
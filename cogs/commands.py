@@ -9,6 +9,8 @@ import os
 import logging
 from typing import Optional, Union, List, Dict, Any, Literal
 
+from bot.python.utils.rate_limiter import SlidingWindowLimiter
+
 logger = logging.getLogger('guard-shin.commands')
 
 # Command categories for Help command
@@ -37,7 +39,7 @@ class Commands(commands.Cog):
         self.prefix = "g!"
         self.premium_servers = self._load_premium_servers()
         self.config = self._load_config()
-        self.cooldowns = {}
+        self.cooldowns = {}  # command_name -> SlidingWindowLimiter keyed by user_id
         
         # Initialize command stats
         for command in self.get_commands():
@@ -79,18 +81,21 @@ class Commands(commands.Cog):
     async def handle_cooldown(self, ctx, command_name: str, cooldown_seconds: int = 3) -> bool:
         """Handle command cooldowns"""
         user_id = ctx.author.id
-        current_time = time.time()
         
-        cooldown_key = f"{user_id}:{command_name}"
+        # A second use inside the window trips the limiter; idle users are evicted past the cap
+        limiter = self.cooldowns.get(command_name)
+        if limiter is None:
+            limiter = self.cooldowns[command_name] = SlidingWindowLimiter(2, cooldown_seconds)
+        else:
+            limiter.configure(2, cooldown_seconds)
+        
+        # Rejected attempts are not recorded, so spamming doesn't extend the cooldown
+        remaining = limiter.retry_after(user_id)
+        if remaining > 0:
+            await ctx.send(f"⏳ Please wait {round(remaining)} seconds before using this command again.", delete_after=5)
+            return False
         
-        if cooldown_key in self.cooldowns:
-            last_use = self.cooldowns[cooldown_key]
-            if current_time - last_use < cooldown_seconds:
-                remaining = round(cooldown_seconds - (current_time - last_use))
-                await ctx.send(f"⏳ Please wait {remaining} seconds before using this command again.", delete_after=5)
-                return False
-                
-        self.cooldowns[cooldown_key] = current_time
+        limiter.hit(user_id)
         return True
 
     @commands.Cog.listener()
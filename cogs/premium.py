@@ -6,6 +6,8 @@ import logging
 import asyncio
 import time
 
+from bot.python.utils.shard_metrics import owns_guild
+
 # Setup logging
 logger = logging.getLogger('guard-shin.premium')
 
@@ -134,9 +136,11 @@ class Premium(commands.Cog):
             # Current time
             now = int(time.time())
             
-            # Find expired guilds
+            # Find expired guilds (only those on this process's shards, so each is handled once)
             expired_guilds = []
             for guild_id, info in self.premium_guilds.items():
+                if not owns_guild(self.bot, guild_id):
+                    continue
                 expires = info.get('expires', 0)
                 if expires > 0 and expires <= now:
                     expired_guilds.append(guild_id)
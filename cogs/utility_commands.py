@@ -10,6 +10,8 @@ import logging
 from typing import Optional, Union, List, Dict, Any
 import urllib.parse
 
+from bot.python.utils.timer_scheduler import Timer, get_timer_scheduler
+
 logger = logging.getLogger('guard-shin.utility')
 
 class UtilityCommands(commands.Cog):
@@ -17,9 +19,13 @@ class UtilityCommands(commands.Cog):
 
     def __init__(self, bot):
         self.bot = bot
-        self.reminders = {}
         self.afk_users = {}
         
+        # Reminders are durable timers, so they survive restarts
+        self.timers = get_timer_scheduler(bot)
+        self.timers.register('reminder', self._send_reminder)
+        self.timers.start()
+        
     @commands.command()
     async def invite(self, ctx: commands.Context):
         """Get the invite link for the bot"""
@@ -173,19 +179,16 @@ class UtilityCommands(commands.Cog):
             return await ctx.send("Sorry, I can't remind you more than 30 days from now.")
             
         # Calculate reminder timestamp
-        reminder_time = datetime.datetime.utcnow() + datetime.timedelta(seconds=seconds)
+        now = discord.utils.utcnow()  # timezone-aware, so .timestamp() is not read as local time
+        reminder_time = now + datetime.timedelta(seconds=seconds)
         
-        # Store reminder
-        reminder_id = str(ctx.author.id) + str(int(time.time()))
-        self.reminders[reminder_id] = {
+        # Schedule reminder
+        await self.timers.schedule('reminder', reminder_time.timestamp(), {
             "user_id": ctx.author.id,
             "channel_id": ctx.channel.id,
             "message": reminder,
-            "time": reminder_time.timestamp()
-        }
-        
-        # Schedule reminder
-        self.bot.loop.create_task(self._send_reminder(reminder_id, seconds))
+            "time": now.timestamp()
+        }, guild_id=ctx.guild.id if ctx.guild else None)
         
         # Send confirmation
         embed = discord.Embed(
@@ -200,15 +203,9 @@ class UtilityCommands(commands.Cog):
         
         await ctx.send(embed=embed)
         
-    async def _send_reminder(self, reminder_id: str, seconds: int):
-        """Send a reminder after the specified time"""
-        await asyncio.sleep(seconds)
-        
-        # Check if reminder still exists
-        if reminder_id not in self.reminders:
-            return
-            
-        reminder = self.reminders.pop(reminder_id)
+    async def _send_reminder(self, timer: Timer):
+        """Send a reminder when its timer fires"""
+        reminder = timer.payload
         
         # Get user and channel
         user = self.bot.get_user(reminder.get("user_id"))
@@ -443,7 +440,7 @@ class UtilityCommands(commands.Cog):
             return await ctx.send("Timer must be between 1 second and 1 day.")
             
         # Calculate timer end time
-        end_time = int((datetime.datetime.utcnow() + datetime.timedelta(seconds=seconds)).timestamp())
+        end_time = int((discord.utils.utcnow() + datetime.timedelta(seconds=seconds)).timestamp())
         
         # Send timer message
         embed = discord.Embed(
@@ -714,7 +711,7 @@ class UtilityCommands(commands.Cog):
         # Create color preview
         embed.set_image(url=f"https://dummyimage.com/200x100/{hex_code}/{text_color}&text=+")
         
-        await ctx.send(embed=embed)))
+        await ctx.send(embed=embed)
 
 # Proper setup function for Discord.py extension loading
 def setup(bot):
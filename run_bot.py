@@ -8,6 +8,9 @@ import asyncio
 import random
 import sys
 
+from bot.python.utils.rest_scheduler import LOW, get_rest_scheduler
+from bot.python.utils.shard_metrics import DEFAULT_METRICS_PATH, SAMPLE_INTERVAL, get_shard_metrics, parse_shard_config
+
 # Set up logging
 logger = logging.getLogger('guard-shin')
 logger.setLevel(logging.INFO)
@@ -38,9 +41,18 @@ class HelpCog(commands.Cog):
     def cog_unload(self):
         self.bot.help_command = self._original_help_command
 
-class GuardShin(commands.Bot):
+class GuardShin(commands.AutoShardedBot):
     def __init__(self):
         intents = discord.Intents.all()
+        
+        # Sharding: SHARD_COUNT is the total across every process, SHARD_IDS the shards this one runs
+        # (neither set = every shard, with the count Discord recommends)
+        shard_count, shard_ids = parse_shard_config(os.getenv('SHARD_COUNT'), os.getenv('SHARD_IDS'))
+        if shard_ids is not None:
+            logger.info(f"Running shards {shard_ids} of {shard_count}")
+        elif shard_count is not None:
+            logger.info(f"Running all {shard_count} shards")
+        
         # Get application ID from environment and convert to integer
         client_id = os.getenv('DISCORD_CLIENT_ID')
         application_id = int(client_id) if client_id and client_id.isdigit() else None
@@ -56,9 +68,15 @@ class GuardShin(commands.Bot):
             intents=intents,
             description="Advanced Discord moderation and security bot",
             activity=discord.Game(name="Starting up..."),
-            application_id=application_id
+            application_id=application_id,
+            shard_count=shard_count,
+            shard_ids=shard_ids
         )
         
+        # Per-shard latency, event rate and reconnects, written for the health endpoint
+        self.shard_metrics = get_shard_metrics(self)
+        self.metrics_path = os.getenv('SHARD_METRICS_PATH', DEFAULT_METRICS_PATH)
+        
         # Guild prefixes
         self.prefixes = {}
         self.load_prefixes()
@@ -96,7 +114,10 @@ class GuardShin(commands.Bot):
         # Add basic slash commands to the tree
         @self.tree.command(name="ping", description="Check the bot's latency")
         async def ping(interaction: discord.Interaction):
-            await interaction.response.send_message(f"Pong! {round(self.latency * 1000)}ms")
+            # The latency of the shard this guild is on
+            shard = self.get_shard(interaction.guild.shard_id) if interaction.guild else None
+            latency = shard.latency if shard else self.latency
+            await interaction.response.send_message(f"Pong! {round(latency * 1000)}ms")
             
         @self.tree.command(name="info", description="Get information about Guard-shin")
         async def info(interaction: discord.Interaction):
@@ -520,6 +541,7 @@ https://witherco.github.io/Guard-shin/
                 
         # Start background tasks
         self.bg_task = self.loop.create_task(self.rotate_status())
+        self.metrics_task = self.loop.create_task(self.report_shard_metrics())
         logger.info("Started background tasks")
         
         # Register commands with Discord (if not disabled)
@@ -531,15 +553,38 @@ https://witherco.github.io/Guard-shin/
     async def rotate_status(self):
         """Rotate bot status regularly"""
         await self.wait_until_ready()
+        rest = get_rest_scheduler(self)  # status changes are the lowest priority work
         while not self.is_closed():
             status = random.choice(STATUS_MESSAGES)
-            await self.change_presence(activity=discord.Game(name=status))
+            
+            # Presence is per shard; shards that are reconnecting get the next one
+            for shard_id, shard in self.shards.items():
+                if shard.is_closed():
+                    continue
+                name = f"{status} | Shard {shard_id}" if len(self.shards) > 1 else status
+                rest.spawn(LOW, f"presence:{shard_id}", self.change_presence,
+                           activity=discord.Game(name=name), shard_id=shard_id)
             await asyncio.sleep(60)  # Change status every minute
     
+    async def report_shard_metrics(self):
+        """Write per-shard health metrics regularly (also while shards are still connecting)"""
+        while not self.is_closed():
+            try:
+                self.shard_metrics.write(self.metrics_path)
+            except Exception as e:
+                logger.error(f"Error writing shard metrics: {e}")
+            await asyncio.sleep(SAMPLE_INTERVAL)
+    
+    async def on_shard_ready(self, shard_id):
+        """Event triggered when one shard has received its guilds"""
+        guilds = sum(1 for guild in self.guilds if guild.shard_id == shard_id)
+        logger.info(f"Shard {shard_id} ready with {guilds} guilds (latency {self.get_shard(shard_id).latency * 1000:.0f}ms)")
+    
     async def on_ready(self):
         """Event triggered when the bot is fully ready"""
         logger.info(f'Logged in as {self.user.name} (ID: {self.user.id})')
         logger.info(f'Connected to {len(self.guilds)} guilds, serving {sum(g.member_count for g in self.guilds)} users')
+        logger.info(f'Running shards {sorted(self.shards)} of {self.shard_count}')
         
         # Register slash commands to ensure they're available
         await self.register_commands()
@@ -590,7 +635,12 @@ https://witherco.github.io/Guard-shin/
         
 def main():
     """Initialize and run the bot"""
-    bot = GuardShin()
+    try:
+        bot = GuardShin()
+    except ValueError as e:
+        logger.error(f"Invalid shard configuration: {e}")
+        print(f"ERROR: Invalid shard configuration: {e}")
+        sys.exit(1)
     
     # Get token from environment variable
     token = os.getenv('DISCORD_BOT_TOKEN') or os.getenv('GUARD_SHIN_BOT_TOKEN')